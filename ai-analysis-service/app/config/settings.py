@@ -32,6 +32,7 @@ class AppConfig(BaseSettings):
     host: str
     port: int
     debug: bool
+    workers: int = 1  # uvicorn 进程数，大于1时需要 QUEUE_ROLE=api 并部署独立工作进程
 
 
 class AIConfig(BaseSettings):
@@ -47,6 +48,121 @@ class QueueConfig(BaseSettings):
     max_concurrent_tasks: int  # 最大并发处理任务数
     max_queue_size: int # 最大队列长度
     task_timeout: int # 任务超时时间（秒）
+    store_backend: str = "sqlite"  # 任务存储后端: sqlite / memory
+    store_path: str = "storage/queue.db"  # SQLite 任务存储文件路径
+    artifact_dir: str = "storage/artifacts"  # 任务结果等产物的存储目录
+    retention_ttl: int = 7 * 24 * 3600  # 已结束任务保留时间（秒）
+    retention_max_tasks: int = 1000  # 内存中保留的已结束任务数上限
+    retention_max_memory_mb: int = 512  # 内存中已结束任务数据总量上限（MB）
+    events_keepalive: float = 15.0  # 任务进度推送（SSE）的心跳间隔（秒）
+    role: str = "all"  # 部署角色: all(单进程) / api(只接收请求) / worker(独立工作进程)
+    lease_seconds: float = 60.0  # 工作进程领取任务的租约时长（秒），每 1/3 租约续约一次
+    poll_interval: float = 1.0  # 工作进程轮询共享队列、API 进程转发事件的间隔（秒）
+    dedup_enabled: bool = True  # 合并相同文件和参数的重复提交
+    result_cache_ttl: int = 3600  # 相同提交直接复用已完成任务结果的有效期（秒），0 表示只合并进行中的任务
+    sync_timeout: float = 300.0  # 同步接口（/analyze/sync）等待任务完成的最长时间（秒）
+    urgent_burst: int = 3  # 普通任务等待时最多连续出队的紧急任务数（同步接口走紧急通道）
+    scheduling_policy: str = "fifo"  # 通道内调度策略: fifo / priority / edf / sjf
+    aging_seconds: float = 120.0  # 老化周期（秒）：priority 每周期提升一级，sjf 每周期预测耗时减半
+    default_deadline: float = 1800.0  # edf 策略下未指定截止时间的任务，按创建后多少秒计算截止时间
+
+class StageConfig(BaseSettings):
+    """报告生成各阶段的并发配置"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="STAGE_")
+    markdown_concurrency: int = 2  # PDF转Markdown（CPU密集）
+    dify_concurrency: int = 8  # Dify工作流（I/O密集）
+    bigdata_concurrency: int = 8  # 天远大数据（I/O密集）
+    convert_concurrency: int = 4  # 数据转换与大模型增强
+    html_concurrency: int = 2  # Node渲染HTML（CPU密集）
+    pdf_concurrency: int = 2  # Chromium渲染PDF（浏览器，内存密集）
+    queue_size: int = 100  # 每个阶段的排队上限
+    # 各阶段对可重试错误（超时、限流、上游5xx）的重试次数
+    markdown_retries: int = 1
+    dify_retries: int = 2
+    bigdata_retries: int = 1
+    convert_retries: int = 0  # 大模型增强内部已有降级处理
+    html_retries: int = 1
+    pdf_retries: int = 2
+    retry_backoff_base: float = 2.0  # 首次重试等待时间（秒），之后指数增长
+    retry_backoff_max: float = 60.0  # 最大重试等待时间（秒）
+    bigdata_settle_timeout: float = 30.0  # 其他步骤可重试失败时，等待进行中的天远调用结束并保存检查点的最长时间（秒）
+
+class AdaptiveConfig(BaseSettings):
+    """自适应并发控制配置（AIMD），上游并发上限取对应阶段的并发配置"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="ADAPTIVE_")
+    enabled: bool = True  # 关闭后按固定上限限流
+    window_size: int = 20  # 每次加性增所依据的成功样本数
+    decrease_ratio: float = 0.7  # 过载时的乘性减小系数
+    cooldown_seconds: float = 5.0  # 两次减小之间的最小间隔（秒）
+    global_min_tasks: int = 1  # 全局并发下限，上限为 QUEUE_MAX_CONCURRENT_TASKS
+    global_target_latency: float = 300.0  # 单任务 p95 处理时间目标（秒）
+    dify_target_latency: float = 90.0  # Dify工作流 p95 延迟目标（秒）
+    ocr_target_latency: float = 60.0  # OCR服务 p95 延迟目标（秒）
+    bigdata_target_latency: float = 15.0  # 天远大数据 p95 延迟目标（秒）
+    llm_target_latency: float = 60.0  # 大模型增强（产品推荐、专家分析）p95 延迟目标（秒）
+
+class AdmissionConfig(BaseSettings):
+    """准入控制配置（按在途数据量和预测工作量拒绝新请求，返回 429）"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="ADMISSION_")
+    enabled: bool = True
+    max_inflight_mb: int = 1024  # 已接收未结束请求的文件数据总量上限（MB）
+    max_predicted_latency: float = 1800.0  # 新请求预计完成时间（排队 + 处理）上限（秒）
+    max_retry_after: int = 300  # 返回的 Retry-After 上限（秒）
+
+class TenantConfig(BaseSettings):
+    """租户（机构）公平调度配置，任务按 AnalysisRequest.tenant_id 归属租户"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="TENANT_")
+    enabled: bool = True
+    default_weight: float = 1.0  # 默认权重，排队的租户按权重比例分配出队机会
+    max_concurrent: int = 0  # 每个租户同时处理的任务数上限，0 表示不限制
+    max_queued: int = 0  # 每个租户排队和处理中的任务数上限（超出返回 429），0 表示不限制
+    overrides: str = ""  # 单独配置的租户，格式 "租户:权重[:并发上限[:排队上限]]"，逗号分隔
+
+class WebhookConfig(BaseSettings):
+    """任务完成回调配置（AnalysisRequest.callback_url）"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="WEBHOOK_")
+    enabled: bool = True
+    secret: str = ""  # HMAC-SHA256 签名密钥，为空时不签名
+    timeout: float = 10.0  # 单次投递超时（秒）
+    max_attempts: int = 8  # 最大投递次数，之后放弃
+    backoff_base: float = 5.0  # 首次重试等待时间（秒），之后指数增长
+    backoff_max: float = 600.0  # 最大重试等待时间（秒）
+    batch_tenants: str = ""  # 合并投递的租户，逗号分隔，"*" 表示所有租户
+    batch_size: int = 50  # 每次合并投递的回调数上限
+    batch_window: float = 5.0  # 合并投递的等待时间（秒）
+    include_result: bool = False  # 回调是否附带分析结果（否则只发送 taskId / resultUrl）
+    max_inline_bytes: int = 256 * 1024  # 附带分析结果的大小上限（字节），超出时只发送引用
+    public_base_url: str = ""  # 服务的外部访问地址，用于生成回调中的 resultUrl
+    allowed_hosts: str = ""  # 允许回调的域名，逗号分隔，为空时只允许解析到公网地址的域名
+
+class BatchConfig(BaseSettings):
+    """批量提交配置（/analysis/batch）"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="BATCH_")
+    # 批次状态只保存在接收批次的进程内存中，APP_WORKERS>1 时需要关闭（其他 uvicorn 进程查询不到批次）
+    enabled: bool = True
+    max_items: int = 500  # 每个批次的条目数上限
+    default_parallel: int = 4  # 每个批次同时在队列中（排队或处理中）的条目数
+    max_parallel: int = 16  # 请求可指定的 max_parallel 上限
+    item_timeout: float = 6 * 3600  # 等待单个条目结束的最长时间（秒）
+    retention_ttl: int = 24 * 3600  # 已结束批次的状态保留时间（秒）
+
+class MarkdownCacheConfig(BaseSettings):
+    """PDF 转 Markdown 结果缓存配置（按文件内容哈希和解析器版本缓存）"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="MARKDOWN_CACHE_")
+    enabled: bool = True
+    dir: str = "storage/markdown_cache"  # 缓存目录（多进程部署时可共用）
+    max_size_mb: int = 1024  # 缓存总大小上限（MB），超出时淘汰最久未使用的条目
+    max_entries: int = 10000  # 缓存条目数上限
+
+
+class LoopMonitorConfig(BaseSettings):
+    """事件循环延迟监控配置"""
+    model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="LOOP_MONITOR_")
+    enabled: bool = True
+    interval: float = 0.1  # 采样间隔（秒）
+    stall_threshold: float = 0.2  # 延迟超过该值（秒）记为一次阻塞并告警
+    capture_stack: bool = True  # 阻塞时抓取事件循环线程的调用栈，定位阻塞位置
+
 
 class FileConfig(BaseSettings):
     """文件处理配置"""
@@ -79,6 +195,33 @@ class PDFConfig(BaseSettings):
     model_config = SettingsConfigDict(env_file=BASE_DIR / ".env", env_prefix="PDF_")
     to_markdown_url: str
     to_markdown_timeout: int = 120
+    # pdfplumber 解析进程池：工作进程数（0 表示在线程池中解析）、每个任务解析的页数、
+    # 每个工作进程处理多少个任务后回收（限制 pdfplumber 的内存增长）
+    extract_workers: int = 2
+    extract_pages_per_chunk: int = 4
+    extract_max_tasks_per_child: int = 20
+    # 本地解析引擎（pdfplumber / pypdfium2 / pymupdf，见 service/pdf_engines.py）：默认引擎，
+    # 以及按报告类型单独指定的引擎，格式 "报告类型:引擎"，多个用逗号分隔，如 "flow:pypdfium2"
+    extract_engine: str = "pdfplumber"
+    extract_engine_overrides: str = ""
+    # 上传 PDF 的解码暂存：解码后超过该大小（MB）或启用了解析进程池时分块解码到暂存目录（解析时内存映射），
+    # 否则只保存在内存中；
+    # 暂存目录（默认系统临时目录下的 ai-analysis-pdf）中超过 spool_max_age 秒的遗留文件在启动时清理
+    spool_threshold_mb: int = 8
+    spool_dir: str = ""
+    spool_max_age: int = 3600
+    # 逐页 OCR：非空白字符少于 ocr_page_min_chars 且图片覆盖率不低于 ocr_page_min_image_ratio 的页面
+    # 单独交给 OCR 服务识别（每份文档最多同时识别 ocr_page_concurrency 页）；所有页面都需要 OCR 时整份文档提交
+    ocr_page_min_chars: int = 50
+    ocr_page_min_image_ratio: float = 0.3
+    ocr_page_concurrency: int = 4
+    # 解析出的文字少于 min_content_chars 时整份文档提交 OCR（也是对冲执行的质量检查标准）
+    min_content_chars: int = 800
+    # 对冲执行：第 1 页非空白字符少于 hedge_probe_max_chars 且图片覆盖率不低于 hedge_probe_min_image_ratio 时
+    # 判定为疑似扫描件，pdfplumber 解析与整份文档 OCR 同时开始，采用先通过质量检查的结果并取消另一个
+    hedge_enabled: bool = True
+    hedge_probe_max_chars: int = 50
+    hedge_probe_min_image_ratio: float = 0.5
 
 
 class Settings:
@@ -88,6 +231,14 @@ class Settings:
     app = AppConfig()
     ai = AIConfig()
     queue = QueueConfig()
+    stage = StageConfig()
+    adaptive = AdaptiveConfig()
+    admission = AdmissionConfig()
+    tenant = TenantConfig()
+    webhook = WebhookConfig()
+    batch = BatchConfig()
+    markdown_cache = MarkdownCacheConfig()
+    loop_monitor = LoopMonitorConfig()
     file = FileConfig()
     dify = DifyConfig()
     openai = OpenAIConfig()
@@ -5,21 +5,34 @@ sys.path.append(str(Path(__file__).resolve().parent))
 
 import time
 import uuid
+import asyncio
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from loguru import logger
 import sys
+import json
 import base64
 
 from config.settings import settings
 from models.report_model import *
-from utils.queue_manager import request_queue, TaskStatus
+from utils.queue_manager import request_queue, TaskStatus, FINISHED_STATUSES
+from utils.task_scheduler import PRIORITY_URGENT
+from utils.stage_executor import stage_executor
+from utils.process_pool import pdf_process_pool
+from utils.pdf_spool import pdf_spool
+from utils.markdown_cache import markdown_cache
+from utils.hedge import pdf_hedge_stats
+from utils.loop_monitor import loop_monitor
+from utils.adaptive_limiter import get_upstream_stats
+from utils.admission import admission_controller, AdmissionRejected
+from utils.batch_manager import batch_manager, BatchJob
+from utils.eta_estimator import eta_estimator
+from utils.task_events import task_event_bus, TaskEvent, EVENT_STATUS
 from utils.log_manager import algorithm_logger
 from utils.prompts import PROMPT_TEMPLATES
-from models.visualization_model import VisualizationReportRequest
-from service.brief_report_service import BriefReportService
+from models.visualization_model import VisualizationReportRequest, VisualizationReportData
 
 # 配置日志
 logger.remove()
@@ -53,7 +66,13 @@ async def startup_event():
     """应用启动事件"""
     logger.info("启动AI分析服务...")
 
-    # 启动请求队列
+    # 清理上次运行遗留的PDF暂存文件
+    await asyncio.to_thread(pdf_spool.sweep)
+
+    # 启动事件循环监控、阶段执行器和请求队列
+    if loop_monitor:
+        await loop_monitor.start()
+    await stage_executor.start()
     await request_queue.start()
 
     # 初始化日志目录
@@ -66,8 +85,13 @@ async def shutdown_event():
     """应用关闭事件"""
     logger.info("关闭AI分析服务...")
 
-    # 停止请求队列
+    # 停止批次投递、请求队列和阶段执行器
+    await batch_manager.stop()
     await request_queue.stop()
+    await stage_executor.stop()
+    pdf_process_pool.shutdown()
+    if loop_monitor:
+        await loop_monitor.stop()
 
 
 @app.middleware("http")
@@ -145,32 +169,52 @@ async def submit_analysis_task(request: AnalysisRequest, http_request: Request):
             "mobile_no": None
         }
 
-        # 添加任务到队列
-        task_id = await request_queue.add_task(task_data)
+        # 添加任务到队列（相同内容或幂等键的重复提交复用已有任务）
+        idempotency_key = request.idempotency_key or http_request.headers.get("Idempotency-Key")
+        task_id, deduplicated = await request_queue.add_task(
+            task_data,
+            idempotency_key=idempotency_key,
+            priority=request.priority,
+            deadline=time.time() + request.deadline_seconds if request.deadline_seconds else None,
+            tenant_id=request.tenant_id,
+            callback_url=request.callback_url,
+            callback_data=request.callback_data
+        )
+        task = await request_queue.get_task_status(task_id)
+
+        if deduplicated:
+            return await _deduplicated_response(task)
 
         # 记录请求开始日志
         if settings.log.algorithm_enable:
             await algorithm_logger.log_request_start(task_id, task_data)
 
-        # 计算预估等待时间
-        queue_stats = request_queue.get_queue_stats()
-        estimated_wait_time = queue_stats["current_queue_size"] * 30  # 假设每个任务平均30秒
+        # 按耗时模型预测等待和完成时间
+        eta = await request_queue.get_task_eta(task) or {}
 
         logger.info(f"任务已提交到队列: {task_id} | "
                    f"类型: {request.report_type} | "
                    f"文件大小: {estimated_file_size // 1024}KB | "
-                   f"队列位置: {queue_stats['current_queue_size']}")
+                   f"队列位置: {eta.get('queue_position')} | "
+                   f"预计等待: {eta.get('estimated_wait_time', 0):.0f}s")
 
         return TaskSubmitResponse(
             success=True,
             task_id=task_id,
             message="任务已成功提交到处理队列",
-            estimated_wait_time=estimated_wait_time,
-            queue_position=queue_stats["current_queue_size"]
+            **eta
         )
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except ValueError as e:
+        # 回调地址不可用等参数错误
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     except RuntimeError as e:
         # 队列相关错误
         raise HTTPException(
@@ -185,12 +229,38 @@ async def submit_analysis_task(request: AnalysisRequest, http_request: Request):
         )
 
 
+def _too_many_requests(e: AdmissionRejected) -> HTTPException:
+    """超出准入预算时返回 429，Retry-After 为预计恢复时间"""
+    return HTTPException(
+        status_code=429,
+        detail=f"服务繁忙，请稍后重试: {str(e)}",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+async def _deduplicated_response(task) -> TaskSubmitResponse:
+    """重复提交复用已有任务时的响应"""
+    if task.status == TaskStatus.COMPLETED:
+        message = "重复提交，相同任务已完成，可直接获取该任务的结果"
+    else:
+        message = "重复提交，已关联到处理队列中的相同任务"
+
+    return TaskSubmitResponse(
+        success=True,
+        task_id=task.task_id,
+        message=message,
+        deduplicated=True,
+        **(await request_queue.get_task_eta(task) or {})
+    )
+
+
 @app.post("/analyze/sync", response_model=AnalysisResponse)
 async def analyze_document_sync(request: AnalysisRequest, http_request: Request):
     """
-    同步分析文档接口（直接处理，不使用队列）
+    同步分析文档接口（提交到队列的紧急通道并等待完成）
 
-    用于紧急或小文件的即时处理
+    用于紧急或小文件的即时处理，与队列任务共用工作协程、并发限制和准入控制，
+    紧急任务优先出队；超过 QUEUE_SYNC_TIMEOUT 未完成时返回 504 并取消任务。
     支持两种输入方式：
     1. file_base64 + mime_type: 传统的PDF base64方式
     2. markdown_content: 直接传入Markdown内容
@@ -243,26 +313,48 @@ async def analyze_document_sync(request: AnalysisRequest, http_request: Request)
                 "custom_prompt": request.custom_prompt
             })
 
-        # AI分析
+        # AI分析：提交到紧急通道并等待完成（超出准入预算时返回 429）
+        task_data = {
+            "file_base64": request.file_base64,
+            "markdown_content": request.markdown_content,
+            "mime_type": request.mime_type,
+            "report_type": request.report_type.value,
+            "custom_prompt": request.custom_prompt,
+            "file_name": request.file_name,
+            "name": request.name,
+            "id_card": request.id_card,
+            "mobile_no": request.mobile_no,
+            "auth_file": request.auth_file,
+            "customer_info": request.customer_info.model_dump() if request.customer_info else None
+        }
+        sync_timeout = min(settings.queue.sync_timeout, request.deadline_seconds or settings.queue.sync_timeout)
         start_time = time.time()
-        briefReportService = BriefReportService()
-        visualization_report, html_file, pdf_file = await briefReportService.generate_report(
-            analysisRequest=request,
-            request_id=request_id
-        )
+        try:
+            task = await request_queue.submit_and_wait(
+                task_data, timeout=sync_timeout, priority=PRIORITY_URGENT + request.priority,
+                tenant_id=request.tenant_id
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"分析超时 (>{sync_timeout:.0f}s)")
+        except RuntimeError as e:
+            # 队列未启动或已满（与 /analysis 一致返回 503；任务本身失败在下方按 500 处理）
+            raise HTTPException(status_code=503, detail=f"服务暂时不可用: {str(e)}")
         processing_time = time.time() - start_time
 
+        result = await request_queue.load_result(task) or {}
+        if task.status != TaskStatus.COMPLETED or not result.get("success"):
+            raise RuntimeError(task.error_message or f"任务{task.status.value}")
+        logger.info(f"✅ 同步分析完成 | 任务: {task.task_id} | 耗时: {processing_time:.2f}s | ID: {request_id}")
+        html_file = result.get("html_file")
+        pdf_file = result.get("pdf_file")
+
         # 返回响应
         # 将visualization_report转换为字典
         # 🔑 关键：使用 by_alias=True 确保大数据报告字段使用驼峰命名（camelCase）
         analysis_result_dict = None
+        visualization_report = result.get("visualization_report")
         if visualization_report:
-            if hasattr(visualization_report, 'model_dump'):
-                analysis_result_dict = visualization_report.model_dump(by_alias=True)
-            elif hasattr(visualization_report, 'dict'):
-                analysis_result_dict = visualization_report.dict(by_alias=True)
-            else:
-                analysis_result_dict = visualization_report
+            analysis_result_dict = VisualizationReportData.model_validate(visualization_report).model_dump(by_alias=True)
 
             # 🔍 调试日志：检查report_number和report_date是否存在
             logger.info(f"📊 [数据检查] report_number: {analysis_result_dict.get('report_number', 'NOT FOUND')}")
@@ -318,6 +410,8 @@ async def analyze_document_sync(request: AnalysisRequest, http_request: Request)
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
     except Exception as e:
         logger.error(f"❌ 分析失败: {str(e)} | ID: {request_id}")
         
@@ -352,9 +446,79 @@ async def get_task_status(task_id: str):
         completed_at=task.completed_at,
         processing_time=task.processing_time,
         wait_time=task.wait_time,
-        result=task.result,
+        result=await request_queue.load_result(task),
         error_message=task.error_message,
-        retry_count=task.retry_count
+        retry_count=task.retry_count,
+        **(await request_queue.get_task_eta(task) or {})
+    )
+
+
+@app.get("/task/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """
+    订阅任务进度（Server-Sent Events）
+
+    连接后先推送任务当前状态和已完成的阶段，之后推送状态变化（status 事件）
+    和阶段进度（stage 事件），任务结束（completed/failed/cancelled）后关闭连接。
+    任务结果通过 GET /task/{task_id} 获取。
+
+    Args:
+        task_id: 任务ID
+    """
+    task = await request_queue.get_task_status(task_id)
+
+    if not task:
+        raise HTTPException(
+            status_code=404,
+            detail=f"任务不存在: {task_id}"
+        )
+
+    async def event_stream():
+        event_id = 0
+        # 先订阅再读取当前状态，避免遗漏两者之间发生的状态变化
+        async with task_event_bus.subscribe(task_id) as events:
+            completed_stages = [
+                event for event in task_event_bus.history(task_id) if event.event != EVENT_STATUS
+            ]
+            current = TaskEvent(
+                task_id=task_id,
+                event=EVENT_STATUS,
+                status=task.status.value,
+                data={
+                    "retry_count": task.retry_count,
+                    "started_at": task.started_at,
+                    "completed_at": task.completed_at,
+                    "error_message": task.error_message
+                }
+            )
+            yield current.to_sse(event_id)
+            if task.status in FINISHED_STATUSES:
+                return
+
+            for event in completed_stages:
+                event_id += 1
+                yield event.to_sse(event_id)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=settings.queue.events_keepalive)
+                except asyncio.TimeoutError:
+                    # 心跳注释行，防止代理断开空闲连接
+                    yield ": keep-alive\n\n"
+                    continue
+
+                event_id += 1
+                yield event.to_sse(event_id)
+                if event.is_terminal:
+                    return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
     )
 
 
@@ -383,7 +547,16 @@ async def get_queue_stats():
     获取队列统计信息
     """
     stats = request_queue.get_queue_stats()
-    return QueueStatsResponse(**stats)
+    return QueueStatsResponse(
+        **stats,
+        stages=stage_executor.get_stats(),
+        upstreams=get_upstream_stats(),
+        events=task_event_bus.get_stats(),
+        process_pools={"pdf": pdf_process_pool.get_stats()},
+        markdown_cache=markdown_cache.get_stats() if markdown_cache else None,
+        pdf_hedge=pdf_hedge_stats.get_stats(),
+        event_loop=loop_monitor.get_stats() if loop_monitor else None
+    )
 
 
 @app.get("/logs/stats", response_model=LogStatsResponse)
@@ -502,32 +675,52 @@ async def generate_report(request: AnalysisRequest, http_request: Request):
             "mobile_no": request.mobile_no
         }
 
-        # 添加任务到队列
-        task_id = await request_queue.add_task(task_data)
+        # 添加任务到队列（相同内容或幂等键的重复提交复用已有任务）
+        idempotency_key = request.idempotency_key or http_request.headers.get("Idempotency-Key")
+        task_id, deduplicated = await request_queue.add_task(
+            task_data,
+            idempotency_key=idempotency_key,
+            priority=request.priority,
+            deadline=time.time() + request.deadline_seconds if request.deadline_seconds else None,
+            tenant_id=request.tenant_id,
+            callback_url=request.callback_url,
+            callback_data=request.callback_data
+        )
+        task = await request_queue.get_task_status(task_id)
+
+        if deduplicated:
+            return await _deduplicated_response(task)
 
         # 记录请求开始日志
         if settings.log.algorithm_enable:
             await algorithm_logger.log_request_start(task_id, task_data)
 
-        # 计算预估等待时间
-        queue_stats = request_queue.get_queue_stats()
-        estimated_wait_time = queue_stats["current_queue_size"] * 30  # 假设每个任务平均30秒
+        # 按耗时模型预测等待和完成时间
+        eta = await request_queue.get_task_eta(task) or {}
 
         logger.info(f"任务已提交到队列: {task_id} | "
                    f"类型: {request.report_type} | "
                    f"文件大小: {estimated_file_size // 1024}KB | "
-                   f"队列位置: {queue_stats['current_queue_size']}")
+                   f"队列位置: {eta.get('queue_position')} | "
+                   f"预计等待: {eta.get('estimated_wait_time', 0):.0f}s")
 
         return TaskSubmitResponse(
             success=True,
             task_id=task_id,
             message="任务已成功提交到处理队列",
-            estimated_wait_time=estimated_wait_time,
-            queue_position=queue_stats["current_queue_size"]
+            **eta
         )
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except ValueError as e:
+        # 回调地址不可用等参数错误
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     except RuntimeError as e:
         # 队列相关错误
         raise HTTPException(
@@ -542,6 +735,207 @@ async def generate_report(request: AnalysisRequest, http_request: Request):
         )
 
 
+@app.post("/analysis/batch", response_model=BatchSubmitResponse)
+async def submit_analysis_batch(http_request: Request):
+    """
+    批量提交文档分析任务
+
+    支持两种请求格式：
+    - application/json: BatchAnalysisRequest 清单，每个条目带 file_base64
+    - multipart/form-data: 多个 files 文件字段，批次参数（report_type/max_parallel/priority/deadline_seconds/
+      tenant_id/callback_url）为表单字段；可选的 manifest 字段为条目参数（BatchItemRequest 列表）的 JSON，按 file_name 对应文件
+
+    条目逐个校验并暂存，按 max_parallel 逐个提交到队列。通过 GET /analysis/batch/{batch_id} 查询进度，
+    GET /analysis/batch/{batch_id}/results 获取 NDJSON 结果流。
+    """
+    if not settings.batch.enabled:
+        raise HTTPException(
+            status_code=503,
+            detail="批量提交未启用（BATCH_ENABLED=false）"
+        )
+    try:
+        if http_request.headers.get("content-type", "").startswith("multipart/form-data"):
+            batch = await _ingest_multipart_batch(http_request)
+        else:
+            batch = await _ingest_manifest_batch(http_request)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # 清单格式错误、条目数超过上限、回调地址不可用等
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"批量提交分析任务时发生错误: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"服务器内部错误: {str(e)}"
+        )
+
+    batch_manager.start(batch)
+    rejected = batch.counts().get("rejected", 0)
+    return BatchSubmitResponse(
+        success=True,
+        batch_id=batch.batch_id,
+        message="批次已提交，条目将按并发限制逐个加入处理队列",
+        total=len(batch.items),
+        accepted=len(batch.items) - rejected,
+        rejected=rejected
+    )
+
+
+async def _ingest_manifest_batch(http_request: Request) -> BatchJob:
+    """接收 JSON 清单：逐个校验并暂存条目"""
+    manifest = BatchAnalysisRequest(**(await http_request.json()))
+    batch = batch_manager.create_batch(
+        max_parallel=manifest.max_parallel,
+        priority=manifest.priority,
+        deadline=time.time() + manifest.deadline_seconds if manifest.deadline_seconds else None,
+        tenant_id=manifest.tenant_id,
+        callback_url=manifest.callback_url
+    )
+    try:
+        for item in manifest.items:
+            task_data, error = _batch_task_data(item, manifest.report_type, item.file_base64, item.mime_type)
+            await batch_manager.add_item(batch, task_data, item.file_name, item.callback_data, error)
+            # 已暂存到磁盘，释放请求中的文件内容
+            item.file_base64 = None
+    except Exception:
+        await batch_manager.discard(batch)
+        raise
+    return batch
+
+
+async def _ingest_multipart_batch(http_request: Request) -> BatchJob:
+    """接收 multipart 上传：文件由框架暂存到临时文件，逐个读取、校验并暂存"""
+    form = await http_request.form(max_files=settings.batch.max_items)
+    try:
+        files = [value for value in form.getlist("files") if not isinstance(value, str)]
+        overrides = {}
+        if form.get("manifest"):
+            overrides = {item.file_name: item for item in map(BatchItemRequest.model_validate, json.loads(form["manifest"]))}
+        params = BatchAnalysisRequest(
+            items=[overrides.get(file.filename) or BatchItemRequest(file_name=file.filename) for file in files],
+            report_type=form.get("report_type") or None,
+            max_parallel=form.get("max_parallel") or None,
+            priority=form.get("priority") or 0,
+            deadline_seconds=form.get("deadline_seconds") or None,
+            tenant_id=form.get("tenant_id") or None,
+            callback_url=form.get("callback_url") or None
+        )
+        batch = batch_manager.create_batch(
+            max_parallel=params.max_parallel,
+            priority=params.priority,
+            deadline=time.time() + params.deadline_seconds if params.deadline_seconds else None,
+            tenant_id=params.tenant_id,
+            callback_url=params.callback_url
+        )
+        try:
+            for file, item in zip(files, params.items):
+                content = await file.read(settings.file.max_file_size + 1)
+                file_base64 = base64.b64encode(content).decode("utf-8")
+                del content
+                task_data, error = _batch_task_data(
+                    item, params.report_type, file_base64, item.mime_type or file.content_type, file.filename
+                )
+                del file_base64
+                await batch_manager.add_item(batch, task_data, file.filename, item.callback_data, error)
+        except Exception:
+            await batch_manager.discard(batch)
+            raise
+        return batch
+    finally:
+        await form.close()
+
+
+def _batch_task_data(item: BatchItemRequest, default_report_type: Optional[ReportType],
+                     file_base64: Optional[str], mime_type: Optional[str], file_name: Optional[str] = None):
+    """校验批次条目，返回 (任务数据, 错误原因)；条目未指定文件名时使用上传的文件名"""
+    report_type = item.report_type or default_report_type
+    if not file_base64:
+        return None, "文件内容不能为空"
+    if report_type is None:
+        return None, "未指定报告类型"
+    if len(file_base64) * 3 // 4 > settings.file.max_file_size:
+        return None, f"文件大小超过限制 ({settings.file.max_file_size // (1024*1024)}MB)"
+    if mime_type not in settings.file.allowed_mime_types:
+        return None, f"不支持的文件类型: {mime_type}"
+    return {
+        "file_base64": file_base64,
+        "mime_type": mime_type,
+        "report_type": report_type.value,
+        "custom_prompt": item.custom_prompt,
+        "file_name": item.file_name or file_name,
+        "name": item.name,
+        "id_card": item.id_card,
+        "mobile_no": item.mobile_no
+    }, None
+
+
+def _get_batch_or_404(batch_id: str) -> BatchJob:
+    batch = batch_manager.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(
+            status_code=404,
+            detail=f"批次不存在: {batch_id}"
+        )
+    return batch
+
+
+@app.get("/analysis/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(batch_id: str, items: bool = True):
+    """
+    查询批次进度
+
+    Args:
+        batch_id: 批次ID
+        items: 是否返回各条目的状态
+    """
+    batch = _get_batch_or_404(batch_id)
+    return BatchStatusResponse(
+        **batch.progress(),
+        items=[item.to_dict() for item in batch.items] if items else None
+    )
+
+
+@app.get("/analysis/batch/{batch_id}/results")
+async def stream_batch_results(batch_id: str, include_files: bool = False):
+    """
+    以 NDJSON 流式返回批次各条目的结果（按结束顺序），全部结束后返回批次汇总并关闭连接
+
+    Args:
+        batch_id: 批次ID
+        include_files: 是否包含 HTML 和 PDF（默认只返回分析结果）
+    """
+    batch = _get_batch_or_404(batch_id)
+    return StreamingResponse(
+        batch_manager.stream_results(batch, include_files, keepalive=settings.queue.events_keepalive),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@app.delete("/analysis/batch/{batch_id}")
+async def cancel_batch(batch_id: str):
+    """
+    取消批次：不再提交剩余条目，并取消已提交的未结束任务
+
+    Args:
+        batch_id: 批次ID
+    """
+    _get_batch_or_404(batch_id)
+    if not await batch_manager.cancel(batch_id):
+        raise HTTPException(
+            status_code=409,
+            detail=f"批次已结束: {batch_id}"
+        )
+    return {"message": f"批次已取消: {batch_id}"}
+
+
 @app.post("/income")
 async def income_extraction(request: IncomeRequest):
     """
@@ -582,13 +976,18 @@ async def income_extraction(request: IncomeRequest):
                    f"文件大小: {estimated_file_size // 1024}KB | "
                    f"request_id: {request_id}")
 
-        # 调用收入分析服务
-        result = await income_service.process_document(
-            file_base64=request.file_base64,
-            mime_type=request.mime_type,
-            file_type=request.file_type.value,
-            request_id=request_id
-        )
+        # 调用收入分析服务（处理期间占用准入名额，超出预算时返回 429）
+        with admission_controller.hold(
+            f"income:{request_id}", estimated_file_size, eta_estimator.stage_estimate("income", None).mean
+        ):
+            result = await income_service.process_document(
+                file_base64=request.file_base64,
+                mime_type=request.mime_type,
+                file_type=request.file_type.value,
+                request_id=request_id
+            )
+        if result['success']:
+            eta_estimator.observe("income", None, result['processing_time'])
 
         if result['success']:
             return {
@@ -607,6 +1006,8 @@ async def income_extraction(request: IncomeRequest):
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
     except Exception as e:
         logger.error(f"收入信息提取时发生错误: {str(e)}")
         raise HTTPException(
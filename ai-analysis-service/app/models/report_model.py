@@ -41,6 +41,12 @@ class AnalysisRequest(BaseModel):
     mobile_no: Optional[str] = Field(None, description="手机号码")
     auth_file: Optional[str] = Field(None, description="授权文件")
     customer_info: Optional[CustomerInfo] = Field(None, description="客户群体信息")
+    idempotency_key: Optional[str] = Field(None, description="幂等键，相同幂等键的重复提交返回同一个任务（也可通过 Idempotency-Key 请求头传入）")
+    priority: int = Field(0, ge=0, le=1, description="优先级：0 普通，1 会员（QUEUE_SCHEDULING_POLICY=priority 时优先处理）")
+    deadline_seconds: Optional[float] = Field(None, gt=0, description="期望在提交后多少秒内完成（QUEUE_SCHEDULING_POLICY=edf 时按截止时间排序）")
+    tenant_id: Optional[str] = Field(None, max_length=64, description="租户（机构）ID，即管理后台的 organizationId；各租户按权重公平排队，未指定时归入默认租户")
+    callback_url: Optional[str] = Field(None, max_length=2048, description="任务结束（完成/失败/取消）时 POST 通知的地址，请求头带 HMAC 签名，见 WEBHOOK_* 配置")
+    callback_data: Optional[Dict[str, Any]] = Field(None, description="回调时原样合并到回调内容中的业务数据，例如 {\"reportId\": \"...\"}")
 
     class Config:
         schema_extra = {
@@ -62,6 +68,50 @@ class AnalysisRequest(BaseModel):
             }
         }
 
+class BatchItemRequest(BaseModel):
+    """批量提交中的一份文档（multipart 上传时用于按文件名补充条目参数）"""
+    file_base64: Optional[str] = Field(None, description="文件的base64编码（multipart 上传时为空）")
+    mime_type: Optional[str] = Field(None, description="文件MIME类型")
+    report_type: Optional[ReportType] = Field(None, description="报告类型，未指定时使用批次的 report_type")
+    custom_prompt: Optional[str] = Field(None, description="自定义提示词")
+    file_name: Optional[str] = Field(None, description="文件名")
+    name: Optional[str] = Field(None, description="姓名")
+    id_card: Optional[str] = Field(None, description="身份证号")
+    mobile_no: Optional[str] = Field(None, description="手机号码")
+    callback_data: Optional[Dict[str, Any]] = Field(None, description="该条目回调时原样返回的业务数据")
+
+
+class BatchAnalysisRequest(BaseModel):
+    items: List[BatchItemRequest] = Field(..., min_length=1, description="文档清单")
+    report_type: Optional[ReportType] = Field(None, description="条目未指定报告类型时使用")
+    max_parallel: Optional[int] = Field(None, ge=1, description="同时在队列中（排队或处理中）的条目数，默认 BATCH_DEFAULT_PARALLEL")
+    priority: int = Field(0, ge=0, le=1, description="优先级：0 普通，1 会员")
+    deadline_seconds: Optional[float] = Field(None, gt=0, description="期望在提交后多少秒内完成整个批次")
+    tenant_id: Optional[str] = Field(None, max_length=64, description="租户（机构）ID")
+    callback_url: Optional[str] = Field(None, max_length=2048, description="每个条目结束时回调的地址（回调内容带 batchId/batchIndex）")
+
+
+class BatchSubmitResponse(BaseModel):
+    success: bool = Field(..., description="提交是否成功")
+    batch_id: str = Field(..., description="批次ID")
+    message: str = Field(..., description="提交结果消息")
+    total: int = Field(..., description="条目数")
+    accepted: int = Field(..., description="通过校验、等待提交到队列的条目数")
+    rejected: int = Field(..., description="校验失败的条目数")
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str = Field(..., description="批次ID")
+    status: str = Field(..., description="批次状态：running/completed/cancelled")
+    created_at: float = Field(..., description="创建时间")
+    completed_at: Optional[float] = Field(None, description="结束时间")
+    total: int = Field(..., description="条目数")
+    finished: int = Field(..., description="已结束的条目数")
+    progress: float = Field(..., description="进度（已结束条目数 / 条目数）")
+    counts: Dict[str, int] = Field(..., description="按状态的条目数（waiting 为尚未提交到队列）")
+    items: Optional[List[Dict[str, Any]]] = Field(None, description="各条目的任务ID、状态和错误信息")
+
+
 class FileType(str, Enum):
     FLOW = "social"  # 社保
     SIMPLE = "fund"  # 公积金
@@ -125,8 +175,12 @@ class TaskSubmitResponse(BaseModel):
     success: bool = Field(..., description="提交是否成功")
     task_id: str = Field(..., description="任务ID")
     message: str = Field(..., description="提交结果消息")
+    deduplicated: bool = Field(False, description="是否复用了相同内容的已有任务（进行中或已完成）")
     estimated_wait_time: Optional[float] = Field(None, description="预估等待时间（秒）")
     queue_position: Optional[int] = Field(None, description="队列位置")
+    estimated_start_time: Optional[float] = Field(None, description="预计开始处理时间（时间戳）")
+    estimated_finish_time: Optional[float] = Field(None, description="预计完成时间（时间戳）")
+    estimated_finish_time_p90: Optional[float] = Field(None, description="预计完成时间的90%分位（时间戳）")
 
 
 class TaskStatusResponse(BaseModel):
@@ -140,6 +194,11 @@ class TaskStatusResponse(BaseModel):
     result: Optional[Dict[str, Any]] = Field(None, description="分析结果")
     error_message: Optional[str] = Field(None, description="错误信息")
     retry_count: int = Field(..., description="重试次数")
+    queue_position: Optional[int] = Field(None, description="队列位置（处理中为0，已结束为空）")
+    estimated_wait_time: Optional[float] = Field(None, description="预估剩余等待时间（秒）")
+    estimated_start_time: Optional[float] = Field(None, description="预计开始处理时间（时间戳）")
+    estimated_finish_time: Optional[float] = Field(None, description="预计完成时间（时间戳）")
+    estimated_finish_time_p90: Optional[float] = Field(None, description="预计完成时间的90%分位（时间戳）")
 
 
 class QueueStatsResponse(BaseModel):
@@ -150,7 +209,27 @@ class QueueStatsResponse(BaseModel):
     current_processing: int = Field(..., description="当前处理中任务数")
     queue_capacity: int = Field(..., description="队列容量")
     max_concurrent: int = Field(..., description="最大并发数")
+    current_concurrency_limit: Optional[int] = Field(None, description="当前自适应并发上限")
     is_running: bool = Field(..., description="队列是否运行中")
+    role: Optional[str] = Field(None, description="队列部署角色（all/api/worker）")
+    recovered_requests: int = Field(0, description="重启后从存储恢复的任务数")
+    retried_requests: int = Field(0, description="因可重试错误重新入队的次数")
+    deduplicated_requests: int = Field(0, description="关联到进行中相同任务的重复提交次数")
+    cached_results: int = Field(0, description="直接复用已完成任务结果的重复提交次数")
+    retention: Optional[Dict[str, Any]] = Field(None, description="任务保留策略统计（释放/转存/淘汰次数等）")
+    eta_model: Optional[Dict[str, Any]] = Field(None, description="耗时预测模型统计（画像数、样本数、各阶段平均耗时）")
+    admission: Optional[Dict[str, Any]] = Field(None, description="准入控制统计（在途数据量、预计等待、拒绝次数）")
+    scheduler: Optional[Dict[str, Any]] = Field(None, description="出队调度统计（紧急/普通通道排队数和出队次数）")
+    tenants: Optional[Dict[str, Any]] = Field(None, description="按租户的排队数、处理中任务数、权重/配额和延迟统计")
+    webhooks: Optional[Dict[str, Any]] = Field(None, description="任务完成回调统计（送达/重试/放弃次数、发件箱各状态数量）")
+    stages: Optional[Dict[str, Any]] = Field(None, description="各处理阶段的并发、排队和吞吐量统计")
+    concurrency: Optional[Dict[str, Any]] = Field(None, description="全局自适应并发限流统计（当前上限、调整记录）")
+    upstreams: Optional[Dict[str, Any]] = Field(None, description="各上游服务的自适应并发限流统计")
+    events: Optional[Dict[str, Any]] = Field(None, description="任务进度推送统计（订阅数、推送/丢弃事件数）")
+    event_loop: Optional[Dict[str, Any]] = Field(None, description="事件循环延迟统计（延迟分位数、阻塞次数和最近一次阻塞的位置）")
+    process_pools: Optional[Dict[str, Any]] = Field(None, description="CPU 密集型任务进程池统计（PDF解析的工作进程数、执行中任务数、重建次数）")
+    pdf_hedge: Optional[Dict[str, Any]] = Field(None, description="PDF转Markdown对冲执行统计（疑似扫描件的本地解析/OCR 胜出次数、对冲命中率、节省的时间）")
+    markdown_cache: Optional[Dict[str, Any]] = Field(None, description="PDF转Markdown结果缓存统计（命中率、条目数、占用空间、淘汰次数），关闭时为空")
 
 
 class LogStatsResponse(BaseModel):
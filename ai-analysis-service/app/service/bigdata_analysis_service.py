@@ -11,7 +11,8 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 import json
 import base64
-import requests
+import asyncio
+import httpx
 from loguru import logger
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
@@ -19,6 +20,7 @@ from Crypto.Random import get_random_bytes
 
 from models.bigdata_model import BigDataResponse, COMBHZY2Request
 from config.settings import settings
+from utils.task_context import remaining_timeout
 
 
 
@@ -76,7 +78,7 @@ class BigdataAnalysisService:
         padded_data = cipher.decrypt(ciphertext)
         return unpad(padded_data, AES.block_size).decode('utf-8')
     
-    def call_api(self, params: COMBHZY2Request) -> BigDataResponse | None:
+    async def call_api(self, params: COMBHZY2Request) -> BigDataResponse | None:
         """
         发送API请求并返回解析后的数据
 
@@ -102,7 +104,8 @@ class BigdataAnalysisService:
         payload = {"data": encrypted_data}
 
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            async with httpx.AsyncClient(timeout=remaining_timeout(30)) as client:
+                response = await client.post(url, json=payload, headers=headers)
             response.raise_for_status()  # 抛出HTTP错误
 
             response_data = response.json()
@@ -135,7 +138,7 @@ if __name__ == "__main__":
             authorization_url="https://7a69-zixinmao-6gze9a8pef07503b-1352083304.tcb.qcloud.la/auth_file/ogbda185lMsnyVJ6mEgWGhdwm9DE/20251120_113956_%E4%B8%81%E6%B6%9B_%E6%8E%88%E6%9D%83%E4%B9%A6.pdf"
         )
         bigdata_service = BigdataAnalysisService()
-        result = bigdata_service.call_api(request)
+        result = asyncio.run(bigdata_service.call_api(request))
         if result:
             logger.info(f"✅ 调用成功: {result}")
         else:
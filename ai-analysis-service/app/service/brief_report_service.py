@@ -9,6 +9,7 @@
 """
 import os
 import time
+import asyncio
 import tempfile
 from typing import Dict, Any, Optional
 from datetime import datetime
@@ -17,10 +18,20 @@ from pathlib import Path
 from loguru import logger
 from pydantic import ValidationError
 import json
-import subprocess
 from playwright.async_api import async_playwright
 
 from config.settings import settings
+from utils.stage_executor import (
+    stage_executor, STAGE_MARKDOWN, STAGE_DIFY, STAGE_BIGDATA, STAGE_CONVERT, STAGE_HTML, STAGE_PDF
+)
+from utils.checkpoint import (
+    TaskCheckpoint, CHECKPOINT_MARKDOWN, CHECKPOINT_DIFY, CHECKPOINT_BIGDATA,
+    CHECKPOINT_VISUALIZATION, CHECKPOINT_HTML
+)
+from utils.errors import RetryableError, UpstreamHTTPError, DeadlineExceeded, TaskCancelled, is_retryable
+from utils.task_context import remaining_timeout, stage_metrics
+from utils.adaptive_limiter import upstream_limiters, UPSTREAM_DIFY, UPSTREAM_BIGDATA, UPSTREAM_LLM
+from utils.task_events import task_event_bus
 from app.models.visualization_model import VisualizationReportData
 from app.models.report_model import *
 from app.models.dify_model import DifyWorkflowOutput
@@ -56,6 +67,7 @@ class BriefReportService:
         self,
         analysisRequest: AnalysisRequest,
         request_id: Optional[str] = None,
+        checkpoint: Optional[TaskCheckpoint] = None,
     ) -> Dict[str, Any]:
         """
         生成征信报告分析
@@ -69,6 +81,7 @@ class BriefReportService:
             file_base64: 文件的base64编码（与markdown_content二选一）
             markdown_content: Markdown格式的文档内容（与file_base64二选一）
             request_id: 请求ID，用于日志追踪
+            checkpoint: 任务检查点（可选），重试时跳过已完成的阶段
             file_name: 文件名
             customer_info: 客户信息（包含includeProductMatch等字段）
 
@@ -92,51 +105,93 @@ class BriefReportService:
         file_name=analysisRequest.file_name or "document.pdf"
         customer_info = analysisRequest.customer_info
 
-        try:
-            # 步骤1: 准备Markdown内容
-            markdown_content = await self._prepare_markdown_content(
-                file_base64, markdown_content, file_name, request_id
+        # 已有可视化数据检查点时，直接从HTML渲染继续
+        visualization_report = None
+        if checkpoint:
+            visualization_report = await checkpoint.load_model(CHECKPOINT_VISUALIZATION, VisualizationReportData)
+            if visualization_report is not None:
+                for stage in (STAGE_MARKDOWN, STAGE_DIFY, STAGE_BIGDATA, STAGE_CONVERT):
+                    task_event_bus.publish_stage(request_id, stage, resumed=True)
+
+        # 按依赖关系执行：
+        #   大数据(天远) ─────────────────────────────┐
+        #   Markdown → Dify → 征信部分转换(含LLM增强) ─┴→ 合并 → HTML → PDF
+        # 天远接口只依赖姓名/身份证/手机号/授权书，请求到达后立即开始，与PDF解析和Dify并行
+        bigdata_task = None
+        if visualization_report is None:
+            bigdata_task = asyncio.create_task(
+                self._fetch_bigdata_report(analysisRequest, request_id, checkpoint)
             )
+            # 无论是否被等待，都取出天远任务的异常，避免 "Task exception was never retrieved"
+            bigdata_task.add_done_callback(self._consume_task_exception)
 
-            # 步骤2: 调用Dify工作流进行AI分析
-            dify_output = await self._call_dify_workflow(markdown_content, request_id)
-
-            # 步骤3：调用大数据分析服务
-            bigdata_service = BigdataAnalysisService()
-            combhzy2Request = COMBHZY2Request(
-                mobile_no=analysisRequest.mobile_no,
-                id_card=analysisRequest.id_card,
-                name=analysisRequest.name,
-                authorization_url=analysisRequest.auth_file
-            )
-            bigdata_report = bigdata_service.call_api(combhzy2Request)
-            # bigdata_report = example_create_report()
+        try:
+            if visualization_report is None:
+                # 步骤1: 准备Markdown内容
+                cached_markdown = await checkpoint.load_text(CHECKPOINT_MARKDOWN) if checkpoint else None
+                if cached_markdown is not None:
+                    markdown_content = cached_markdown
+                else:
+                    markdown_content = await self._prepare_markdown_content(
+                        file_base64, markdown_content, file_name, request_id,
+                        report_type=analysisRequest.report_type.value if analysisRequest.report_type else None
+                    )
+                    if checkpoint:
+                        await checkpoint.save_text(CHECKPOINT_MARKDOWN, markdown_content)
+                task_event_bus.publish_stage(
+                    request_id, STAGE_MARKDOWN, resumed=cached_markdown is not None, **stage_metrics(STAGE_MARKDOWN)
+                )
 
-            # 如果大数据API调用失败，使用默认值
-            if bigdata_report is None:
-                logger.warning(f"⚠️ [步骤3] 大数据API调用失败，使用默认值, request_id: {request_id}")
-                bigdata_report = self._get_default_bigdata_report(analysisRequest)
+                # 步骤2: 调用Dify工作流进行AI分析
+                dify_output = await checkpoint.load_model(CHECKPOINT_DIFY, DifyWorkflowOutput) if checkpoint else None
+                dify_resumed = dify_output is not None
+                if dify_output is None:
+                    dify_output = await stage_executor.run(
+                        STAGE_DIFY, self._call_dify_workflow, markdown_content, request_id
+                    )
+                    if dify_output is None:
+                        raise RetryableError("Dify工作流未返回有效输出")
+                    if checkpoint:
+                        await checkpoint.save_model(CHECKPOINT_DIFY, dify_output)
+                task_event_bus.publish_stage(request_id, STAGE_DIFY, resumed=dify_resumed)
+
+                # 步骤3: 征信部分转换、产品推荐和AI专家分析（只依赖Dify输出，不等待大数据）
+                credit_sections = await stage_executor.run(
+                    STAGE_CONVERT, self._convert_credit_sections, dify_output, request_id, analysisRequest
+                )
+                task_event_bus.publish_stage(request_id, STAGE_CONVERT)
 
-            # 步骤4: 解析并转换结果
-            processing_time = time.time() - start_time
-            # 使用转换器将Dify数据转换为可视化格式
-            visualization_report = DifyToVisualizationConverter.convert(
-                bigdata_report, dify_output, request_id, analysisRequest
-            )
+                # 步骤4: 等待大数据结果并合并为可视化格式
+                bigdata_report = await bigdata_task
+                visualization_report = DifyToVisualizationConverter.assemble(
+                    credit_sections, bigdata_report, request_id
+                )
+                if checkpoint:
+                    await checkpoint.save_model(CHECKPOINT_VISUALIZATION, visualization_report)
 
-            logger.info(f"✅ [步骤4] Dify数据转换为可视化格式成功, 耗时: {processing_time:.2f}s, request_id: {request_id}")
+                processing_time = time.time() - start_time
+                logger.info(f"✅ [步骤4] Dify数据转换为可视化格式成功, 耗时: {processing_time:.2f}s, request_id: {request_id}")
 
             # 步骤5: 生成html报告
-            html_file = await self.generate_html_file(
-                visualization_report=visualization_report,
-                report_type="simple"
-            )
+            html_file = await checkpoint.load_text(CHECKPOINT_HTML) if checkpoint else None
+            html_resumed = html_file is not None
+            if html_file is None:
+                html_file = await stage_executor.run(
+                    STAGE_HTML, self.generate_html_file,
+                    visualization_report=visualization_report,
+                    report_type="simple"
+                )
+                if checkpoint:
+                    await checkpoint.save_text(CHECKPOINT_HTML, html_file)
+            task_event_bus.publish_stage(request_id, STAGE_HTML, resumed=html_resumed)
 
             # 步骤6: 生成pdf报告
-            pdf_file = await self.generate_pdf_file(
-                                    html_content=html_file,
-                                    pdf_filename=analysisRequest.file_name or "report.pdf"
-                                )
+            pdf_file = await stage_executor.run(
+                STAGE_PDF, self.generate_pdf_file,
+                html_content=html_file,
+                pdf_filename=analysisRequest.file_name or "report.pdf"
+            )
+            task_event_bus.publish_stage(request_id, STAGE_PDF)
 
             return visualization_report, html_file, pdf_file
 
@@ -144,8 +199,98 @@ class BriefReportService:
             processing_time = time.time() - start_time
             error_msg = f'分析处理失败: {str(e)}, 处理时间: {processing_time:.2f}s'
             logger.error(f"❌ {error_msg}, request_id: {request_id}")
+            if bigdata_task and checkpoint and is_retryable(e):
+                # 任务将重试：付费的天远调用已经发出，等待其结束并保存检查点，重试时不再重复调用
+                await self._settle_bigdata_task(bigdata_task, request_id)
             raise
 
+        finally:
+            # 不可重试的失败或任务被取消时，不再等待大数据结果
+            if bigdata_task and not bigdata_task.done():
+                bigdata_task.cancel()
+
+    @staticmethod
+    async def _settle_bigdata_task(bigdata_task: asyncio.Task, request_id: Optional[str]):
+        """等待进行中的天远任务结束（最长 STAGE_BIGDATA_SETTLE_TIMEOUT，不超过任务剩余时间）"""
+        if bigdata_task.done():
+            return
+        try:
+            timeout = remaining_timeout(settings.stage.bigdata_settle_timeout)
+        except (DeadlineExceeded, TaskCancelled):
+            return
+        logger.info(f"⏳ [大数据] 等待进行中的天远调用结束后重试, 最长 {timeout:.0f}s, request_id: {request_id}")
+        done, _ = await asyncio.wait({bigdata_task}, timeout=timeout)
+        if not done:
+            logger.warning(f"⚠️ [大数据] 天远调用未在 {timeout:.0f}s 内结束，重试时将重新调用, request_id: {request_id}")
+
+    @staticmethod
+    def _consume_task_exception(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"天远大数据任务异常: {task.exception()}")
+
+    async def _fetch_bigdata_report(
+        self,
+        analysisRequest: AnalysisRequest,
+        request_id: Optional[str],
+        checkpoint: Optional[TaskCheckpoint] = None
+    ) -> 'BigDataResponse':
+        """
+        调用天远大数据接口，失败时返回默认报告
+
+        Args:
+            analysisRequest: 分析请求对象
+            request_id: 请求ID
+            checkpoint: 任务检查点（可选），已有结果时不再重复调用付费接口
+
+        Returns:
+            BigDataResponse对象
+        """
+        if checkpoint:
+            bigdata_report = await checkpoint.load_model(CHECKPOINT_BIGDATA, BigDataResponse)
+            if bigdata_report is not None:
+                task_event_bus.publish_stage(request_id, STAGE_BIGDATA, resumed=True)
+                return bigdata_report
+
+        logger.info(f"🔄 [大数据] 调用天远大数据接口, request_id: {request_id}")
+        bigdata_service = BigdataAnalysisService()
+        combhzy2Request = COMBHZY2Request(
+            mobile_no=analysisRequest.mobile_no,
+            id_card=analysisRequest.id_card,
+            name=analysisRequest.name,
+            authorization_url=analysisRequest.auth_file
+        )
+        bigdata_report = await stage_executor.run(
+            STAGE_BIGDATA, self._call_bigdata_api, bigdata_service, combhzy2Request
+        )
+        # bigdata_report = example_create_report()
+
+        # 如果大数据API调用失败，使用默认值（默认值不保存检查点，重试时重新调用接口）
+        if bigdata_report is None:
+            logger.warning(f"⚠️ [大数据] 大数据API调用失败，使用默认值, request_id: {request_id}")
+            task_event_bus.publish_stage(request_id, STAGE_BIGDATA, fallback=True)
+            return self._get_default_bigdata_report(analysisRequest)
+
+        if checkpoint:
+            await checkpoint.save_model(CHECKPOINT_BIGDATA, bigdata_report)
+        task_event_bus.publish_stage(request_id, STAGE_BIGDATA)
+        return bigdata_report
+
+    @staticmethod
+    async def _call_bigdata_api(bigdata_service: BigdataAnalysisService, request: COMBHZY2Request):
+        """在天远大数据限流器内调用接口"""
+        async with upstream_limiters[UPSTREAM_BIGDATA].slot():
+            return await bigdata_service.call_api(request)
+
+    @staticmethod
+    async def _convert_credit_sections(
+        dify_output: DifyWorkflowOutput,
+        request_id: Optional[str],
+        analysisRequest: AnalysisRequest
+    ) -> Dict[str, Any]:
+        """在大模型限流器内执行征信部分转换（包含产品推荐和专家分析的大模型调用）"""
+        async with upstream_limiters[UPSTREAM_LLM].slot():
+            return await DifyToVisualizationConverter.convert_credit_sections(dify_output, request_id, analysisRequest)
+
     # ==================== 核心处理方法 ====================
 
     async def _prepare_markdown_content(
@@ -153,7 +298,8 @@ class BriefReportService:
         file_base64: Optional[str],
         markdown_content: Optional[str],
         file_name: str,
-        request_id: Optional[str]
+        request_id: Optional[str],
+        report_type: Optional[str] = None
     ) -> str:
         """
         准备Markdown内容
@@ -163,6 +309,7 @@ class BriefReportService:
             markdown_content: 已有的Markdown内容
             file_name: 文件名
             request_id: 请求ID
+            report_type: 报告类型（用于选择PDF本地解析引擎）
 
         Returns:
             Markdown格式的内容
@@ -180,10 +327,15 @@ class BriefReportService:
         logger.info(f"🔄 [步骤1] 将PDF转换为Markdown, 文件: {file_name}, request_id: {request_id}")
         from app.service.document_service import DocumentService
         doc_service = DocumentService()
-        markdown_content = await doc_service.process_document(
+        markdown_content = await stage_executor.run(
+            STAGE_MARKDOWN, doc_service.process_document,
             file_name=file_name,
             file_base64=file_base64,
+            report_type=report_type,
         )
+        if not markdown_content:
+            # 解析和OCR均失败（多为OCR服务超时或不可用），允许重试
+            raise RetryableError("PDF转Markdown失败，未获得有效内容")
         logger.info(f"✅ [步骤1] PDF转Markdown完成, 长度: {len(markdown_content):,}, request_id: {request_id}")
         return markdown_content
 
@@ -215,18 +367,19 @@ class BriefReportService:
 
         logger.debug(f"📤 [Dify] 请求数据已准备, request_id: {request_id}")
 
-        async with httpx.AsyncClient(timeout=self.dify_timeout) as client:
-            response = await client.post(
-                self.dify_workflow_url,
-                json=request_data,
-                headers={
-                    'Authorization': self.dify_api_key,
-                    'Content-Type': 'application/json'
-                }
-            )
+        async with upstream_limiters[UPSTREAM_DIFY].slot():
+            async with httpx.AsyncClient(timeout=remaining_timeout(self.dify_timeout)) as client:
+                response = await client.post(
+                    self.dify_workflow_url,
+                    json=request_data,
+                    headers={
+                        'Authorization': self.dify_api_key,
+                        'Content-Type': 'application/json'
+                    }
+                )
 
-        if response.status_code != 200:
-            raise Exception(f'Dify API调用失败: HTTP {response.status_code}, {response.text}')
+            if response.status_code != 200:
+                raise UpstreamHTTPError("Dify API", response.status_code, response.text[:500])
 
         logger.info(f"✅ [步骤2] Dify工作流响应成功, request_id: {request_id}")
 
@@ -358,8 +511,7 @@ class BriefReportService:
             # 1. 读取 JS 模板
             # ---------------------------------------------------------------------
             try:
-                with open(self.template_path, 'r', encoding='utf-8') as f:
-                    template_code = f.read()
+                template_code = await asyncio.to_thread(self.template_path.read_text, encoding='utf-8')
                 logger.debug(f"模板读取成功, 大小: {len(template_code):,}")
             except Exception as e:
                 raise RuntimeError(f"无法读取模板文件: {self.template_path}: {str(e)}")
@@ -399,46 +551,62 @@ class BriefReportService:
             # ---------------------------------------------------------------------
             # 4. 检查 Node 是否可用
             # ---------------------------------------------------------------------
-            import subprocess
-            try:
-                subprocess.run(
-                    ["node", "--version"],
-                    capture_output=True,
-                    check=True,
-                    timeout=5,
-                )
-            except Exception as e:
-                raise RuntimeError("Node.js 未安装或不可用。") from e
+            await self._check_node()
 
             # ---------------------------------------------------------------------
-            # 5. 执行 JS → 输出 HTML
+            # 5. 执行 JS → 输出 HTML（超时、任务取消或超过截止时间时结束 Node 进程）
             # ---------------------------------------------------------------------
+            timeout = remaining_timeout(30)
+            process = await asyncio.create_subprocess_exec(
+                "node", "-e", js_code,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
             try:
-                result = subprocess.run(
-                    ["node", "-e", js_code],
-                    capture_output=True,
-                    text=True,
-                    encoding="utf-8",
-                    timeout=30,
-                )
-
-                if result.returncode != 0:
-                    raise RuntimeError(f"Node 执行失败: {result.stderr}")
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"Node.js 执行超时（{timeout:.0f}秒）")
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
 
-                html = result.stdout.strip()
-                logger.info(f"HTML 生成成功, 长度: {len(html):,}")
-                return html
+            if process.returncode != 0:
+                raise RuntimeError(f"执行 JavaScript 失败: Node 执行失败: {stderr.decode('utf-8', errors='replace')}")
 
-            except subprocess.TimeoutExpired:
-                raise RuntimeError("Node.js 执行超时（30秒）")
-
-            except Exception as e:
-                raise RuntimeError(f"执行 JavaScript 失败: {str(e)}") from e
+            html = stdout.decode("utf-8").strip()
+            logger.info(f"HTML 生成成功, 长度: {len(html):,}")
+            return html
 
         except Exception as e:
             logger.error(f"❌ 生成 HTML 失败: {str(e)}")
             raise
 
+    _node_checked = False
+
+    @classmethod
+    async def _check_node(cls):
+        """检查 Node 是否可用（进程内只检查一次）"""
+        if cls._node_checked:
+            return
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "node", "--version",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                await asyncio.wait_for(process.communicate(), timeout=5)
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+            if process.returncode != 0:
+                raise RuntimeError(f"node --version 返回 {process.returncode}")
+        except Exception as e:
+            raise RuntimeError("Node.js 未安装或不可用。") from e
+        cls._node_checked = True
+
     async def generate_pdf_file(
             self,
             html_content: str,
@@ -489,80 +657,11 @@ class BriefReportService:
                                     "--start-maximized"
                                 ]
                             )
-
-                            # 创建上下文和页面
-                            context = await browser.new_context(
-                                viewport={"width": 1920, "height": 1080},
-                                device_scale_factor=2
-                            )
-                            page = await context.new_page()
-
-                            # 加载HTML文件
-                            absolute_html_path = os.path.abspath(html_path)
-                            await page.goto(f"file://{absolute_html_path}")
-
-                            # 注入CSS以优化PDF分页
-                            await page.add_style_tag(content="""
-                                @media print {
-                                    * {
-                                        -webkit-print-color-adjust: exact !important;
-                                        print-color-adjust: exact !important;
-                                        visibility: visible !important;
-                                    }
-                                    body {
-                                        width: 100% !important;
-                                        margin: 0 !important;
-                                    }
-                                    .loan-debt-analysis,
-                                    .loan-debt-analysis .chart-container,
-                                    .loan-debt-analysis table,
-                                    .loan-debt-analysis * {
-                                        page-break-inside: avoid !important;
-                                        page-break-before: avoid !important;
-                                        page-break-after: avoid !important;
-                                        width: 100% !important;
-                                    }
-                                    table {
-                                        page-break-inside: avoid !important;
-                                        width: 100% !important;
-                                    }
-                                }
-                                @media screen {
-                                    body {
-                                        width: 1920px;
-                                        margin: 0 auto;
-                                    }
-                                }
-                            """)
-
-                            # 等待页面加载完成
-                            await page.wait_for_load_state("networkidle", timeout=5000)
                             try:
-                                await page.wait_for_selector(".charts-container", state="visible", timeout=3000)
-                                await page.wait_for_selector(".charts-container .chart-container", state="visible", timeout=3000)
-                            except Exception:
-                                # 如果选择器不存在，继续处理
-                               logger.warning("⚠️ 页面选择器未找到，继续处理")
-
-                            await page.wait_for_timeout(3000)
-
-                            # 生成PDF
-                            pdf_bytes = await page.pdf(
-                                path=pdf_path,
-                                width="508mm",
-                                height="400mm",
-                                margin={
-                                    "top": "0.5cm",
-                                    "right": "0.5cm",
-                                    "bottom": "0.5cm",
-                                    "left": "0.5cm"
-                                },
-                                print_background=True,
-                                prefer_css_page_size=False,
-                                landscape=False
-                            )
-
-                            await browser.close()
+                                await self._render_pdf(browser, html_path, pdf_path)
+                            finally:
+                                # 任务取消、超过截止时间或渲染失败时也关闭浏览器，避免残留 Chromium 进程
+                                await browser.close()
 
                         # 读取PDF文件内容
                         with open(pdf_path, 'rb') as f:
@@ -581,9 +680,92 @@ class BriefReportService:
                     if os.path.exists(html_path):
                         os.remove(html_path)
 
+            except (DeadlineExceeded, TaskCancelled):
+                raise
             except ImportError as e:
                 logger.error(f"❌ Playwright库未安装: {str(e)}")
                 raise RuntimeError(f"Playwright库未安装，请运行: pip install playwright") from e
             except Exception as e:
                 logger.error(f"❌ HTML转PDF失败: {str(e)}")
                 raise RuntimeError(f"HTML转PDF失败: {str(e)}") from e
+
+    @staticmethod
+    async def _render_pdf(browser, html_path: str, pdf_path: str) -> bytes:
+        """在浏览器中加载HTML并打印PDF，各步骤的等待时间不超过任务剩余时间"""
+        # 创建上下文和页面
+        context = await browser.new_context(
+            viewport={"width": 1920, "height": 1080},
+            device_scale_factor=2
+        )
+        page = await context.new_page()
+        page.set_default_timeout(remaining_timeout(30) * 1000)
+
+        # 加载HTML文件
+        absolute_html_path = os.path.abspath(html_path)
+        await page.goto(f"file://{absolute_html_path}")
+
+        # 注入CSS以优化PDF分页
+        await page.add_style_tag(content="""
+            @media print {
+                * {
+                    -webkit-print-color-adjust: exact !important;
+                    print-color-adjust: exact !important;
+                    visibility: visible !important;
+                }
+                body {
+                    width: 100% !important;
+                    margin: 0 !important;
+                }
+                .loan-debt-analysis,
+                .loan-debt-analysis .chart-container,
+                .loan-debt-analysis table,
+                .loan-debt-analysis * {
+                    page-break-inside: avoid !important;
+                    page-break-before: avoid !important;
+                    page-break-after: avoid !important;
+                    width: 100% !important;
+                }
+                table {
+                    page-break-inside: avoid !important;
+                    width: 100% !important;
+                }
+            }
+            @media screen {
+                body {
+                    width: 1920px;
+                    margin: 0 auto;
+                }
+            }
+        """)
+
+        # 等待页面加载完成
+        await page.wait_for_load_state("networkidle", timeout=remaining_timeout(5) * 1000)
+        try:
+            await page.wait_for_selector(".charts-container", state="visible", timeout=remaining_timeout(3) * 1000)
+            await page.wait_for_selector(
+                ".charts-container .chart-container", state="visible", timeout=remaining_timeout(3) * 1000
+            )
+        except (DeadlineExceeded, TaskCancelled):
+            raise
+        except Exception:
+            # 如果选择器不存在，继续处理
+            logger.warning("⚠️ 页面选择器未找到，继续处理")
+
+        # 等待图表动画完成
+        await page.wait_for_timeout(remaining_timeout(3) * 1000)
+
+        # 生成PDF
+        return await page.pdf(
+            path=pdf_path,
+            width="508mm",
+            height="400mm",
+            margin={
+                "top": "0.5cm",
+                "right": "0.5cm",
+                "bottom": "0.5cm",
+                "left": "0.5cm"
+            },
+            print_background=True,
+            prefer_css_page_size=False,
+            landscape=False
+        )
@@ -22,7 +22,7 @@ class DifyToVisualizationConverter:
     """Dify数据到可视化数据的转换器"""
 
     @staticmethod
-    def convert(bigdata_report: BigDataResponse, dify_output: DifyWorkflowOutput, request_id: str = None,  analysisRequest: AnalysisRequest = None) -> VisualizationReportData:
+    async def convert(bigdata_report: BigDataResponse, dify_output: DifyWorkflowOutput, request_id: str = None,  analysisRequest: AnalysisRequest = None) -> VisualizationReportData:
         """
         将Dify工作流输出转换为可视化报告数据
 
@@ -34,6 +34,26 @@ class DifyToVisualizationConverter:
         Returns:
             可视化报告数据Pydantic对象
         """
+        credit_sections = await DifyToVisualizationConverter.convert_credit_sections(
+            dify_output, request_id, analysisRequest
+        )
+        return DifyToVisualizationConverter.assemble(credit_sections, bigdata_report, request_id)
+
+    @staticmethod
+    async def convert_credit_sections(dify_output: DifyWorkflowOutput, request_id: str = None, analysisRequest: AnalysisRequest = None) -> Dict[str, Any]:
+        """
+        转换征信报告相关部分（含产品推荐和AI专家分析）
+
+        只依赖Dify工作流输出，不依赖大数据报告，可以与天远大数据接口并行执行
+
+        Args:
+            dify_output: Dify工作流输出数据
+            request_id: 请求ID
+            analysisRequest: 分析请求（用于产品推荐）
+
+        Returns:
+            VisualizationReportData 的征信部分字段
+        """
         try:
             logger.info(f"🔄 [Dify转换] 开始转换Dify数据, request_id: {request_id}")
 
@@ -92,7 +112,7 @@ class DifyToVisualizationConverter:
 
             # 10. 生成产品推荐（基于分析结果）
             if analysisRequest.customer_info is not None and analysisRequest.customer_info.includeProductMatch:
-                product_recommendations = DifyToVisualizationConverter._generate_product_recommendations(
+                product_recommendations = await DifyToVisualizationConverter._generate_product_recommendations(
                     personal_info, stats, debt_composition, bank_loans, non_bank_loans,
                     loan_summary, credit_cards, credit_usage, overdue_analysis, query_records,
                     analysisRequest,dify_output
@@ -100,8 +120,8 @@ class DifyToVisualizationConverter:
             else:
                 product_recommendations = None
 
-            # 11. 生成AI专家分析
-            ai_expert_analysis = DifyToVisualizationConverter._generate_ai_analysis(
+            # 11. 生成AI专家分析（提示词包含产品推荐结果，需在推荐之后）
+            ai_expert_analysis = await DifyToVisualizationConverter._generate_ai_analysis(
                 personal_info, stats, debt_composition, bank_loans, non_bank_loans,
                 loan_summary, credit_cards, credit_usage, overdue_analysis, query_records,
                 product_recommendations
@@ -111,45 +131,62 @@ class DifyToVisualizationConverter:
             loan_charts = \
                 DifyToVisualizationConverter._generate_loan_chart_data(dify_output.loan_details)
 
-            # 生成报告编号和日期（统一格式）
-            now = datetime.now()
-            report_date = now.strftime("%Y-%m-%d")
-            report_number = now.strftime("%Y%m%d%H%M%S")
-            
-            # 构建完整的可视化数据Pydantic对象
-            visualization_report = VisualizationReportData(
-                report_number=report_number,
-                report_date=report_date,
-                personal_info=personal_info,
-                stats=stats,
-                debt_composition=debt_composition,
-                bank_loans=bank_loans,
-                non_bank_loans=non_bank_loans,
-                loan_summary=loan_summary,
-                credit_cards=credit_cards,
-                credit_usage=credit_usage,
-                overdue_analysis=overdue_analysis,
-                query_records=query_records,
-                product_recommendations=product_recommendations,
-                ai_expert_analysis=ai_expert_analysis,
-                loan_charts=loan_charts,
-                query_charts=query_records,
-                report_summary=bigdata_report.report_summary.model_dump() if bigdata_report.report_summary else None,
-                basic_info=bigdata_report.basic_info.model_dump() if bigdata_report.basic_info else None,
-                risk_identification=bigdata_report.risk_identification.model_dump() if bigdata_report.risk_identification else None,
-                credit_assessment=bigdata_report.credit_assessment.model_dump() if bigdata_report.credit_assessment else None,
-                leasing_risk_assessment=bigdata_report.leasing_risk_assessment.model_dump() if bigdata_report.leasing_risk_assessment else None,
-                comprehensive_analysis=bigdata_report.comprehensive_analysis,
-                report_footer=bigdata_report.report_footer.model_dump() if bigdata_report.report_footer else None
-            )
-
-            logger.info(f"✅ [Dify转换] 转换完成, request_id: {request_id}")
-            return visualization_report
+            return {
+                "personal_info": personal_info,
+                "stats": stats,
+                "debt_composition": debt_composition,
+                "bank_loans": bank_loans,
+                "non_bank_loans": non_bank_loans,
+                "loan_summary": loan_summary,
+                "credit_cards": credit_cards,
+                "credit_usage": credit_usage,
+                "overdue_analysis": overdue_analysis,
+                "query_records": query_records,
+                "product_recommendations": product_recommendations,
+                "ai_expert_analysis": ai_expert_analysis,
+                "loan_charts": loan_charts,
+                "query_charts": query_records,
+            }
 
         except Exception as e:
             logger.error(f"❌ [Dify转换] 转换失败: {str(e)}, request_id: {request_id}")
             raise
 
+    @staticmethod
+    def assemble(credit_sections: Dict[str, Any], bigdata_report: BigDataResponse, request_id: str = None) -> VisualizationReportData:
+        """
+        合并征信部分与大数据报告，生成完整的可视化报告数据
+
+        Args:
+            credit_sections: convert_credit_sections 的结果
+            bigdata_report: 天远大数据报告
+            request_id: 请求ID
+
+        Returns:
+            可视化报告数据Pydantic对象
+        """
+        # 生成报告编号和日期（统一格式）
+        now = datetime.now()
+        report_date = now.strftime("%Y-%m-%d")
+        report_number = now.strftime("%Y%m%d%H%M%S")
+
+        # 构建完整的可视化数据Pydantic对象
+        visualization_report = VisualizationReportData(
+            report_number=report_number,
+            report_date=report_date,
+            **credit_sections,
+            report_summary=bigdata_report.report_summary.model_dump() if bigdata_report.report_summary else None,
+            basic_info=bigdata_report.basic_info.model_dump() if bigdata_report.basic_info else None,
+            risk_identification=bigdata_report.risk_identification.model_dump() if bigdata_report.risk_identification else None,
+            credit_assessment=bigdata_report.credit_assessment.model_dump() if bigdata_report.credit_assessment else None,
+            leasing_risk_assessment=bigdata_report.leasing_risk_assessment.model_dump() if bigdata_report.leasing_risk_assessment else None,
+            comprehensive_analysis=bigdata_report.comprehensive_analysis,
+            report_footer=bigdata_report.report_footer.model_dump() if bigdata_report.report_footer else None
+        )
+
+        logger.info(f"✅ [Dify转换] 转换完成, request_id: {request_id}")
+        return visualization_report
+
     @staticmethod
     def _convert_personal_info(basic_info: DifyBasicInfo) -> PersonalInfo:
         """转换个人信息"""
@@ -706,7 +743,7 @@ class DifyToVisualizationConverter:
         return result
 
     @staticmethod
-    def _generate_product_recommendations(
+    async def _generate_product_recommendations(
         personal_info: PersonalInfo,
         stats: StatCard,
         debt_composition: List[DebtItem],
@@ -729,7 +766,7 @@ class DifyToVisualizationConverter:
             recommendation_service = ProductRecommendService()
 
             # 调用服务生成推荐
-            recommendations = recommendation_service.generate_recommendations(
+            recommendations = await recommendation_service.generate_recommendations(
                 personal_info=personal_info,
                 stats=stats,
                 debt_composition=debt_composition,
@@ -752,7 +789,7 @@ class DifyToVisualizationConverter:
             return []
 
     @staticmethod
-    def _generate_ai_analysis(
+    async def _generate_ai_analysis(
         personal_info: PersonalInfo,
         stats: StatCard,
         debt_composition: List[DebtItem],
@@ -772,7 +809,7 @@ class DifyToVisualizationConverter:
         try:
             # 使用AI分析服务
             expert_analysis_service = ExpertAnalysisService()
-            return expert_analysis_service.generate_analysis(
+            return await expert_analysis_service.generate_analysis(
                 personal_info=personal_info,
                 stats=stats,
                 debt_composition=debt_composition,
@@ -8,21 +8,37 @@ from pathlib import Path
 # 添加项目根目录到 sys.path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-import requests
-import base64
 from datetime import datetime, timedelta
 from loguru import logger
 import time
 import httpx
 import json
-import tempfile
 import asyncio
 import os
-from typing import Optional, Tuple, Dict, Any
+import base64
+from typing import Optional, Tuple, Dict, Any, List
 from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
 from config.settings import settings
 from utils.log_manager import algorithm_logger
+from utils.errors import UpstreamHTTPError, DeadlineExceeded, TaskCancelled
+from utils.task_context import remaining_timeout, check_cancelled, record_stage_metrics
+from utils.adaptive_limiter import upstream_limiters, UPSTREAM_OCR
+from utils.process_pool import pdf_process_pool
+from utils.pdf_spool import pdf_spool, PdfSource
+from utils.markdown_cache import markdown_cache
+from utils.stage_executor import STAGE_MARKDOWN
+from utils.hedge import hedged_race, pdf_hedge_stats
+from service.pdf_engines import PdfEngine, get_engine, parse_engine_overrides, ENGINE_PDFPLUMBER
+
+# 本地解析后的 OCR 方式：不需要 / 逐页 / 整份文档
+OCR_MODE_NONE = "none"
+OCR_MODE_PAGES = "pages"
+OCR_MODE_DOCUMENT = "document"
+
+# 对冲执行的分支：本地解析引擎、整份文档 OCR
+HEDGE_LOCAL = "local"
+HEDGE_OCR = "ocr"
 
 class DocumentService:
     
@@ -35,6 +51,10 @@ class DocumentService:
         self.pdf_to_markdown_url = settings.pdf.to_markdown_url
         self.pdf_to_markdown_timeout = settings.pdf.to_markdown_timeout
 
+        # 本地解析引擎：默认引擎和按报告类型单独指定的引擎
+        self.extract_engine = settings.pdf.extract_engine
+        self.extract_engine_overrides = parse_engine_overrides(settings.pdf.extract_engine_overrides)
+
     async def process_document_by_gemini(
         self,
         file_name: str,
@@ -83,13 +103,13 @@ class DocumentService:
         }
 
         
-        response = requests.post(
-            self.ai_api_url,
-            json=request_data,
-            headers=headers,
-            params=params,
-            timeout=600
-        )
+        async with httpx.AsyncClient(timeout=remaining_timeout(600)) as client:
+            response = await client.post(
+                self.ai_api_url,
+                json=request_data,
+                headers=headers,
+                params=params
+            )
         
         if response.status_code == 200:
             result = response.json()
@@ -129,50 +149,53 @@ class DocumentService:
                 "file_data": file_base64
             }
 
-            # 调用PDF转Markdown服务
+            # 调用PDF转Markdown服务（超时不超过任务剩余时间）
             start_time = time.time()
-            async with httpx.AsyncClient(timeout=self.pdf_to_markdown_timeout) as client:
-                response = await client.post(
-                    self.pdf_to_markdown_url,
-                    json=request_data,
-                    headers={
-                        'Content-Type': 'application/json'
-                    }
-                )
+            async with upstream_limiters[UPSTREAM_OCR].slot():
+                timeout = remaining_timeout(self.pdf_to_markdown_timeout)
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    response = await client.post(
+                        self.pdf_to_markdown_url,
+                        json=request_data,
+                        headers={
+                            'Content-Type': 'application/json'
+                        }
+                    )
 
-            processing_time = time.time() - start_time
+                if response.status_code != 200:
+                    logger.error(f"❌ [PDF转Markdown] PDF转Markdown服务返回错误: {response.status_code}, 响应: {response.text[:500]}")
+                    raise UpstreamHTTPError("PDF转Markdown服务", response.status_code, response.text[:500])
 
-            if response.status_code == 200:
-                result = response.json()
-
-                # 尝试从响应中提取markdown内容，支持多种可能的字段名
-                markdown_content = None
-                if isinstance(result, dict):
-                    for key in ['markdown', 'content', 'text', 'data', 'result']:
-                        if key in result:
-                            markdown_content = result[key]
-                            logger.info(f"📝 [PDF转Markdown] 找到Markdown字段: {key}")
-                            break
-
-                    if not markdown_content:
-                        # 如果没有找到标准字段，使用整个响应
-                        markdown_content = json.dumps(result, ensure_ascii=False, indent=2)
-                        logger.warning(f"⚠️ [PDF转Markdown] 未找到标准字段，使用完整响应")
-                else:
-                    markdown_content = str(result)
+            processing_time = time.time() - start_time
 
-                logger.info(f"✅ [PDF转Markdown] 转换成功, "
-                          f"Markdown长度: {len(markdown_content):,}, "
-                          f"处理时间: {processing_time:.2f}s")
+            result = response.json()
 
-                return markdown_content
+            # 尝试从响应中提取markdown内容，支持多种可能的字段名
+            markdown_content = None
+            if isinstance(result, dict):
+                for key in ['markdown', 'content', 'text', 'data', 'result']:
+                    if key in result:
+                        markdown_content = result[key]
+                        logger.info(f"📝 [PDF转Markdown] 找到Markdown字段: {key}")
+                        break
+
+                if not markdown_content:
+                    # 如果没有找到标准字段，使用整个响应
+                    markdown_content = json.dumps(result, ensure_ascii=False, indent=2)
+                    logger.warning(f"⚠️ [PDF转Markdown] 未找到标准字段，使用完整响应")
             else:
-                error_msg = f"PDF转Markdown服务返回错误: {response.status_code}"
-                logger.error(f"❌ [PDF转Markdown] {error_msg}, 响应: {response.text[:500]}")
-                raise Exception(error_msg)
+                markdown_content = str(result)
 
+            logger.info(f"✅ [PDF转Markdown] 转换成功, "
+                      f"Markdown长度: {len(markdown_content):,}, "
+                      f"处理时间: {processing_time:.2f}s")
+
+            return markdown_content
+
+        except (DeadlineExceeded, TaskCancelled):
+            raise
         except httpx.TimeoutException:
-            error_msg = f"PDF转Markdown服务超时 (>{self.pdf_to_markdown_timeout}s)"
+            error_msg = f"PDF转Markdown服务超时 (>{timeout:.0f}s)"
             logger.error(f"❌ [PDF转Markdown] {error_msg}")
             raise Exception(error_msg)
         except Exception as e:
@@ -188,6 +211,9 @@ class DocumentService:
         """
             调用 pdfplumber 将pdf转换为markdown
 
+            解析在进程池中执行（不占用事件循环），多页文档按页码范围拆分后并行解析，再按页码顺序合并。
+            上传数据只解码一次，大文件暂存到磁盘并在解析结束后删除。
+
             Args:
                 file_name: 文件名
                 file_base64: PDF文件的base64编码
@@ -196,247 +222,336 @@ class DocumentService:
                 Markdown格式的文档内容
         """
         
+        source = await self._decode(file_base64)
+        if source is None:
+            return None
+        with source:
+            return await self._extract_by_pdfplumber(source)
+
+    @staticmethod
+    async def _decode(file_base64: str) -> Optional[PdfSource]:
+        """
+            Base64 只解码一次：在进程池中解析或文件较大时分块解码到暂存文件（解析进程只接收文件路径，
+            以内存映射读取），否则解码到内存缓冲区
+        """
+        try:
+            return await asyncio.to_thread(pdf_spool.decode, file_base64, pdf_process_pool.enabled)
+        except Exception as e:
+            print(f"❌ 转换失败: Base64解码失败: {str(e)}")
+            return None
+
+    async def _extract_by_pdfplumber(self, source: PdfSource) -> Optional[str]:
+        """在进程池中解析已解码的PDF"""
         try:
-            import pdfplumber
+            engine = get_engine(ENGINE_PDFPLUMBER)
         except ImportError:
             print("❌ 错误: 缺少 pdfplumber 库。请安装: pip install pdfplumber")
             return None
+        result = await self._extract_pages(source, engine)
+        if result is None:
+            return None
+        from service.pdf_extractor import merge_pages
+        return merge_pages(result[0])
 
-        # --- Nested Helper Function 1: Convert table data to Markdown format ---
-        def table_to_markdown(table: list[list[str | None]]) -> str:
-            """
-            将表格数据转换为Markdown表格格式。
-            """
-            if not table or not table[0]:
-                return ""
-
-            markdown_rows = []
-            header = table[0]
-            # Clean up header cells: replace newlines with space
-            header_cells = [str(cell).replace('\n', ' ') if cell else "" for cell in header]
-            markdown_rows.append("| " + " | ".join(header_cells) + " |")
-            markdown_rows.append("| " + " | ".join(["---"] * len(header)) + " |")
-
-            for row in table[1:]:
-                if row:
-                    # Clean up data cells
-                    cells = [str(cell).replace('\n', ' ') if cell else "" for cell in row]
-                    # Ensure row length matches header length, padding with empty strings
-                    while len(cells) < len(header):
-                        cells.append("")
-                    markdown_rows.append("| " + " | ".join(cells[:len(header)]) + " |")
-
-            return '\n'.join(markdown_rows)
-
-        # --- Nested Helper Function 2: Extract and order content from a single page ---
-        def extract_page_content_ordered(page: pdfplumber.page.Page) -> list[dict]:
-            """
-            按照Y坐标顺序提取页面内容（表格和文本），并转换为 Markdown/Text。
-            """
-            content_items = []
-
-            # 1. Get all tables and their positions
-            tables = page.find_tables()
-            table_regions = []
-
-            for table in tables:
-                bbox = table.bbox  # (x0, y0, x1, y1)
-                table_data = table.extract()
-                if table_data:
-                    table_regions.append({
-                        'type': 'table',
-                        'y0': bbox[1],  # Top Y coordinate
-                        'y1': bbox[3],  # Bottom Y coordinate
-                        'bbox': bbox,
-                        'data': table_data
-                    })
-
-            # 2. Get all words and their positions
-            words = page.extract_words()
-
-            if not words:
-                # If no words, just return tables
-                for region in sorted(table_regions, key=lambda x: x['y0']):
-                    content_items.append({
-                        'type': 'table',
-                        'content': table_to_markdown(region['data'])
-                    })
-                return content_items
-
-            # 3. Group words by line (based on Y coordinate)
-            lines = []
-            current_line = []
-            current_top = None
-            line_tolerance = 3  # Y coordinate tolerance
-            sorted_words = sorted(words, key=lambda w: (w['top'], w['x0']))
-
-            for word in sorted_words:
-                if current_top is None or abs(word['top'] - current_top) <= line_tolerance:
-                    if current_top is None:
-                        current_top = word['top']
-                    current_line.append(word)
-                else:
-                    if current_line:
-                        lines.append({
-                            'y0': current_top,
-                            'y1': current_line[0]['bottom'],
-                            'words': current_line
-                        })
-                    current_top = word['top']
-                    current_line = [word]
-
-            if current_line:
-                lines.append({
-                    'y0': current_top,
-                    'y1': current_line[0]['bottom'],
-                    'words': current_line
-                })
-
-            # 4. Filter text lines inside table regions
-            def is_in_table(line_y0, line_y1):
-                for table_region in table_regions:
-                    # Check for vertical overlap between text line and table region
-                    if line_y0 < table_region['y1'] and line_y1 > table_region['y0']:
-                        return True
-                return False
-
-            # 5. Merge all content (tables and non-table text)
-            all_items = []
-
-            # Add tables
-            for region in table_regions:
-                all_items.append({
-                    'type': 'table',
-                    'y0': region['y0'],
-                    'content': table_to_markdown(region['data'])
-                })
-
-            # Add non-table text lines (grouped into paragraphs)
-            text_lines = [line for line in lines if not is_in_table(line['y0'], line['y1'])]
-
-            if text_lines:
-                current_paragraph = []
-                current_y0 = text_lines[0]['y0'] if text_lines else 0
-                paragraph_gap = 15  # Paragraph spacing threshold
-
-                for i, line in enumerate(text_lines):
-                    # Join words in the line, sorted by x0
-                    line_text = ' '.join([w['text'] for w in sorted(line['words'], key=lambda w: w['x0'])])
-
-                    is_new_paragraph = False
-                    if i > 0:
-                        prev_line = text_lines[i-1]
-                        gap = line['y0'] - prev_line['y1']
-                        if gap > paragraph_gap:
-                            is_new_paragraph = True
-                    
-                    if is_new_paragraph:
-                        # End previous paragraph
-                        if current_paragraph:
-                            all_items.append({
-                                'type': 'text',
-                                'y0': current_y0,
-                                'content': '\n'.join(current_paragraph)
-                            })
-                        # Start new paragraph
-                        current_paragraph = [line_text]
-                        current_y0 = line['y0']
-                    elif i == 0:
-                        current_paragraph.append(line_text)
-                    else:
-                        current_paragraph.append(line_text)
-
-                # Add the last paragraph
-                if current_paragraph:
-                    all_items.append({
-                        'type': 'text',
-                        'y0': current_y0,
-                        'content': '\n'.join(current_paragraph)
-                    })
-
-            # 6. Sort all content by Y coordinate
-            all_items.sort(key=lambda x: x['y0'])
-
-            return all_items
-
-
-        # --- Main Conversion Logic (from Base64 data) ---
-        temp_pdf = None
-        pdf_path = None
-        
-        print("📄 正在从Base64数据解码并写入临时文件...")
+    def _select_engine(self, report_type: Optional[str]) -> PdfEngine:
+        """
+            按报告类型选择本地解析引擎，配置的引擎不存在或未安装时使用 pdfplumber
 
+            Raises:
+                ImportError: pdfplumber 未安装
+        """
+        name = self.extract_engine_overrides.get(report_type or "", self.extract_engine)
         try:
-            # Base64 解码
-            pdf_bytes = base64.b64decode(file_base64)
+            return get_engine(name)
+        except (ValueError, ImportError) as e:
+            if name != ENGINE_PDFPLUMBER:
+                logger.warning(f"⚠️ [PDF解析] 解析引擎 {name} 不可用（{e}），改用 {ENGINE_PDFPLUMBER}")
+            return get_engine(ENGINE_PDFPLUMBER)
 
-            # 写入临时文件
-            temp_pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
-            temp_pdf_file.write(pdf_bytes)
-            temp_pdf_file.close()
-            pdf_path = temp_pdf_file.name
-            temp_pdf = temp_pdf_file # Keep reference for cleanup
+    async def _extract_pages(
+        self,
+        source: PdfSource,
+        engine: PdfEngine,
+    ) -> Optional[Tuple[List[List[str]], List[Dict[str, Any]]]]:
+        """
+            在进程池中解析已解码的PDF
 
-            print(f"📄 正在使用 pdfplumber 解析PDF文件: {pdf_path}")
-            
-            # 解析PDF
-            markdown_content = []
-
-            with pdfplumber.open(pdf_path) as pdf:
-                for i, page in enumerate(pdf.pages):
-                    if i > 0:
-                        # Add a page break marker for better separation
-                        markdown_content.append("--- Page Break ---\n") 
-                    
-                    # Use the nested helper function
-                    page_items = extract_page_content_ordered(page) 
-                    
-                    for item in page_items:
-                        if item['content']:
-                            markdown_content.append(item['content'])
-
-            # 合并内容
-            final_content = "\n\n".join(markdown_content)
+            Returns:
+                (每页内容块列表, 每页文字密度)，解析失败时返回 None
+        """
+        from service.pdf_extractor import split_page_ranges
 
+        try:
+            print(f"📄 正在使用 {engine.name} 解析PDF文件: {source.size / 1024 / 1024:.2f}MB（{source.storage}）")
+
+            # 任务取消或超过截止时间时不再提交解析
+            check_cancelled()
+            page_count = await pdf_process_pool.run(engine.count_pages, source.ref)
+            ranges = split_page_ranges(page_count, settings.pdf.extract_pages_per_chunk)
+
+            # 各页码范围并行解析，结果按页码顺序合并
+            chunks = await asyncio.gather(*(
+                pdf_process_pool.run(engine.extract_chunk, source.ref, start, end)
+                for start, end in ranges
+            ))
+            check_cancelled()
+
+            pages = [page for chunk in chunks for page in chunk["pages"]]
+            density = [page for chunk in chunks for page in chunk["density"]]
+
+            # 单份文档的内存占用：解码后的数据 + 解析进程的峰值常驻内存
+            peaks = [chunk["peak_rss"] for chunk in chunks if chunk["peak_rss"]]
+            peak_rss_mb = round(max(peaks) / 1024 / 1024, 1) if peaks else None
+            record_stage_metrics(
+                STAGE_MARKDOWN,
+                extract_engine=engine.name,
+                pages=page_count,
+                pdf_mb=round(source.size / 1024 / 1024, 2),
+                pdf_storage=source.storage,
+                extract_peak_rss_mb=peak_rss_mb
+            )
+            logger.info(f"📊 [PDF解析] {engine.name}, {page_count} 页, 文件 {source.size / 1024 / 1024:.2f}MB（{source.storage}）, "
+                        f"解析进程峰值内存 {peak_rss_mb if peak_rss_mb is not None else '-'}MB")
 
-            return final_content
+            return pages, density
 
+        except (DeadlineExceeded, TaskCancelled):
+            raise
         except Exception as e:
             print(f"❌ 转换失败: {str(e)}")
             return None
-        
+
+    async def _ocr_pages(
+        self,
+        file_name: str,
+        source: PdfSource,
+        pages: List[List[str]],
+        page_numbers: List[int],
+    ) -> int:
+        """
+            将需要 OCR 的页面拆分为单页 PDF 并发识别，识别结果替换 pages 中对应页面的内容
+
+            单页识别失败时保留本地引擎的解析结果（可能为空）。
+
+            Returns:
+                识别成功的页数
+        """
+        from service.pdf_extractor import split_pages
+
+        page_pdfs = await pdf_process_pool.run(split_pages, source.ref, page_numbers)
+        semaphore = asyncio.Semaphore(max(1, settings.pdf.ocr_page_concurrency))
+        stem = Path(file_name).stem
+
+        async def ocr_page(number: int, data: bytes) -> bool:
+            async with semaphore:
+                check_cancelled()
+                try:
+                    content = await self.process_document_by_ocr(
+                        file_name=f"{stem}_p{number + 1}.pdf",
+                        file_base64=base64.b64encode(data).decode("ascii"),
+                    )
+                except (DeadlineExceeded, TaskCancelled):
+                    raise
+                except Exception as e:
+                    logger.warning(f"⚠️ [逐页OCR] 第 {number + 1} 页识别失败，保留本地引擎解析结果: {e}")
+                    return False
+            if not content or not content.strip():
+                return False
+            pages[number] = [content.strip()]
+            return True
+
+        results = await asyncio.gather(*(
+            ocr_page(number, data) for number, data in zip(page_numbers, page_pdfs)
+        ))
+        return sum(results)
+
+    async def _convert_local(
+        self,
+        file_name: str,
+        source: PdfSource,
+        engine: PdfEngine,
+    ) -> Tuple[Optional[str], str, bool]:
+        """
+            本地引擎解析，以图片为主的页面逐页 OCR
+
+            Returns:
+                (Markdown内容, OCR方式, 是否完整)；OCR方式为 document 时需要整份文档 OCR，解析失败时内容为 None；
+                有页面 OCR 失败（保留了本地引擎的解析结果）时不完整，不写入缓存
+        """
+        result = await self._extract_pages(source, engine)
+        if result is None:
+            return None, OCR_MODE_DOCUMENT, False
+
+        from service.pdf_extractor import merge_pages, needs_ocr
+        pages, density = result
+        ocr_page_numbers = [
+            number for number, page_density in enumerate(density)
+            if needs_ocr(page_density, settings.pdf.ocr_page_min_chars, settings.pdf.ocr_page_min_image_ratio)
+        ]
+        final_content = merge_pages(pages)
+        complete = True
+
+        if ocr_page_numbers and len(ocr_page_numbers) < len(pages):
+            ocr_mode = OCR_MODE_PAGES
+            logger.info(f"🔍 [逐页OCR] {len(ocr_page_numbers)}/{len(pages)} 页需要OCR, "
+                        f"页码: {[number + 1 for number in ocr_page_numbers]}")
+            recognized = await self._ocr_pages(file_name, source, pages, ocr_page_numbers)
+            final_content = merge_pages(pages)
+            complete = recognized == len(ocr_page_numbers)
+            if complete:
+                logger.info(f"✅ [逐页OCR] 完成 {recognized}/{len(ocr_page_numbers)} 页")
+            else:
+                logger.warning(f"⚠️ [逐页OCR] 仅识别 {recognized}/{len(ocr_page_numbers)} 页，转换结果不写入缓存")
+            if len(final_content) < settings.pdf.min_content_chars:
+                # 合并逐页识别结果后文字仍然过少（与不需要逐页 OCR 时的检查一致），整份文档提交 OCR
+                logger.info(f"🔍 [逐页OCR] 合并后仅 {len(final_content)} 个字符，改为整份文档OCR")
+                ocr_mode = OCR_MODE_DOCUMENT
+        elif ocr_page_numbers or len(final_content) < settings.pdf.min_content_chars:
+            ocr_mode = OCR_MODE_DOCUMENT
+        else:
+            ocr_mode = OCR_MODE_NONE
+        record_stage_metrics(STAGE_MARKDOWN, ocr_mode=ocr_mode, ocr_pages=len(ocr_page_numbers))
+        return final_content, ocr_mode, complete
+
+    async def _probe_scanned(self, file_name: str, source: PdfSource, engine: PdfEngine) -> bool:
+        """快速探测第 1 页，判断是否为疑似扫描件（探测失败时按非扫描件处理）"""
+        check_cancelled()
+        try:
+            result = await pdf_process_pool.run(engine.probe, source.ref)
+        except (DeadlineExceeded, TaskCancelled):
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ [对冲执行] 探测失败, 文件: {file_name}, {e}")
+            return False
+        pdf_hedge_stats.record_probe()
+        scanned = (result["chars"] < settings.pdf.hedge_probe_max_chars
+                   and result["image_ratio"] >= settings.pdf.hedge_probe_min_image_ratio)
+        if scanned:
+            logger.info(f"🔍 [对冲执行] 疑似扫描件, 文件: {file_name}, 第1页字符数 {result['chars']}, "
+                        f"图片覆盖率 {result['image_ratio']:.0%}, {engine.name} 解析与 OCR 同时开始")
+        return scanned
+
+    async def _convert_hedged(
+        self,
+        file_name: str,
+        file_base64: str,
+        source: PdfSource,
+        engine: PdfEngine,
+    ) -> Tuple[Optional[str], bool]:
+        """
+            对冲执行：本地引擎解析（含逐页OCR）与整份文档 OCR 同时开始，
+            采用先通过质量检查（文字不少于 min_content_chars）的结果并取消另一个；
+            都未通过时优先采用 OCR 结果（与顺序执行时的回退一致）
+
+            Returns:
+                (Markdown内容, 是否可以缓存)；未通过质量检查的回退结果和逐页 OCR 不完整的结果不缓存
+        """
+        def accept(name: str, result: Any) -> bool:
+            if name == HEDGE_LOCAL:
+                content, ocr_mode, _ = result
+                return ocr_mode != OCR_MODE_DOCUMENT and bool(content)
+            return bool(result) and len(result.strip()) >= settings.pdf.min_content_chars
+
+        outcome = await hedged_race(
+            {
+                HEDGE_LOCAL: lambda: self._convert_local(file_name, source, engine),
+                HEDGE_OCR: lambda: self.process_document_by_ocr(file_name=file_name, file_base64=file_base64),
+            },
+            accept,
+        )
+        saved = pdf_hedge_stats.record(outcome)
+
+        cacheable = False
+        if outcome.winner == HEDGE_LOCAL:
+            final_content, _, cacheable = outcome.result
+        elif outcome.winner == HEDGE_OCR:
+            final_content = outcome.result
+            cacheable = True
+        elif outcome.results.get(HEDGE_OCR):
+            final_content = outcome.results[HEDGE_OCR]
+        elif outcome.results.get(HEDGE_LOCAL):
+            final_content = outcome.results[HEDGE_LOCAL][0]
+        else:
+            final_content = None
+
+        elapsed = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in outcome.elapsed.items())
+        logger.info(f"🏁 [对冲执行] 胜出: {outcome.winner or '无'}, 已取消: {outcome.cancelled or '无'}, "
+                    f"耗时: {elapsed}, 节省 {saved:.2f}s")
+        record_stage_metrics(
+            STAGE_MARKDOWN,
+            hedge_winner=outcome.winner,
+            hedge_saved_seconds=round(saved, 2)
+        )
+        return final_content, cacheable
 
     async def process_document(
             self,
             file_name: str,
             file_base64: str,
+            report_type: Optional[str] = None,
         ) -> str:
         """
             将pdf转换为markdown
 
+            先用本地引擎（按报告类型选择，默认 pdfplumber）解析所有页面并统计每页的文字密度：
+            - 部分页面以图片为主（扫描页、盖章页）：只将这些页面拆分为单页 PDF 并发 OCR，结果按页码顺序合并
+            - 所有页面都需要 OCR，或解析出的文字过少：整份文档提交 OCR
+            第 1 页探测为疑似扫描件时，本地解析与整份文档 OCR 同时开始（对冲执行），不再等解析结束后才提交 OCR。
+
+            转换结果按 文件内容SHA-256 + 解析器版本 缓存，相同文件再次转换时直接返回缓存内容。
+
             Args:
                 file_name: 文件名
                 file_base64: PDF文件的base64编码
+                report_type: 报告类型（flow/simple/detail），用于选择本地解析引擎
 
             Returns:
                 Markdown格式的文档内容
         """
         try:
-            final_content = await self.process_document_by_pdfplumber(
-                file_name=file_name,
-                file_base64=file_base64,
-            )
+            engine = self._select_engine(report_type)
+        except ImportError:
+            print("❌ 错误: 缺少 pdfplumber 库。请安装: pip install pdfplumber")
+            return None
 
-            if len(final_content) < 800:
-                final_content = await self.process_document_by_ocr(
-                    file_name=file_name,
-                    file_base64=file_base64,
-                )
-            
-            return final_content
-        except Exception as e:
-            print(f"❌ 转换失败: {str(e)}")
+        source = await self._decode(file_base64)
+        if source is None:
             return None
+
+        with source:
+            cache_key = None
+            if markdown_cache:
+                cache_key = markdown_cache.make_key(source.sha256, engine.version)
+            if cache_key:
+                cached = await markdown_cache.get(cache_key)
+                record_stage_metrics(STAGE_MARKDOWN, cache="hit" if cached is not None else "miss")
+                if cached is not None:
+                    logger.info(f"📚 [Markdown缓存] 命中, 文件: {file_name}, sha256: {source.sha256[:12]}")
+                    return cached
+
+            try:
+                if settings.pdf.hedge_enabled and await self._probe_scanned(file_name, source, engine):
+                    final_content, cacheable = await self._convert_hedged(file_name, file_base64, source, engine)
+                else:
+                    final_content, ocr_mode, cacheable = await self._convert_local(file_name, source, engine)
+                    if ocr_mode == OCR_MODE_DOCUMENT:
+                        final_content = await self.process_document_by_ocr(
+                            file_name=file_name,
+                            file_base64=file_base64,
+                        )
+                        # OCR 结果文字过少（服务降级或识别失败）时不缓存，下次提交重新识别
+                        cacheable = bool(final_content) and (
+                            len(final_content.strip()) >= settings.pdf.min_content_chars
+                        )
+            except (DeadlineExceeded, TaskCancelled):
+                raise
+            except Exception as e:
+                print(f"❌ 转换失败: {str(e)}")
+                return None
+
+            if cache_key and final_content and cacheable:
+                await markdown_cache.put(cache_key, final_content)
+            return final_content
             
 
 
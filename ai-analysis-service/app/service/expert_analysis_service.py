@@ -5,7 +5,7 @@ AI专家分析服务
 import json
 import logging
 from typing import List
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from app.models.visualization_model import (
     AIExpertAnalysis,
@@ -22,6 +22,7 @@ from app.models.visualization_model import (
     ProductRecommendation
 )
 from app.config.settings import settings
+from utils.task_context import remaining_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -31,16 +32,14 @@ class ExpertAnalysisService:
 
     def __init__(self):
         """初始化服务"""
-        # 初始化OpenAI客户端
-        self.client = OpenAI(
-            base_url=settings.openai.base_url,
-            api_key=settings.openai.api_key
-        )
+        # OpenAI 配置（异步客户端在每次调用时创建并关闭）
+        self.base_url = settings.openai.base_url
+        self.api_key = settings.openai.api_key
         self.model = settings.openai.model
         self.timeout = settings.openai.timeout
         self.temperature = settings.openai.temperature
     
-    def generate_analysis(
+    async def generate_analysis(
         self,
         personal_info: PersonalInfo,
         stats: StatCard,
@@ -84,7 +83,7 @@ class ExpertAnalysisService:
             prompt = self._build_prompt(user_summary, product_recommendations)
             
             # 调用大模型
-            response = self._call_llm(prompt)
+            response = await self._call_llm(prompt)
             
             # 解析响应
             analysis = self._parse_response(response)
@@ -272,25 +271,26 @@ class ExpertAnalysisService:
 """
         return prompt
     
-    def _call_llm(self, prompt: str) -> str:
+    async def _call_llm(self, prompt: str) -> str:
         """调用大模型"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一位资深的信用分析专家，擅长分析个人征信报告并提供专业建议。请始终以JSON格式返回结构化的分析结果。"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                timeout=self.timeout,
-                temperature=self.temperature,
-                response_format={"type": "json_object"}  # 强制返回JSON格式
-            )
+            async with AsyncOpenAI(base_url=self.base_url, api_key=self.api_key) as client:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "你是一位资深的信用分析专家，擅长分析个人征信报告并提供专业建议。请始终以JSON格式返回结构化的分析结果。"
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    timeout=remaining_timeout(self.timeout),
+                    temperature=self.temperature,
+                    response_format={"type": "json_object"}  # 强制返回JSON格式
+                )
             
             content = response.choices[0].message.content
             logger.info(f"✅ 大模型调用成功，返回内容长度: {len(content)}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 本地解析引擎
+
+每个引擎是一个模块，提供相同的模块级函数（可以在进程池的工作进程中执行）：
+- count_pages(source) -> int
+- probe(source) -> {"pages", "chars", "image_ratio"}: 页数和第 1 页的文字密度
+- extract_chunk(source, start, end) -> {"pages", "density", "peak_rss"}: 每页内容块、文字密度和峰值内存
+- EXTRACTOR_VERSION: 解析器版本，Markdown 缓存按此区分
+
+已有引擎：
+- pdfplumber（service/pdf_extractor.py）: 识别表格并转换为 Markdown 表格，最慢
+- pypdfium2（service/pdfium_extractor.py）: 按行输出文本层，不识别表格，pdfplumber 的依赖无需另外安装
+- pymupdf（service/pymupdf_extractor.py）: 按文本块输出，不识别表格，需要另外安装 pymupdf
+
+按报告类型选择引擎的配置见 PDF_EXTRACT_ENGINE / PDF_EXTRACT_ENGINE_OVERRIDES。
+"""
+
+import importlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Any
+
+
+ENGINE_PDFPLUMBER = "pdfplumber"
+ENGINE_PDFIUM = "pypdfium2"
+ENGINE_PYMUPDF = "pymupdf"
+
+# 引擎名称 -> 模块
+ENGINE_MODULES = {
+    ENGINE_PDFPLUMBER: "service.pdf_extractor",
+    ENGINE_PDFIUM: "service.pdfium_extractor",
+    ENGINE_PYMUPDF: "service.pymupdf_extractor",
+}
+
+
+@dataclass(frozen=True)
+class PdfEngine:
+    """PDF 本地解析引擎"""
+    name: str
+    version: str
+    count_pages: Callable[..., int]
+    probe: Callable[..., Dict[str, Any]]
+    extract_chunk: Callable[..., Dict[str, Any]]
+
+
+_engines: Dict[str, PdfEngine] = {}
+
+
+def get_engine(name: str) -> PdfEngine:
+    """
+    按名称获取解析引擎
+
+    Raises:
+        ValueError: 未知的引擎名称
+        ImportError: 引擎依赖的库未安装
+    """
+    if name in _engines:
+        return _engines[name]
+    if name not in ENGINE_MODULES:
+        raise ValueError(f"未知的PDF解析引擎: {name}，可选: {', '.join(ENGINE_MODULES)}")
+    module = importlib.import_module(ENGINE_MODULES[name])
+    engine = PdfEngine(
+        name=name,
+        version=module.EXTRACTOR_VERSION,
+        count_pages=module.count_pages,
+        probe=module.probe,
+        extract_chunk=module.extract_chunk,
+    )
+    _engines[name] = engine
+    return engine
+
+
+def available_engines() -> List[str]:
+    """当前环境中可用的引擎（依赖库已安装）"""
+    names = []
+    for name in ENGINE_MODULES:
+        try:
+            get_engine(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def parse_engine_overrides(spec: str) -> Dict[str, str]:
+    """
+    解析按报告类型选择引擎的配置
+
+    格式: "报告类型:引擎"，多个用逗号分隔，例如 "flow:pypdfium2,detail:pdfplumber"
+    """
+    overrides: Dict[str, str] = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        report_type, _, engine = item.partition(":")
+        if report_type.strip() and engine.strip():
+            overrides[report_type.strip()] = engine.strip()
+    return overrides
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pdfplumber 版面解析（默认解析引擎，其他引擎见 service/pdf_engines.py）
+
+按 Y 坐标顺序提取页面中的表格和文本并转换为 Markdown。
+函数均为模块级函数，可以在进程池的工作进程中执行（spawn 方式启动的子进程按模块名导入），
+因此本模块不依赖配置和日志等需要初始化的模块。
+
+PDF 来源（source）为解码后的内存数据（bytes）或暂存文件路径（str），
+暂存文件以只读内存映射打开，多个工作进程共用页缓存中的同一份数据。
+
+解析时同时统计每页的文字密度（字符数、图片覆盖率），文字很少且以图片为主的页面（扫描件、盖章页）
+单独拆分为单页 PDF 交给 OCR 服务识别。
+"""
+
+import io
+import mmap
+import resource
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+from contextlib import contextmanager
+from typing import List, Tuple, Union, Optional, Dict, Any, Iterator, Iterable
+
+import pdfplumber
+import pypdfium2
+
+
+# PDF 来源：内存数据或暂存文件路径
+PdfSourceRef = Union[bytes, str]
+
+
+# 解析器版本：输出格式变化（版面算法、分页标记等）时需要修改，Markdown 缓存按此区分
+EXTRACTOR_VERSION = f"pdfplumber-{pdfplumber.__version__}.layout-2"
+
+# pdfium 不是线程安全的：进程池关闭（PDF_EXTRACT_WORKERS=0，在线程池中执行）时同一进程内的调用需要串行
+PDFIUM_LOCK = threading.Lock()
+
+# 分页标记（与原单进程解析的输出保持一致）
+PAGE_BREAK = "--- Page Break ---\n"
+
+
+def table_to_markdown(table: list[list[str | None]]) -> str:
+    """
+    将表格数据转换为Markdown表格格式。
+    """
+    if not table or not table[0]:
+        return ""
+
+    markdown_rows = []
+    header = table[0]
+    # Clean up header cells: replace newlines with space
+    header_cells = [str(cell).replace('\n', ' ') if cell else "" for cell in header]
+    markdown_rows.append("| " + " | ".join(header_cells) + " |")
+    markdown_rows.append("| " + " | ".join(["---"] * len(header)) + " |")
+
+    for row in table[1:]:
+        if row:
+            # Clean up data cells
+            cells = [str(cell).replace('\n', ' ') if cell else "" for cell in row]
+            # Ensure row length matches header length, padding with empty strings
+            while len(cells) < len(header):
+                cells.append("")
+            markdown_rows.append("| " + " | ".join(cells[:len(header)]) + " |")
+
+    return '\n'.join(markdown_rows)
+
+
+# 同一行文字的 Y 坐标容差、段落间距阈值
+LINE_TOLERANCE = 3
+PARAGRAPH_GAP = 15
+
+
+def extract_page_content_ordered(page: pdfplumber.page.Page) -> list[dict]:
+    """
+    按照Y坐标顺序提取页面内容（表格和文本），并转换为 Markdown/Text。
+    """
+    # 1. Get all tables and their positions
+    table_regions = []
+    for table in page.find_tables():
+        bbox = table.bbox  # (x0, y0, x1, y1)
+        table_data = table.extract()
+        if table_data:
+            table_regions.append({
+                'type': 'table',
+                'y0': bbox[1],  # Top Y coordinate
+                'y1': bbox[3],  # Bottom Y coordinate
+                'bbox': bbox,
+                'data': table_data
+            })
+
+    # 2. Get all words and their positions
+    return layout_page(page.extract_words(), table_regions)
+
+
+class TableIndex:
+    """
+    表格区域的区间索引：按上边界排序，并记录前缀中下边界的最大值。
+
+    判断文字行 [y0, y1] 是否与任一表格区域垂直重叠（y0 < 表格.y1 且 y1 > 表格.y0）时，
+    二分查找上边界小于 y1 的表格（排序后的前缀），再比较这些表格下边界的最大值是否大于 y0，
+    每行 O(log n)，不再逐个扫描表格。
+    """
+
+    def __init__(self, table_regions: list[dict]):
+        regions = sorted(table_regions, key=itemgetter('y0'))
+        self.starts = [region['y0'] for region in regions]
+        self.max_ends = []
+        max_end = None
+        for region in regions:
+            max_end = region['y1'] if max_end is None or region['y1'] > max_end else max_end
+            self.max_ends.append(max_end)
+
+    def overlaps(self, y0: float, y1: float) -> bool:
+        count = bisect_left(self.starts, y1)
+        return count > 0 and self.max_ends[count - 1] > y0
+
+
+def group_lines(words: list[dict]) -> list[dict]:
+    """
+    按 Y 坐标将单词分组为行：单词按 (top, x0) 排序后顺序扫描，
+    与当前行首个单词的 top 相差不超过 LINE_TOLERANCE 的归入同一行
+    """
+    sorted_words = sorted(words, key=itemgetter('top', 'x0'))
+    tops = list(map(itemgetter('top'), sorted_words))
+    tolerance = LINE_TOLERANCE
+    lines = []
+    start = 0
+    current_top = tops[0]
+    for i, top in enumerate(tops):
+        # 已按 top 升序排列，top - current_top 不小于 0
+        if top - current_top > tolerance:
+            lines.append({
+                'y0': current_top,
+                'y1': sorted_words[start]['bottom'],
+                'words': sorted_words[start:i]
+            })
+            start = i
+            current_top = top
+    lines.append({
+        'y0': current_top,
+        'y1': sorted_words[start]['bottom'],
+        'words': sorted_words[start:]
+    })
+    return lines
+
+
+def line_text(words: list[dict]) -> str:
+    """行内单词按 x0 排序后以空格连接"""
+    if len(words) > 1:
+        words = sorted(words, key=itemgetter('x0'))
+    return ' '.join(map(itemgetter('text'), words))
+
+
+def layout_page(words: list[dict], table_regions: list[dict]) -> list[dict]:
+    """
+    版面重建：过滤表格区域内的文字行，将其余文字行按间距合并为段落，与表格一起按 Y 坐标排序
+
+    Args:
+        words: pdfplumber extract_words() 的结果
+        table_regions: 表格区域（y0/y1/data）
+    """
+    if not words:
+        # If no words, just return tables
+        return [
+            {'type': 'table', 'content': table_to_markdown(region['data'])}
+            for region in sorted(table_regions, key=itemgetter('y0'))
+        ]
+
+    # 3. Group words by line (based on Y coordinate)
+    lines = group_lines(words)
+
+    # 4. Filter text lines inside table regions
+    if table_regions:
+        index = TableIndex(table_regions)
+        text_lines = [line for line in lines if not index.overlaps(line['y0'], line['y1'])]
+    else:
+        text_lines = lines
+
+    # 5. Merge all content (tables and non-table text)
+    all_items = [
+        {'type': 'table', 'y0': region['y0'], 'content': table_to_markdown(region['data'])}
+        for region in table_regions
+    ]
+
+    # Add non-table text lines (grouped into paragraphs)
+    if text_lines:
+        current_paragraph = []
+        current_y0 = text_lines[0]['y0']
+        prev_y1 = None
+
+        for line in text_lines:
+            if prev_y1 is not None and line['y0'] - prev_y1 > PARAGRAPH_GAP:
+                # End previous paragraph, start new paragraph
+                all_items.append({
+                    'type': 'text',
+                    'y0': current_y0,
+                    'content': '\n'.join(current_paragraph)
+                })
+                current_paragraph = []
+                current_y0 = line['y0']
+            current_paragraph.append(line_text(line['words']))
+            prev_y1 = line['y1']
+
+        # Add the last paragraph
+        all_items.append({
+            'type': 'text',
+            'y0': current_y0,
+            'content': '\n'.join(current_paragraph)
+        })
+
+    # 6. Sort all content by Y coordinate (stable: tables before text at the same Y)
+    all_items.sort(key=itemgetter('y0'))
+
+    return all_items
+
+
+@contextmanager
+def open_source(source: PdfSourceRef) -> Iterator[pdfplumber.PDF]:
+    """打开 PDF：内存数据包装为 BytesIO（不复制），暂存文件以只读内存映射打开"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with pdfplumber.open(io.BytesIO(source)) as pdf:
+            yield pdf
+        return
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        with pdfplumber.open(view) as pdf:
+            yield pdf
+
+
+def count_pages(source: PdfSourceRef) -> int:
+    """PDF 页数"""
+    with open_source(source) as pdf:
+        return len(pdf.pages)
+
+
+def image_coverage(boxes: Iterable[Tuple[float, float, float, float]], width: float, height: float) -> float:
+    """图片覆盖率：图片面积之和 / 页面面积（图片裁剪到页面范围内，最大为 1）"""
+    page_area = float(width * height) or 1.0
+    image_area = 0.0
+    for x0, y0, x1, y1 in boxes:
+        # 裁剪到页面范围内（图片可能超出页面边界）
+        w = min(x1, width) - max(x0, 0)
+        h = min(y1, height) - max(y0, 0)
+        if w > 0 and h > 0:
+            image_area += w * h
+    return round(min(1.0, image_area / page_area), 3)
+
+
+def page_density(page: pdfplumber.page.Page) -> Dict[str, Any]:
+    """
+    页面文字密度：非空白字符数、图片覆盖率（图片面积之和 / 页面面积，最大为 1）
+    """
+    chars = sum(1 for char in page.chars if not char['text'].isspace())
+    boxes = ((image['x0'], image['top'], image['x1'], image['bottom']) for image in page.images)
+    return {"chars": chars, "image_ratio": image_coverage(boxes, page.width, page.height)}
+
+
+def probe(source: PdfSourceRef) -> Dict[str, Any]:
+    """进程池任务：快速探测（只解析第 1 页的字符和图片），返回页数和第 1 页的文字密度"""
+    with open_source(source) as pdf:
+        if not pdf.pages:
+            return {"pages": 0, "chars": 0, "image_ratio": 0.0}
+        page = pdf.pages[0]
+        density = page_density(page)
+        page.close()
+        return {"pages": len(pdf.pages), **density}
+
+
+def needs_ocr(density: Dict[str, Any], min_chars: int, min_image_ratio: float) -> bool:
+    """文字少于 min_chars 且图片覆盖率不低于 min_image_ratio 的页面需要 OCR（空白页不需要）"""
+    return density["chars"] < min_chars and density["image_ratio"] >= min_image_ratio
+
+
+def _page_items(page: pdfplumber.page.Page) -> List[str]:
+    return [item['content'] for item in extract_page_content_ordered(page) if item['content']]
+
+
+def extract_page_range(source: PdfSourceRef, start: int, end: int) -> List[List[str]]:
+    """
+    解析 [start, end) 范围内的页面
+
+    Returns:
+        每页非空内容块（表格/段落）的列表，按页码顺序
+    """
+    pages = []
+    with open_source(source) as pdf:
+        for page in pdf.pages[start:end]:
+            pages.append(_page_items(page))
+            # 释放页面缓存的字符/对象，避免长文档在同一进程中累积内存
+            page.close()
+    return pages
+
+
+def extract_chunk(source: PdfSourceRef, start: int, end: int) -> Dict[str, Any]:
+    """
+    进程池任务：解析 [start, end) 范围内的页面，统计每页的文字密度和解析期间本进程的峰值内存
+
+    Returns:
+        {"pages": 每页内容块列表, "density": 每页文字密度, "peak_rss": 峰值常驻内存（字节），无法统计时为 None}
+    """
+    reset = reset_peak_rss()
+    pages = []
+    density = []
+    with open_source(source) as pdf:
+        for page in pdf.pages[start:end]:
+            pages.append(_page_items(page))
+            density.append(page_density(page))
+            page.close()
+    return {"pages": pages, "density": density, "peak_rss": read_peak_rss() if reset else None}
+
+
+def split_pages(source: PdfSourceRef, page_numbers: List[int]) -> List[bytes]:
+    """进程池任务：将指定页面（从 0 开始）分别导出为单页 PDF，用于逐页 OCR"""
+    with PDFIUM_LOCK:
+        return _split_pages(source, page_numbers)
+
+
+def _split_pages(source: PdfSourceRef, page_numbers: List[int]) -> List[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        document = pypdfium2.PdfDocument(bytes(source))
+    else:
+        document = pypdfium2.PdfDocument(source)
+    outputs = []
+    try:
+        for number in page_numbers:
+            single = pypdfium2.PdfDocument.new()
+            try:
+                single.import_pages(document, [number])
+                buffer = io.BytesIO()
+                single.save(buffer)
+                outputs.append(buffer.getvalue())
+            finally:
+                single.close()
+    finally:
+        document.close()
+    return outputs
+
+
+def reset_peak_rss() -> bool:
+    """重置本进程的峰值内存统计（Linux: /proc/self/clear_refs），不支持时返回 False"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss() -> Optional[int]:
+    """本进程自上次重置以来的峰值常驻内存（字节）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def split_page_ranges(page_count: int, pages_per_chunk: int) -> List[Tuple[int, int]]:
+    """按每块页数切分页码范围"""
+    size = max(1, pages_per_chunk)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def merge_pages(pages: List[List[str]]) -> str:
+    """按页码顺序合并各页内容，页与页之间插入分页标记"""
+    markdown_content = []
+    for i, items in enumerate(pages):
+        if i > 0:
+            markdown_content.append(PAGE_BREAK)
+        markdown_content.extend(items)
+    return "\n\n".join(markdown_content)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pypdfium2 文本解析
+
+直接读取 pdfium 的文本层，按行输出纯文本，不识别表格（表格按行输出为以空格分隔的文字）。
+速度比 pdfplumber 快一个数量级以上，适合版面以文字为主、表格结构不重要的报告（如银行流水）。
+pypdfium2 是 pdfplumber 的依赖，无需另外安装。
+
+与 service/pdf_extractor.py 相同，函数均为模块级函数，可以在进程池的工作进程中执行。
+"""
+
+from typing import List, Dict, Any, Optional
+
+import pypdfium2
+import pypdfium2.raw as pdfium_c
+
+from service.pdf_extractor import (
+    PdfSourceRef, PDFIUM_LOCK, image_coverage, reset_peak_rss, read_peak_rss
+)
+
+
+# 解析器版本：输出格式变化时需要修改，Markdown 缓存按此区分
+EXTRACTOR_VERSION = f"pypdfium2-{pypdfium2.version.PYPDFIUM_INFO}.text-1"
+
+
+def _open(source: PdfSourceRef) -> pypdfium2.PdfDocument:
+    # 暂存文件由 pdfium 按路径直接读取（按需读取页面数据，不整体载入内存）
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pypdfium2.PdfDocument(bytes(source))
+    return pypdfium2.PdfDocument(source)
+
+
+def page_text(page: pypdfium2.PdfPage) -> str:
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range()
+    finally:
+        textpage.close()
+
+
+def text_items(text: str) -> List[str]:
+    """页面文本：去除每行首尾空白和空行，整页作为一个内容块"""
+    content = "\n".join(line for line in (raw_line.strip() for raw_line in text.splitlines()) if line)
+    return [content] if content else []
+
+
+def page_density(page: pypdfium2.PdfPage, text: Optional[str] = None) -> Dict[str, Any]:
+    """页面文字密度：非空白字符数、图片覆盖率（与 pdfplumber 引擎的统计口径一致）"""
+    if text is None:
+        text = page_text(page)
+    chars = sum(1 for char in text if not char.isspace())
+    width, height = page.get_size()
+    # get_bounds 为 PDF 坐标 (left, bottom, right, top)，只用于计算面积，无需转换坐标系
+    boxes = (obj.get_bounds() for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]))
+    return {"chars": chars, "image_ratio": image_coverage(boxes, width, height)}
+
+
+def count_pages(source: PdfSourceRef) -> int:
+    """PDF 页数"""
+    with PDFIUM_LOCK:
+        document = _open(source)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+
+def probe(source: PdfSourceRef) -> Dict[str, Any]:
+    """进程池任务：快速探测，返回页数和第 1 页的文字密度"""
+    with PDFIUM_LOCK:
+        document = _open(source)
+        try:
+            if len(document) == 0:
+                return {"pages": 0, "chars": 0, "image_ratio": 0.0}
+            page = document[0]
+            try:
+                return {"pages": len(document), **page_density(page)}
+            finally:
+                page.close()
+        finally:
+            document.close()
+
+
+def extract_chunk(source: PdfSourceRef, start: int, end: int) -> Dict[str, Any]:
+    """
+    进程池任务：解析 [start, end) 范围内的页面（返回格式与 pdfplumber 引擎相同）
+
+    Returns:
+        {"pages": 每页内容块列表, "density": 每页文字密度, "peak_rss": 峰值常驻内存（字节），无法统计时为 None}
+    """
+    reset = reset_peak_rss()
+    pages = []
+    density = []
+    with PDFIUM_LOCK:
+        document = _open(source)
+        try:
+            for number in range(start, min(end, len(document))):
+                page = document[number]
+                try:
+                    text = page_text(page)
+                    pages.append(text_items(text))
+                    density.append(page_density(page, text))
+                finally:
+                    page.close()
+        finally:
+            document.close()
+    return {"pages": pages, "density": density, "peak_rss": read_peak_rss() if reset else None}
@@ -4,12 +4,16 @@
 """
 import json
 import logging
-from typing import List, Dict
+import threading
+from typing import List, Dict, Any
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI
+# 客户端首次访问 chat.completions 时才延迟导入（超过 1 秒），随本模块一起提前导入
+import openai.resources.chat.completions  # noqa: F401
 
 from app.models.visualization_model import *
 from app.config.settings import settings
+from utils.task_context import remaining_timeout
 from app.models.report_model import *
 from app.models.product_model import *
 from app.models.dify_model import *
@@ -17,17 +21,42 @@ from app.utils.time_handle import *
 
 logger = logging.getLogger(__name__)
 
+PRODUCTS_FILE = Path(__file__).parent.parent / "data" / "product.json"
+
+# 产品数据（进程内共享），每份报告都会创建服务实例，产品文件只在修改后重新加载
+_product_cache: Dict[str, Any] = {"mtime": None, "products": []}
+_product_cache_lock = threading.Lock()
+
+
+def load_product_catalog() -> List[ProductModel]:
+    """加载产品数据（按文件修改时间缓存，批量处理时所有报告共用一份）"""
+    try:
+        mtime = PRODUCTS_FILE.stat().st_mtime
+    except OSError as e:
+        logger.error(f"加载产品数据失败: {str(e)}")
+        return []
+    with _product_cache_lock:
+        if _product_cache["mtime"] != mtime:
+            try:
+                with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
+                    products = json.load(f)
+                _product_cache["products"] = [ProductModel(**product) for product in products]
+                _product_cache["mtime"] = mtime
+                logger.info(f"成功加载 {len(products)} 个产品")
+            except Exception as e:
+                logger.error(f"加载产品数据失败: {str(e)}")
+                return []
+        return _product_cache["products"]
+
 
 class ProductRecommendService:
     """产品推荐服务"""
 
     def __init__(self):
         """初始化服务"""
-        # 初始化OpenAI客户端
-        self.client = OpenAI(
-            base_url=settings.openai.base_url,
-            api_key=settings.openai.api_key
-        )
+        # OpenAI 配置（异步客户端在每次调用时创建并关闭）
+        self.base_url = settings.openai.base_url
+        self.api_key = settings.openai.api_key
         self.model = settings.openai.model
         self.timeout = settings.openai.timeout
         self.temperature = settings.openai.temperature
@@ -37,15 +66,7 @@ class ProductRecommendService:
     
     def _load_products(self) -> List[ProductModel]:
         """加载产品数据"""
-        try:
-            products_file = Path(__file__).parent.parent / "data" / "product.json"
-            with open(products_file, 'r', encoding='utf-8') as f:
-                products = json.load(f)
-            logger.info(f"成功加载 {len(products)} 个产品")
-            return [ProductModel(**product) for product in products]
-        except Exception as e:
-            logger.error(f"加载产品数据失败: {str(e)}")
-            return []
+        return load_product_catalog()
         
     def _filter_product(
             self,
@@ -490,7 +511,7 @@ class ProductRecommendService:
             logger.error(f"产品 {product_name}: 检查负债要求失败: {str(e)}")
             return False  # 出错时默认不符合
     
-    def generate_recommendations(
+    async def generate_recommendations(
         self,
         personal_info: PersonalInfo,
         stats: StatCard,
@@ -548,7 +569,7 @@ class ProductRecommendService:
             prompt = self._build_prompt(user_summary, products_summary)
             
             # 调用大模型
-            response = self._call_llm(prompt)
+            response = await self._call_llm(prompt)
             
             # 解析响应
             recommendations = self._parse_response(response)
@@ -742,24 +763,25 @@ class ProductRecommendService:
 """
         return prompt
     
-    def _call_llm(self, prompt: str) -> str:
+    async def _call_llm(self, prompt: str) -> str:
         """调用大模型"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一位专业的金融产品推荐专家，擅长根据用户的信用状况推荐合适的金融产品。"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                timeout=self.timeout,
-                temperature=self.temperature
-            )
+            async with AsyncOpenAI(base_url=self.base_url, api_key=self.api_key) as client:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "你是一位专业的金融产品推荐专家，擅长根据用户的信用状况推荐合适的金融产品。"
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    timeout=remaining_timeout(self.timeout),
+                    temperature=self.temperature
+                )
             
             content = response.choices[0].message.content
             logger.info(f"大模型响应: {content[:200]}...")
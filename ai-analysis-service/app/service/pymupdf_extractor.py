@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PyMuPDF 文本解析（可选引擎）
+
+按文本块读取页面文字，每个文本块作为一个内容块，不识别表格。
+需要另外安装: pip install pymupdf（AGPL 许可，商业部署前请确认许可条款）；未安装时该引擎不可用。
+
+与 service/pdf_extractor.py 相同，函数均为模块级函数，可以在进程池的工作进程中执行。
+"""
+
+import threading
+from typing import List, Dict, Any, Optional
+
+try:
+    import pymupdf
+except ImportError:
+    # 1.24 之前的版本只提供 fitz 模块名
+    import fitz as pymupdf
+
+from service.pdf_extractor import PdfSourceRef, image_coverage, reset_peak_rss, read_peak_rss
+
+
+# 解析器版本：输出格式变化时需要修改，Markdown 缓存按此区分
+EXTRACTOR_VERSION = f"pymupdf-{pymupdf.VersionBind}.blocks-1"
+
+# MuPDF 不是线程安全的：在线程池中执行时同一进程内的调用需要串行
+_LOCK = threading.Lock()
+
+# get_text("blocks") 结果中文本块的类型
+_TEXT_BLOCK = 0
+
+
+def _open(source: PdfSourceRef) -> "pymupdf.Document":
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pymupdf.open(stream=bytes(source), filetype="pdf")
+    return pymupdf.open(source, filetype="pdf")
+
+
+def page_items(page: "pymupdf.Page") -> List[str]:
+    """按阅读顺序输出文本块，去除每行首尾空白和空行"""
+    items = []
+    for block in page.get_text("blocks", sort=True):
+        if block[6] != _TEXT_BLOCK:
+            continue
+        content = "\n".join(line for line in (raw_line.strip() for raw_line in block[4].splitlines()) if line)
+        if content:
+            items.append(content)
+    return items
+
+
+def page_density(page: "pymupdf.Page", items: Optional[List[str]] = None) -> Dict[str, Any]:
+    """页面文字密度：非空白字符数、图片覆盖率（与 pdfplumber 引擎的统计口径一致）"""
+    if items is None:
+        items = page_items(page)
+    chars = sum(1 for item in items for char in item if not char.isspace())
+    boxes = []
+    for image in page.get_images(full=True):
+        for rect in page.get_image_rects(image[0]):
+            boxes.append((rect.x0, rect.y0, rect.x1, rect.y1))
+    return {"chars": chars, "image_ratio": image_coverage(boxes, page.rect.width, page.rect.height)}
+
+
+def count_pages(source: PdfSourceRef) -> int:
+    """PDF 页数"""
+    with _LOCK, _open(source) as document:
+        return document.page_count
+
+
+def probe(source: PdfSourceRef) -> Dict[str, Any]:
+    """进程池任务：快速探测，返回页数和第 1 页的文字密度"""
+    with _LOCK, _open(source) as document:
+        if document.page_count == 0:
+            return {"pages": 0, "chars": 0, "image_ratio": 0.0}
+        return {"pages": document.page_count, **page_density(document[0])}
+
+
+def extract_chunk(source: PdfSourceRef, start: int, end: int) -> Dict[str, Any]:
+    """
+    进程池任务：解析 [start, end) 范围内的页面（返回格式与 pdfplumber 引擎相同）
+
+    Returns:
+        {"pages": 每页内容块列表, "density": 每页文字密度, "peak_rss": 峰值常驻内存（字节），无法统计时为 None}
+    """
+    reset = reset_peak_rss()
+    pages = []
+    density = []
+    with _LOCK, _open(source) as document:
+        for number in range(start, min(end, document.page_count)):
+            page = document[number]
+            items = page_items(page)
+            pages.append(items)
+            density.append(page_density(page, items))
+    return {"pages": pages, "density": density, "peak_rss": read_peak_rss() if reset else None}
@@ -0,0 +1,263 @@
+"""
+自适应并发控制（AIMD）
+
+根据观测到的延迟和上游过载信号动态调整并发上限：
+- 加性增：窗口内 p95 延迟不超过目标值时，并发上限 +1
+- 乘性减：出现超时、HTTP 429/5xx，或窗口内 p95 延迟超过目标值时，并发上限乘以减小系数
+
+提供两级限流：
+- 全局限流器：由 RequestQueue 持有，限制同时处理的任务数（上限为 QUEUE_MAX_CONCURRENT_TASKS）
+- 上游限流器：按上游服务（dify/ocr/bigdata/llm）分别限流，被限流的上游不会拖慢其他上游
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+
+import httpx
+from loguru import logger
+
+from config.settings import settings
+from utils.errors import UpstreamHTTPError
+
+
+UPSTREAM_DIFY = "dify"
+UPSTREAM_OCR = "ocr"
+UPSTREAM_BIGDATA = "bigdata"
+UPSTREAM_LLM = "llm"
+
+# 过载原因
+OVERLOAD_TIMEOUT = "timeout"
+OVERLOAD_RATE_LIMITED = "rate_limited"
+OVERLOAD_SERVER_ERROR = "server_error"
+OVERLOAD_LATENCY = "latency"
+
+
+def classify_overload(exc: BaseException) -> Optional[str]:
+    """判断异常是否为上游过载信号，返回过载原因，非过载错误返回 None"""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException)):
+        return OVERLOAD_TIMEOUT
+    if exc.__class__.__name__ == "APITimeoutError":
+        return OVERLOAD_TIMEOUT
+
+    status_code = exc.status_code if isinstance(exc, UpstreamHTTPError) else getattr(exc, "status_code", None)
+    if isinstance(status_code, int):
+        if status_code in (408, 429):
+            return OVERLOAD_TIMEOUT if status_code == 408 else OVERLOAD_RATE_LIMITED
+        if status_code >= 500:
+            return OVERLOAD_SERVER_ERROR
+    return None
+
+
+class AdaptiveLimiter:
+    """AIMD 自适应并发限流器"""
+
+    def __init__(
+        self,
+        name: str,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        target_latency: float = 60.0,
+        window_size: int = 20,
+        decrease_ratio: float = 0.7,
+        cooldown_seconds: float = 5.0,
+        adaptive: bool = True
+    ):
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = min(self.max_limit, max(self.min_limit, initial_limit or self.max_limit))
+        self.target_latency = target_latency
+        self.window_size = window_size
+        self.decrease_ratio = decrease_ratio
+        self.cooldown_seconds = cooldown_seconds
+        self.adaptive = adaptive
+
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._latencies: deque = deque(maxlen=window_size)
+        self._samples_since_adjust = 0
+        self._last_decrease_at = 0.0
+        self._adjustments: deque = deque(maxlen=20)
+        self._stats = {
+            "increases": 0,
+            "decreases": 0,
+            OVERLOAD_TIMEOUT: 0,
+            OVERLOAD_RATE_LIMITED: 0,
+            OVERLOAD_SERVER_ERROR: 0,
+            OVERLOAD_LATENCY: 0,
+        }
+
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        获取一个并发名额
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            是否获取成功（超时返回 False）
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # 名额已分配但调用方被取消，归还名额
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def release(self):
+        """归还一个并发名额"""
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """占用一个并发名额执行，并根据耗时和异常类型调整并发上限"""
+        await self.acquire()
+        started_at = time.time()
+        try:
+            yield
+        except Exception as e:
+            reason = classify_overload(e)
+            if reason:
+                self.record_overload(reason)
+            raise
+        else:
+            self.record_latency(time.time() - started_at)
+        finally:
+            self.release()
+
+    def record_latency(self, latency: float):
+        """记录一次成功调用的耗时，每满一个窗口调整一次并发上限"""
+        self._latencies.append(latency)
+        self._samples_since_adjust += 1
+        if self._samples_since_adjust < self.window_size:
+            return
+
+        self._samples_since_adjust = 0
+        p95 = self._p95_latency()
+        if p95 > self.target_latency:
+            self._stats[OVERLOAD_LATENCY] += 1
+            self._decrease(OVERLOAD_LATENCY, f"p95={p95:.1f}s > {self.target_latency:.1f}s")
+        else:
+            self._increase(f"p95={p95:.1f}s")
+
+    def record_overload(self, reason: str):
+        """记录一次过载信号（超时、429、5xx），立即减小并发上限"""
+        self._stats[reason] = self._stats.get(reason, 0) + 1
+        self._samples_since_adjust = 0
+        self._decrease(reason)
+
+    def _increase(self, detail: str):
+        if not self.adaptive or self.limit >= self.max_limit:
+            return
+        self._set_limit(self.limit + 1, "increase", detail)
+        self._stats["increases"] += 1
+
+    def _decrease(self, reason: str, detail: str = ""):
+        if not self.adaptive or self.limit <= self.min_limit:
+            return
+        # 同一波过载通常会同时触发多个失败，冷却期内只减小一次
+        now = time.time()
+        if now - self._last_decrease_at < self.cooldown_seconds:
+            return
+        self._last_decrease_at = now
+        new_limit = max(self.min_limit, min(self.limit - 1, math.floor(self.limit * self.decrease_ratio)))
+        self._set_limit(new_limit, reason, detail)
+        self._stats["decreases"] += 1
+
+    def _set_limit(self, new_limit: int, reason: str, detail: str):
+        old_limit = self.limit
+        self.limit = new_limit
+        self._adjustments.append({
+            "timestamp": time.time(),
+            "from": old_limit,
+            "to": new_limit,
+            "reason": reason,
+        })
+        log = logger.info if new_limit > old_limit else logger.warning
+        log(f"⚖️ [自适应并发] {self.name}: {old_limit} → {new_limit}, 原因: {reason} {detail}".rstrip())
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _p95_latency(self) -> float:
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "adaptive": self.adaptive,
+            "target_latency_seconds": self.target_latency,
+            "p95_latency_seconds": self._p95_latency(),
+            "recent_adjustments": list(self._adjustments),
+        }
+
+
+def create_limiter(name: str, max_limit: int, target_latency: float, min_limit: int = 1) -> AdaptiveLimiter:
+    """按全局自适应配置创建限流器"""
+    return AdaptiveLimiter(
+        name=name,
+        max_limit=max_limit,
+        min_limit=min_limit,
+        target_latency=target_latency,
+        window_size=settings.adaptive.window_size,
+        decrease_ratio=settings.adaptive.decrease_ratio,
+        cooldown_seconds=settings.adaptive.cooldown_seconds,
+        adaptive=settings.adaptive.enabled
+    )
+
+
+# 上游限流器，上限与对应阶段的并发一致
+upstream_limiters: Dict[str, AdaptiveLimiter] = {
+    UPSTREAM_DIFY: create_limiter(
+        UPSTREAM_DIFY, settings.stage.dify_concurrency, settings.adaptive.dify_target_latency
+    ),
+    UPSTREAM_OCR: create_limiter(
+        UPSTREAM_OCR, settings.stage.markdown_concurrency, settings.adaptive.ocr_target_latency
+    ),
+    UPSTREAM_BIGDATA: create_limiter(
+        UPSTREAM_BIGDATA, settings.stage.bigdata_concurrency, settings.adaptive.bigdata_target_latency
+    ),
+    UPSTREAM_LLM: create_limiter(
+        UPSTREAM_LLM, settings.stage.convert_concurrency, settings.adaptive.llm_target_latency
+    ),
+}
+
+
+def get_upstream_stats() -> Dict[str, Any]:
+    return {name: limiter.get_stats() for name, limiter in upstream_limiters.items()}
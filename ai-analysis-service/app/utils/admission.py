@@ -0,0 +1,195 @@
+"""
+准入控制
+
+队列原来只按排队任务数限流，一批 40MB 的扫描件 PDF 与 40 个小 Markdown 请求被同等对待。
+准入控制器按两个预算决定是否接收新请求：
+- 内存预算: 已接收、未结束请求的数据总量加上新请求的数据量，不超过 ADMISSION_MAX_INFLIGHT_MB
+- 延迟预算: 新请求的预计等待时间加上预测耗时，不超过 ADMISSION_MAX_PREDICTED_LATENCY
+
+超出预算时抛出 AdmissionRejected，接口返回 HTTP 429，Retry-After 为预计恢复到预算内所需的秒数
+（按在途请求的预测耗时模拟它们在各并发槽位上的完成顺序）。
+
+队列任务在提交时登记、结束时释放；同步接口（/analyze/sync、/income）在处理期间持有名额。
+没有在途请求时总是接收，单个请求的大小由 FILE_MAX_FILE_SIZE 限制。
+"""
+
+import heapq
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable, List, Tuple, Iterator
+from loguru import logger
+
+from config.settings import settings
+
+
+REASON_MEMORY = "memory"
+REASON_LATENCY = "latency"
+REASON_TENANT_QUOTA = "tenant_quota"  # 租户排队配额（由队列检查，见 utils/tenants.py）
+
+
+class AdmissionRejected(Exception):
+    """请求超出准入预算"""
+
+    def __init__(self, reason: str, retry_after: int, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionTicket:
+    """已接收的请求"""
+    size_bytes: int
+    predicted_seconds: float
+    admitted_at: float = field(default_factory=time.time)
+
+
+class AdmissionController:
+    """按在途数据量和预测工作量的准入控制"""
+
+    def __init__(
+        self,
+        max_inflight_bytes: int,
+        max_predicted_latency: float,
+        concurrency: int = 1,
+        enabled: bool = True,
+        max_retry_after: int = 300
+    ):
+        """
+        Args:
+            max_inflight_bytes: 在途请求数据总量上限（字节）
+            max_predicted_latency: 新请求预计完成时间（等待 + 处理）上限（秒）
+            concurrency: 并发处理数（可通过 concurrency_provider 动态获取）
+            enabled: 关闭时只登记不拒绝
+            max_retry_after: Retry-After 上限（秒）
+        """
+        self.max_inflight_bytes = max_inflight_bytes
+        self.max_predicted_latency = max_predicted_latency
+        self.concurrency = concurrency
+        self.enabled = enabled
+        self.max_retry_after = max_retry_after
+        # 队列启动后设置为当前的自适应并发上限
+        self.concurrency_provider: Optional[Callable[[], int]] = None
+        self._tickets: Dict[str, AdmissionTicket] = {}
+        self._inflight_bytes = 0
+        self._stats = {
+            "admitted": 0,
+            "rejected_memory": 0,
+            "rejected_latency": 0,
+        }
+
+    def admit(self, ticket_id: str, size_bytes: int, predicted_seconds: float, force: bool = False):
+        """
+        登记新请求，超出预算时抛出 AdmissionRejected
+
+        Args:
+            ticket_id: 请求标识（任务ID或同步请求ID）
+            size_bytes: 请求数据量（字节）
+            predicted_seconds: 预测处理耗时（秒）
+            force: 不检查预算直接登记（例如重启后恢复的任务）
+        """
+        if not force and self.enabled and self._tickets:
+            self._check(size_bytes, predicted_seconds)
+
+        self._tickets[ticket_id] = AdmissionTicket(size_bytes, predicted_seconds)
+        self._inflight_bytes += size_bytes
+        self._stats["admitted"] += 1
+
+    def release(self, ticket_id: str):
+        """请求结束后释放名额（未登记的请求忽略）"""
+        ticket = self._tickets.pop(ticket_id, None)
+        if ticket:
+            self._inflight_bytes -= ticket.size_bytes
+
+    @contextmanager
+    def hold(self, ticket_id: str, size_bytes: int, predicted_seconds: float) -> Iterator[None]:
+        """在处理期间持有名额（同步接口）"""
+        self.admit(ticket_id, size_bytes, predicted_seconds)
+        try:
+            yield
+        finally:
+            self.release(ticket_id)
+
+    def _check(self, size_bytes: int, predicted_seconds: float):
+        finish_times, wait = self._simulate()
+
+        if self._inflight_bytes + size_bytes > self.max_inflight_bytes:
+            # 按预计完成顺序释放在途数据，直到能容纳新请求
+            excess = self._inflight_bytes + size_bytes - self.max_inflight_bytes
+            freed, retry_after = 0, wait
+            for finish_at, ticket in finish_times:
+                freed += ticket.size_bytes
+                retry_after = finish_at
+                if freed >= excess:
+                    break
+            self._reject(
+                REASON_MEMORY, retry_after,
+                f"在途请求数据量已达上限 ({self._inflight_bytes / (1024 * 1024):.1f}MB"
+                f" + {size_bytes / (1024 * 1024):.1f}MB > {self.max_inflight_bytes / (1024 * 1024):.0f}MB)"
+            )
+
+        predicted_latency = wait + predicted_seconds
+        if predicted_latency > self.max_predicted_latency:
+            self._reject(
+                REASON_LATENCY, predicted_latency - self.max_predicted_latency,
+                f"预计完成时间 {predicted_latency:.0f}s 超过上限 {self.max_predicted_latency:.0f}s"
+            )
+
+    def _simulate(self) -> Tuple[List[Tuple[float, AdmissionTicket]], float]:
+        """
+        按登记顺序把在途请求分配给最早空闲的并发槽位
+
+        最早登记的 concurrency 个请求视为正在处理，扣除已用时间（保留预测耗时的 10%）。
+
+        Returns:
+            (按完成时间排序的 [(完成时间偏移, 请求)], 新请求的预计等待时间)
+        """
+        now = time.time()
+        workers = max(1, self._current_concurrency())
+        slots = [0.0] * workers
+        finish_times = []
+        tickets = sorted(self._tickets.values(), key=lambda ticket: ticket.admitted_at)
+        for index, ticket in enumerate(tickets):
+            duration = ticket.predicted_seconds
+            if index < workers:
+                duration = max(duration - (now - ticket.admitted_at), duration * 0.1)
+            free_at = heapq.heappop(slots) + duration
+            heapq.heappush(slots, free_at)
+            finish_times.append((free_at, ticket))
+        finish_times.sort(key=lambda item: item[0])
+        return finish_times, slots[0]
+
+    def _current_concurrency(self) -> int:
+        if self.concurrency_provider:
+            return self.concurrency_provider()
+        return self.concurrency
+
+    def _reject(self, reason: str, retry_after: float, message: str):
+        self._stats[f"rejected_{reason}"] += 1
+        retry_after = min(self.max_retry_after, max(1, math.ceil(retry_after)))
+        logger.warning(f"🚦 请求被准入控制拒绝: {message}, Retry-After: {retry_after}s")
+        raise AdmissionRejected(reason, retry_after, message)
+
+    def get_stats(self) -> Dict[str, Any]:
+        _, wait = self._simulate()
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "inflight_requests": len(self._tickets),
+            "inflight_mb": round(self._inflight_bytes / (1024 * 1024), 2),
+            "max_inflight_mb": round(self.max_inflight_bytes / (1024 * 1024), 2),
+            "predicted_wait_seconds": round(wait, 2),
+            "max_predicted_latency_seconds": self.max_predicted_latency,
+        }
+
+
+# 全局准入控制器（队列任务和同步接口共用）
+admission_controller = AdmissionController(
+    max_inflight_bytes=settings.admission.max_inflight_mb * 1024 * 1024,
+    max_predicted_latency=settings.admission.max_predicted_latency,
+    concurrency=settings.queue.max_concurrent_tasks,
+    enabled=settings.admission.enabled,
+    max_retry_after=settings.admission.max_retry_after
+)
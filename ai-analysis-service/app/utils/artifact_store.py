@@ -0,0 +1,84 @@
+"""
+磁盘产物存储
+
+将体积较大的任务产物（报告结果、HTML、PDF 等）写入磁盘，内存中仅保留引用（相对路径）。
+写入采用 "临时文件 + 原子重命名"，保证读取方不会读到写了一半的文件。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+from loguru import logger
+
+
+class ArtifactStore:
+    """基于本地目录的产物存储"""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    def put_bytes(self, key: str, data: bytes) -> str:
+        """写入二进制数据，返回引用"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key
+
+    def get_bytes(self, ref: str) -> Optional[bytes]:
+        """读取二进制数据，不存在时返回 None"""
+        path = self._path(ref)
+        if not path.exists():
+            return None
+        return path.read_bytes()
+
+    def put_json(self, key: str, value: Any) -> str:
+        """写入 JSON 数据，返回引用"""
+        data = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+        return self.put_bytes(key, data)
+
+    def get_json(self, ref: str) -> Any:
+        """读取 JSON 数据，不存在时返回 None"""
+        data = self.get_bytes(ref)
+        return json.loads(data) if data is not None else None
+
+    def put_text(self, key: str, text: str) -> str:
+        """写入文本数据，返回引用"""
+        return self.put_bytes(key, text.encode("utf-8"))
+
+    def get_text(self, ref: str) -> Optional[str]:
+        """读取文本数据，不存在时返回 None"""
+        data = self.get_bytes(ref)
+        return data.decode("utf-8") if data is not None else None
+
+    def exists(self, ref: str) -> bool:
+        return self._path(ref).exists()
+
+    def delete(self, ref: str) -> None:
+        """删除单个产物或整个产物目录"""
+        path = self._path(ref)
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+        except Exception as e:
+            logger.warning(f"删除产物失败: {ref}, 错误: {e}")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root_dir / key).resolve()
+        if self.root_dir.resolve() not in path.parents:
+            raise ValueError(f"非法的产物路径: {key}")
+        return path
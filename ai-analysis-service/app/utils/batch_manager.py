@@ -0,0 +1,403 @@
+"""
+批量提交
+
+后台一次需要分析上百份报告时，通过 /analysis/batch 提交整个批次（JSON 清单或 multipart 上传），不必逐个调用 /analysis：
+- 接收时逐个校验条目，并把每份文件暂存到产物存储（batches/{batch_id}/），内存中只保留清单
+- 每个批次一个投递协程，按 max_parallel 限制同时在队列中（排队或处理中）的条目数，通过 RequestQueue.add_task
+  逐个提交；队列已满或被准入控制拒绝时按 Retry-After 等待后重新提交，提交后删除暂存文件
+- 条目结束时写入结果流，GET /analysis/batch/{batch_id}/results 以 NDJSON 按结束顺序逐行返回
+- 批次状态保存在接收批次的进程内存中，结束后保留 BATCH_RETENTION_TTL 秒。条目本身是普通队列任务，
+  可以通过 /task/{task_id} 查询；进程重启后已提交的任务继续处理，尚未提交的条目丢失
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, AsyncIterator
+
+from loguru import logger
+
+from config.settings import settings
+from utils.admission import AdmissionRejected
+from utils.errors import QueueFull
+from utils.queue_manager import RequestQueue, request_queue
+
+
+# 条目状态：未提交、提交失败，其余与任务状态一致（pending/processing/completed/failed/cancelled）
+ITEM_WAITING = "waiting"
+ITEM_REJECTED = "rejected"
+ITEM_FINISHED = ("completed", "failed", "cancelled", ITEM_REJECTED)
+
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+BATCH_CANCELLED = "cancelled"
+
+
+@dataclass
+class BatchItem:
+    """批次中的一份文档"""
+    index: int
+    file_name: Optional[str] = None
+    spool_ref: Optional[str] = None  # 提交前暂存在产物存储中的请求数据
+    request_data: Optional[Dict[str, Any]] = None  # 没有产物存储时暂存在内存中
+    callback_data: Optional[Dict[str, Any]] = None
+    task_id: Optional[str] = None
+    status: str = ITEM_WAITING
+    deduplicated: bool = False
+    error_message: Optional[str] = None
+    completed_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "file_name": self.file_name,
+            "task_id": self.task_id,
+            "status": self.status,
+            "deduplicated": self.deduplicated,
+            "error_message": self.error_message,
+            "completed_at": self.completed_at,
+        }
+
+
+@dataclass
+class BatchJob:
+    """批次"""
+    batch_id: str
+    max_parallel: int
+    priority: int = 0
+    deadline: Optional[float] = None
+    tenant_id: Optional[str] = None
+    callback_url: Optional[str] = None
+    items: List[BatchItem] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    completed_at: Optional[float] = None
+    cancelled: bool = False
+    # 条目结束顺序，结果流按此顺序输出
+    finished_order: List[int] = field(default_factory=list)
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+    runner: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        if self.completed_at is None:
+            return BATCH_RUNNING
+        return BATCH_CANCELLED if self.cancelled else BATCH_COMPLETED
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+    def progress(self) -> Dict[str, Any]:
+        total = len(self.items)
+        finished = len(self.finished_order)
+        return {
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "total": total,
+            "finished": finished,
+            "progress": round(finished / total, 4) if total else 1.0,
+            "counts": self.counts(),
+        }
+
+
+class BatchManager:
+    """批次的接收、限流投递和结果流"""
+
+    def __init__(
+        self,
+        queue: RequestQueue,
+        max_items: int = 500,
+        default_parallel: int = 4,
+        max_parallel: int = 16,
+        item_timeout: float = 6 * 3600,
+        retention_ttl: float = 24 * 3600,
+        retry_interval: float = 5.0
+    ):
+        """
+        Args:
+            queue: 请求队列
+            max_items: 每个批次的条目数上限
+            default_parallel: 未指定时每个批次同时在队列中的条目数
+            max_parallel: 每个批次同时在队列中的条目数上限
+            item_timeout: 等待单个条目结束的最长时间（秒）
+            retention_ttl: 已结束批次的保留时间（秒）
+            retry_interval: 队列已满时重新提交的间隔（秒）
+        """
+        self.queue = queue
+        self.max_items = max_items
+        self.default_parallel = default_parallel
+        self.max_parallel = max_parallel
+        self.item_timeout = item_timeout
+        self.retention_ttl = retention_ttl
+        self.retry_interval = retry_interval
+        self.batches: Dict[str, BatchJob] = {}
+
+    def create_batch(
+        self,
+        max_parallel: Optional[int] = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        callback_url: Optional[str] = None
+    ) -> BatchJob:
+        """创建批次（通过 add_item 添加条目，start 开始投递）"""
+        self._purge_expired()
+        batch = BatchJob(
+            batch_id=f"batch_{uuid.uuid4().hex}",
+            max_parallel=min(max_parallel or self.default_parallel, self.max_parallel),
+            priority=priority,
+            deadline=deadline,
+            tenant_id=tenant_id,
+            callback_url=callback_url
+        )
+        if callback_url:
+            if not self.queue.webhooks:
+                raise ValueError("任务回调未启用（WEBHOOK_ENABLED=false）")
+            self.queue.webhooks.validate_url(callback_url)
+        return batch
+
+    async def add_item(
+        self,
+        batch: BatchJob,
+        request_data: Optional[Dict[str, Any]],
+        file_name: Optional[str] = None,
+        callback_data: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> BatchItem:
+        """
+        添加条目并暂存请求数据
+
+        Args:
+            error: 条目校验失败的原因，不为空时条目直接记为 rejected
+        """
+        if len(batch.items) >= self.max_items:
+            raise ValueError(f"批次条目数超过上限 ({self.max_items})")
+
+        item = BatchItem(index=len(batch.items), file_name=file_name, callback_data=callback_data)
+        batch.items.append(item)
+        if error:
+            self._finish_item(batch, item, ITEM_REJECTED, error)
+            return item
+
+        artifacts = self.queue.artifacts
+        if artifacts:
+            item.spool_ref = await asyncio.to_thread(
+                artifacts.put_json, f"batches/{batch.batch_id}/{item.index}.json", request_data
+            )
+        else:
+            item.request_data = request_data
+        return item
+
+    def start(self, batch: BatchJob):
+        """登记批次并开始投递"""
+        self.batches[batch.batch_id] = batch
+        batch.runner = asyncio.create_task(self._run(batch))
+        logger.info(
+            f"📦 批次已提交: {batch.batch_id}, 条目数: {len(batch.items)}, "
+            f"校验失败: {batch.counts().get(ITEM_REJECTED, 0)}, 并发: {batch.max_parallel}"
+        )
+
+    async def discard(self, batch: BatchJob):
+        """接收批次失败：删除已暂存的请求数据"""
+        if self.queue.artifacts:
+            await asyncio.to_thread(self.queue.artifacts.delete, f"batches/{batch.batch_id}")
+
+    def get_batch(self, batch_id: str) -> Optional[BatchJob]:
+        return self.batches.get(batch_id)
+
+    async def cancel(self, batch_id: str) -> bool:
+        """取消批次：不再提交剩余条目，并取消本批次新建的未结束任务（关联到已有任务的条目不取消）"""
+        batch = self.batches.get(batch_id)
+        if batch is None or batch.completed_at is not None:
+            return False
+        batch.cancelled = True
+        for item in batch.items:
+            if item.task_id and not item.deduplicated and item.status not in ITEM_FINISHED:
+                await self.queue.cancel_task(item.task_id)
+        logger.info(f"批次已取消: {batch_id}")
+        return True
+
+    async def stop(self):
+        """服务关闭：停止投递（已提交的任务由队列继续处理或在重启后恢复）"""
+        runners = [batch.runner for batch in self.batches.values() if batch.runner and not batch.runner.done()]
+        for runner in runners:
+            runner.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+
+    async def stream_results(self, batch: BatchJob, include_files: bool = False,
+                             keepalive: float = 15.0) -> AsyncIterator[str]:
+        """
+        按结束顺序逐行输出条目结果（NDJSON），全部结束后输出批次汇总
+
+        每行为 {"event": "item", ...}；等待期间每 keepalive 秒输出一行 {"event": "progress", ...}，
+        最后一行为 {"event": "batch", ...}。
+        """
+        sent = 0
+        while True:
+            async with batch.changed:
+                try:
+                    await asyncio.wait_for(
+                        batch.changed.wait_for(lambda: len(batch.finished_order) > sent or batch.completed_at),
+                        timeout=keepalive
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                indexes = batch.finished_order[sent:]
+                done = batch.completed_at is not None
+
+            if not indexes and not done:
+                yield self._line({"event": "progress", **batch.progress()})
+                continue
+            for index in indexes:
+                yield self._line(await self._item_result(batch, batch.items[index], include_files))
+            sent += len(indexes)
+            if done and sent >= len(batch.finished_order):
+                yield self._line({"event": "batch", **batch.progress()})
+                return
+
+    async def _item_result(self, batch: BatchJob, item: BatchItem, include_files: bool) -> Dict[str, Any]:
+        line = {"event": "item", "batch_id": batch.batch_id, **item.to_dict()}
+        if item.status != "completed" or not item.task_id:
+            return line
+        task = await self.queue.get_task_status(item.task_id)
+        result = await self.queue.load_result(task) if task else None
+        if result:
+            line["processing_time"] = result.get("processing_time")
+            line["analysis_result"] = result.get("visualization_report")
+            if include_files:
+                line["html_file"] = result.get("html_file")
+                line["pdf_file"] = result.get("pdf_file")
+        return line
+
+    async def _run(self, batch: BatchJob):
+        """投递协程：最多 max_parallel 个条目同时在队列中"""
+        slots = asyncio.Semaphore(batch.max_parallel)
+        runners = []
+
+        async def run_item(item: BatchItem):
+            try:
+                await self._run_item(batch, item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"批次条目处理异常: {batch.batch_id}#{item.index}, 错误: {e}")
+                self._finish_item(batch, item, ITEM_REJECTED, str(e))
+            finally:
+                slots.release()
+
+        try:
+            for item in batch.items:
+                if item.status != ITEM_WAITING:
+                    continue
+                await slots.acquire()
+                if batch.cancelled:
+                    slots.release()
+                    break
+                runners.append(asyncio.create_task(run_item(item)))
+            await asyncio.gather(*runners)
+        except asyncio.CancelledError:
+            for runner in runners:
+                runner.cancel()
+            await asyncio.gather(*runners, return_exceptions=True)
+            raise
+        finally:
+            for item in batch.items:
+                if item.status == ITEM_WAITING:
+                    self._finish_item(batch, item, "cancelled", "批次已取消" if batch.cancelled else "服务关闭，条目未提交")
+            batch.completed_at = time.time()
+            await self._notify(batch)
+            if self.queue.artifacts:
+                await asyncio.to_thread(self.queue.artifacts.delete, f"batches/{batch.batch_id}")
+            logger.info(f"📦 批次已结束: {batch.batch_id}, 统计: {batch.counts()}")
+
+    async def _run_item(self, batch: BatchJob, item: BatchItem):
+        """提交单个条目并等待结束"""
+        request_data = item.request_data
+        if request_data is None:
+            request_data = await asyncio.to_thread(self.queue.artifacts.get_json, item.spool_ref)
+        callback_data = None
+        if batch.callback_url:
+            callback_data = {**(item.callback_data or {}), "batchId": batch.batch_id, "batchIndex": item.index}
+
+        while True:
+            try:
+                task_id, deduplicated = await self.queue.add_task(
+                    request_data,
+                    priority=batch.priority,
+                    deadline=batch.deadline,
+                    tenant_id=batch.tenant_id,
+                    callback_url=batch.callback_url,
+                    callback_data=callback_data
+                )
+                break
+            except AdmissionRejected as e:
+                wait = e.retry_after
+            except QueueFull:
+                wait = self.retry_interval
+            except RuntimeError as e:
+                # 队列未启动、当前进程不接收新任务等，重新提交无法恢复
+                self._finish_item(batch, item, ITEM_REJECTED, str(e))
+                return
+            if batch.cancelled:
+                self._finish_item(batch, item, "cancelled", "批次已取消")
+                return
+            await asyncio.sleep(wait)
+
+        # 请求数据已写入任务存储，释放暂存
+        del request_data
+        item.request_data = None
+        if item.spool_ref:
+            await asyncio.to_thread(self.queue.artifacts.delete, item.spool_ref)
+            item.spool_ref = None
+        item.task_id = task_id
+        item.deduplicated = deduplicated
+        item.status = "pending"
+
+        try:
+            task = await self.queue.wait_for_task(task_id, self.item_timeout)
+        except asyncio.TimeoutError:
+            self._finish_item(batch, item, "failed", f"等待任务结束超时 (>{self.item_timeout:.0f}s)")
+            return
+        self._finish_item(batch, item, task.status.value, task.error_message)
+
+    def _finish_item(self, batch: BatchJob, item: BatchItem, status: str, error_message: Optional[str] = None):
+        item.status = status
+        item.error_message = error_message
+        item.completed_at = time.time()
+        batch.finished_order.append(item.index)
+        if batch.runner:
+            asyncio.ensure_future(self._notify(batch))
+
+    @staticmethod
+    async def _notify(batch: BatchJob):
+        async with batch.changed:
+            batch.changed.notify_all()
+
+    def _purge_expired(self):
+        expire_before = time.time() - self.retention_ttl
+        for batch_id in [
+            batch_id for batch_id, batch in self.batches.items()
+            if batch.completed_at is not None and batch.completed_at < expire_before
+        ]:
+            self.batches.pop(batch_id, None)
+
+    @staticmethod
+    def _line(value: Dict[str, Any]) -> str:
+        return json.dumps(value, ensure_ascii=False, default=str) + "\n"
+
+
+# 全局批次管理器
+batch_manager = BatchManager(
+    request_queue,
+    max_items=settings.batch.max_items,
+    default_parallel=settings.batch.default_parallel,
+    max_parallel=settings.batch.max_parallel,
+    item_timeout=settings.batch.item_timeout,
+    retention_ttl=settings.batch.retention_ttl
+)
@@ -0,0 +1,73 @@
+"""
+任务阶段检查点
+
+按任务保存各阶段的输出（Markdown、Dify输出、大数据报告、可视化数据、HTML），
+任务重试或服务重启后从第一个未完成的阶段继续，不再重复调用 PDF 解析、
+付费的 Dify 工作流和天远大数据接口。
+"""
+
+import asyncio
+from typing import Optional, Type, TypeVar
+from loguru import logger
+from pydantic import BaseModel
+
+from utils.artifact_store import ArtifactStore
+
+
+# 检查点名称
+CHECKPOINT_MARKDOWN = "markdown"
+CHECKPOINT_DIFY = "dify_output"
+CHECKPOINT_BIGDATA = "bigdata_report"
+CHECKPOINT_VISUALIZATION = "visualization_report"
+CHECKPOINT_HTML = "html"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class TaskCheckpoint:
+    """单个任务的阶段检查点"""
+
+    def __init__(self, artifacts: ArtifactStore, task_id: str):
+        self.artifacts = artifacts
+        self.task_id = task_id
+        self.prefix = f"checkpoints/{task_id}"
+
+    async def load_text(self, name: str) -> Optional[str]:
+        """读取文本检查点，不存在或读取失败时返回 None"""
+        try:
+            text = await asyncio.to_thread(self.artifacts.get_text, self._key(name, "txt"))
+        except Exception as e:
+            logger.warning(f"读取检查点失败: {self.task_id}/{name}, 错误: {e}")
+            return None
+        if text is not None:
+            logger.info(f"♻️ [检查点] 复用阶段结果: {name}, task_id: {self.task_id}")
+        return text
+
+    async def save_text(self, name: str, text: str):
+        """保存文本检查点（失败不影响主流程）"""
+        try:
+            await asyncio.to_thread(self.artifacts.put_text, self._key(name, "txt"), text)
+        except Exception as e:
+            logger.warning(f"保存检查点失败: {self.task_id}/{name}, 错误: {e}")
+
+    async def load_model(self, name: str, model_cls: Type[ModelT]) -> Optional[ModelT]:
+        """读取 Pydantic 模型检查点"""
+        text = await self.load_text(name)
+        if text is None:
+            return None
+        try:
+            return model_cls.model_validate_json(text)
+        except Exception as e:
+            logger.warning(f"检查点数据无效，重新执行阶段: {self.task_id}/{name}, 错误: {e}")
+            return None
+
+    async def save_model(self, name: str, model: BaseModel):
+        """保存 Pydantic 模型检查点（按别名序列化，保证可以无损还原）"""
+        await self.save_text(name, model.model_dump_json(by_alias=True))
+
+    async def clear(self):
+        """删除该任务的所有检查点"""
+        await asyncio.to_thread(self.artifacts.delete, self.prefix)
+
+    def _key(self, name: str, ext: str) -> str:
+        return f"{self.prefix}/{name}.{ext}"
@@ -0,0 +1,62 @@
+"""
+重复提交去重
+
+同一份报告经常被重复提交（重复点击、retryReport 重试、不同机构账号上传同一文件），
+每次都会完整执行一遍耗时的报告生成流程。提交时按"解码后文件内容的 SHA-256 + 影响输出的参数"
+计算去重键：
+- 去重键相同的任务正在排队/处理中时，新提交直接关联到该任务（single-flight）
+- 去重键相同的任务在结果缓存有效期（QUEUE_RESULT_CACHE_TTL）内已完成时，直接返回该任务
+
+客户端还可以通过幂等键（idempotency_key 字段或 Idempotency-Key 请求头）标识同一次提交，
+幂等键相同的重复提交总是返回同一个任务（已失败或取消的任务除外，允许重新提交）。
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from typing import Dict, Any, Optional
+
+
+# 按内容单独计算哈希的大字段
+CONTENT_FIELDS = ("file_base64", "markdown_content")
+
+
+def decode_file(request_data: Dict[str, Any]) -> Optional[bytes]:
+    """解码请求中的文件内容，无文件或无法解码时返回 None"""
+    file_base64 = request_data.get("file_base64")
+    if not file_base64:
+        return None
+    try:
+        return base64.b64decode(file_base64)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def compute_dedup_key(request_data: Dict[str, Any], file_bytes: Optional[bytes] = None) -> str:
+    """
+    计算请求的去重键
+
+    文件按解码后的内容计算哈希（同一文件不同的 base64 换行/填充方式得到相同的键），
+    其余非空参数（报告类型、提示词、姓名/身份证/手机号等）都会影响报告内容，一并参与计算。
+
+    Args:
+        request_data: 任务请求数据
+        file_bytes: 已解码的文件内容（避免重复解码）
+    """
+    if file_bytes is not None:
+        content = b"file:" + file_bytes
+    elif request_data.get("file_base64"):
+        # 无法解码时按原始内容计算
+        content = b"raw:" + request_data["file_base64"].encode("ascii", errors="replace")
+    else:
+        content = b"markdown:" + (request_data.get("markdown_content") or "").encode("utf-8")
+
+    params = {
+        key: value for key, value in request_data.items()
+        if key not in CONTENT_FIELDS and value is not None
+    }
+
+    digest = hashlib.sha256(hashlib.sha256(content).digest())
+    digest.update(json.dumps(params, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return digest.hexdigest()
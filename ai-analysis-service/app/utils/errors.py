@@ -0,0 +1,109 @@
+"""
+错误分类与重试策略
+
+将处理过程中的异常分为：
+- 可重试错误: 网络超时/连接失败、上游限流(429)、上游服务端错误(5xx)
+- 不可重试错误: 参数错误、数据格式错误、上游客户端错误(4xx)
+
+重试使用带随机抖动的指数退避。
+"""
+
+import asyncio
+import random
+from typing import Optional
+
+import httpx
+from pydantic import ValidationError
+
+
+class RetryableError(Exception):
+    """可重试错误"""
+
+
+class PermanentError(Exception):
+    """不可重试错误"""
+
+
+class DeadlineExceeded(PermanentError):
+    """任务已超过截止时间（客户端不再等待结果，重试没有意义）"""
+
+
+class TaskCancelled(PermanentError):
+    """任务已被取消（线程池中的同步代码通过检查任务上下文感知取消）"""
+
+
+class QueueFull(RuntimeError):
+    """排队任务数已达上限（稍后可以重新提交；继承 RuntimeError，接口统一返回 503）"""
+
+
+class UpstreamHTTPError(Exception):
+    """上游服务返回非成功状态码"""
+
+    def __init__(self, service: str, status_code: int, message: str = ""):
+        self.service = service
+        self.status_code = status_code
+        super().__init__(f"{service} 调用失败: HTTP {status_code}, {message}")
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in (408, 429) or self.status_code >= 500
+
+
+# 网络层面的临时错误
+_TRANSIENT_ERRORS = (
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+)
+
+# 代码或数据层面的确定性错误，重试无法恢复
+_PERMANENT_ERRORS = (
+    ValidationError,
+    ValueError,
+    TypeError,
+    KeyError,
+    AttributeError,
+    NotImplementedError,
+    FileNotFoundError,
+)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """判断异常是否可以重试"""
+    if isinstance(exc, PermanentError):
+        return False
+    if isinstance(exc, RetryableError):
+        return True
+    if isinstance(exc, UpstreamHTTPError):
+        return exc.retryable
+    if isinstance(exc, _TRANSIENT_ERRORS):
+        return True
+
+    # OpenAI SDK 的超时、连接、限流和服务端错误
+    status_code: Optional[int] = getattr(exc, "status_code", None)
+    if exc.__class__.__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    if isinstance(status_code, int):
+        return status_code in (408, 429) or status_code >= 500
+
+    if isinstance(exc, _PERMANENT_ERRORS):
+        return False
+
+    # 未知错误保持原有行为：允许重试
+    return True
+
+
+def backoff_delay(attempt: int, base: float = 2.0, max_delay: float = 60.0) -> float:
+    """
+    计算第 attempt 次重试前的等待时间（指数退避 + 随机抖动）
+
+    Args:
+        attempt: 重试次数，从1开始
+        base: 首次重试的基础等待时间（秒）
+        max_delay: 最大等待时间（秒）
+    """
+    delay = min(max_delay, base * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)
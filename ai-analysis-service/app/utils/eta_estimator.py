@@ -0,0 +1,245 @@
+"""
+任务耗时与完成时间预测
+
+按任务画像（报告类型 + 页数区间 + 文件大小区间）分别维护各阶段耗时的 EWMA 均值和方差，
+结合当前排队任务、处理中任务的剩余时间和并发数，预测任务的开始时间和完成时间。
+
+- 画像维度: 报告类型、PDF 页数（从 PDF 结构中统计 /Type /Page）、文件大小
+- 样本不足时逐级回退: 完整画像 → 报告类型 → 全部任务 → 默认值
+- 单任务耗时按阶段依赖关系组合: max(markdown + dify + convert, bigdata) + html + pdf
+"""
+
+import base64
+import binascii
+import heapq
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple
+
+
+# 各阶段的默认耗时（秒），在没有观测数据时使用
+DEFAULT_STAGE_SECONDS = {
+    "markdown": 15.0,
+    "dify": 60.0,
+    "bigdata": 5.0,
+    "convert": 30.0,
+    "html": 5.0,
+    "pdf": 10.0,
+    "income": 20.0,  # 收入信息提取（/income，不属于报告生成流程）
+}
+
+_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_PAGE_BUCKETS = ((5, "p1-5"), (15, "p6-15"), (40, "p16-40"))
+_SIZE_BUCKETS = ((1024 * 1024, "s0-1m"), (5 * 1024 * 1024, "s1-5m"))
+
+# p90 对应的标准正态分位数
+_Z_P90 = 1.2816
+
+
+def count_pdf_pages(pdf_bytes: bytes) -> int:
+    """从 PDF 结构中统计页数（压缩对象流中的页面无法统计，返回 0）"""
+    return len(_PAGE_PATTERN.findall(pdf_bytes))
+
+
+def build_profile(request_data: Dict[str, Any], file_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """
+    根据请求数据构建任务画像
+
+    Args:
+        request_data: 任务请求数据
+        file_bytes: 已解码的文件内容（未传入时从 file_base64 解码）
+
+    Returns:
+        {"report_type", "pages", "file_size", "key"}
+    """
+    report_type = request_data.get("report_type") or "unknown"
+    pages = 0
+    file_size = 0
+
+    file_base64 = request_data.get("file_base64")
+    if file_bytes is not None:
+        file_size = len(file_bytes)
+        pages = count_pdf_pages(file_bytes)
+    elif file_base64:
+        try:
+            pdf_bytes = base64.b64decode(file_base64)
+            file_size = len(pdf_bytes)
+            pages = count_pdf_pages(pdf_bytes)
+        except (binascii.Error, ValueError):
+            file_size = len(file_base64) * 3 // 4
+    elif request_data.get("markdown_content"):
+        file_size = len(request_data["markdown_content"].encode("utf-8"))
+
+    return {
+        "report_type": report_type,
+        "pages": pages,
+        "file_size": file_size,
+        "key": profile_key(report_type, pages, file_size),
+    }
+
+
+def profile_key(report_type: str, pages: int, file_size: int) -> str:
+    if pages <= 0:
+        page_bucket = "p?"
+    else:
+        page_bucket = next((name for limit, name in _PAGE_BUCKETS if pages <= limit), "p41+")
+    size_bucket = next((name for limit, name in _SIZE_BUCKETS if file_size <= limit), "s5m+")
+    return f"{report_type}|{page_bucket}|{size_bucket}"
+
+
+@dataclass
+class EwmaStat:
+    """指数加权的均值和方差"""
+    mean: float = 0.0
+    variance: float = 0.0
+    count: int = 0
+
+    def update(self, value: float, alpha: float):
+        if self.count == 0:
+            self.mean = value
+            self.variance = 0.0
+        else:
+            delta = value - self.mean
+            self.mean += alpha * delta
+            self.variance = (1 - alpha) * (self.variance + alpha * delta * delta)
+        self.count += 1
+
+    @property
+    def p90(self) -> float:
+        return self.mean + _Z_P90 * math.sqrt(self.variance)
+
+
+class EtaEstimator:
+    """阶段耗时模型与完成时间预测"""
+
+    def __init__(self, alpha: float = 0.2, min_samples: int = 3):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self._stats: Dict[Tuple[str, str], EwmaStat] = {}
+        self._lock = threading.Lock()
+
+    # ==================== 观测 ====================
+
+    def observe(self, stage: str, key: Optional[str], duration: float):
+        """记录一次阶段耗时，同时更新画像、报告类型和全局三个层级"""
+        with self._lock:
+            for level in self._levels(key):
+                stat = self._stats.get((stage, level))
+                if stat is None:
+                    stat = self._stats[(stage, level)] = EwmaStat()
+                stat.update(duration, self.alpha)
+
+    def stage_estimate(self, stage: str, key: Optional[str]) -> EwmaStat:
+        """获取阶段耗时估计（样本不足时逐级回退）"""
+        for level in self._levels(key):
+            stat = self._stats.get((stage, level))
+            if stat and stat.count >= self.min_samples:
+                return stat
+        default = DEFAULT_STAGE_SECONDS.get(stage, 0.0)
+        return EwmaStat(mean=default, variance=(default * 0.5) ** 2)
+
+    def task_estimate(self, key: Optional[str], completed_stages=()) -> Tuple[float, float]:
+        """
+        预测任务（剩余阶段）的处理时间
+
+        Returns:
+            (均值, p90)，单位秒
+        """
+        def path(stages) -> Tuple[float, float]:
+            stats = [self.stage_estimate(stage, key) for stage in stages if stage not in completed_stages]
+            return sum(s.mean for s in stats), sum(s.p90 for s in stats)
+
+        credit_mean, credit_p90 = path(("markdown", "dify", "convert"))
+        bigdata_mean, bigdata_p90 = path(("bigdata",))
+        render_mean, render_p90 = path(("html", "pdf"))
+        return max(credit_mean, bigdata_mean) + render_mean, max(credit_p90, bigdata_p90) + render_p90
+
+    # ==================== 预测 ====================
+
+    def remaining(self, key: Optional[str], elapsed: float, completed_stages=()) -> float:
+        """处理中任务的剩余时间（已超出预期时保留总估计的 10%，避免倒计时归零后停滞）"""
+        total, _ = self.task_estimate(key)
+        remaining, _ = self.task_estimate(key, completed_stages)
+        # 已完成阶段之外的耗时按已用时间扣减
+        spent_in_current = max(0.0, elapsed - (total - remaining))
+        return max(remaining - spent_in_current, total * 0.1)
+
+    def predict(
+        self,
+        key: Optional[str],
+        ahead_keys: List[Optional[str]],
+        running_remaining: List[float],
+        workers: int,
+        now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        预测排队任务的开始和完成时间
+
+        按先进先出把前面的任务依次分配给最早空闲的工作槽位。
+
+        Args:
+            key: 任务画像
+            ahead_keys: 排在前面的任务画像（按出队顺序）
+            running_remaining: 处理中任务的剩余时间
+            workers: 并发数
+        """
+        now = now or time.time()
+        slots = sorted(running_remaining)[:max(1, workers)]
+        slots += [0.0] * (max(1, workers) - len(slots))
+        heapq.heapify(slots)
+
+        for ahead_key in ahead_keys:
+            free_at = heapq.heappop(slots)
+            heapq.heappush(slots, free_at + self.task_estimate(ahead_key)[0])
+
+        wait = heapq.heappop(slots)
+        mean, p90 = self.task_estimate(key)
+        return {
+            "queue_position": len(ahead_keys) + 1,
+            "estimated_wait_time": wait,
+            "estimated_start_time": now + wait,
+            "estimated_finish_time": now + wait + mean,
+            "estimated_finish_time_p90": now + wait + p90,
+        }
+
+    # ==================== 持久化 ====================
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                f"{stage}@{level}": {"mean": stat.mean, "variance": stat.variance, "count": stat.count}
+                for (stage, level), stat in self._stats.items()
+            }
+
+    def restore(self, snapshot: Dict[str, Any]):
+        stats = {}
+        for name, value in (snapshot or {}).items():
+            stage, _, level = name.partition("@")
+            stats[(stage, level)] = EwmaStat(value["mean"], value["variance"], value["count"])
+        with self._lock:
+            self._stats = stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            profiles = {level for _, level in self._stats}
+            observations = sum(stat.count for (_, level), stat in self._stats.items() if level == "*")
+        return {
+            "profiles": len(profiles),
+            "observations": observations,
+            "stage_mean_seconds": {
+                stage: round(self.stage_estimate(stage, None).mean, 2) for stage in DEFAULT_STAGE_SECONDS
+            },
+        }
+
+    @staticmethod
+    def _levels(key: Optional[str]) -> List[str]:
+        if not key:
+            return ["*"]
+        return [key, key.split("|", 1)[0] + "|*", "*"]
+
+
+# 全局耗时模型
+eta_estimator = EtaEstimator()
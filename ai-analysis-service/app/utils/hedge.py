@@ -0,0 +1,129 @@
+"""
+对冲执行（hedged request）
+
+同一结果有多种获取方式、且事先无法确定哪种更快或可用时，同时启动所有方式，
+采用第一个通过质量检查的结果并取消其余的执行。
+
+典型场景是疑似扫描件的 PDF 转 Markdown：顺序执行时要先等 pdfplumber 解析完全部页面、
+发现文字不足后才提交 OCR；对冲执行时两者同时开始，扫描件的转换时间从 "解析 + OCR" 缩短为 "OCR"。
+
+- 任务截止/取消（DeadlineExceeded、TaskCancelled）直接向上抛出，并取消所有分支
+- 先结束但未通过质量检查（或失败）的分支不会结束对冲，继续等待其他分支
+- 节省的时间按 "顺序执行时先执行的主分支耗时" 统计：对冲分支胜出时，顺序执行至少还要多等主分支的执行时间
+  （主分支被取消时按取消前已执行的时间计，为下限）
+"""
+
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from loguru import logger
+
+from utils.errors import DeadlineExceeded, TaskCancelled
+
+
+@dataclass
+class HedgeOutcome:
+    """对冲执行结果"""
+    winner: Optional[str]  # 胜出的分支，所有分支都未通过质量检查时为 None
+    result: Any = None  # 胜出分支的结果
+    results: Dict[str, Any] = field(default_factory=dict)  # 已正常结束的分支及其结果（包括未通过质量检查的）
+    elapsed: Dict[str, float] = field(default_factory=dict)  # 各分支的执行时间（结束或被取消为止）
+    cancelled: list = field(default_factory=list)  # 被取消的分支
+
+
+async def hedged_race(
+    branches: Dict[str, Callable[[], Awaitable[Any]]],
+    accept: Callable[[str, Any], bool],
+) -> HedgeOutcome:
+    """
+    同时执行所有分支，返回第一个通过质量检查的结果，其余分支被取消
+
+    Args:
+        branches: 分支名称 -> 协程工厂
+        accept: 质量检查 (分支名称, 结果) -> 是否采用
+    """
+    outcome = HedgeOutcome(winner=None)
+
+    async def timed(name: str, factory: Callable[[], Awaitable[Any]]):
+        start = time.monotonic()
+        try:
+            return await factory()
+        finally:
+            outcome.elapsed[name] = time.monotonic() - start
+
+    tasks = {asyncio.create_task(timed(name, factory)): name for name, factory in branches.items()}
+    pending = set(tasks)
+    try:
+        while pending and outcome.winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                error = task.exception()
+                if isinstance(error, (DeadlineExceeded, TaskCancelled)):
+                    raise error
+                if error is not None:
+                    logger.warning(f"⚠️ [对冲执行] 分支 {name} 失败: {error}")
+                    continue
+                outcome.results[name] = task.result()
+                if outcome.winner is None and accept(name, task.result()):
+                    outcome.winner = name
+                    outcome.result = task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+            outcome.cancelled.append(tasks[task])
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return outcome
+
+
+class HedgeStats:
+    """对冲执行统计：探测命中次数、各分支胜出次数、被取消（浪费）的执行次数和节省的时间"""
+
+    def __init__(self, primary: str):
+        self.primary = primary
+        self._stats: Dict[str, Any] = {
+            "probed": 0,
+            "hedged": 0,
+            "no_winner": 0,
+            "wins": {},
+            "cancelled": {},
+            "saved_seconds": 0.0,
+        }
+
+    def record_probe(self):
+        """记录一次探测（是否对冲执行由探测结果决定，对冲执行另行记录）"""
+        self._stats["probed"] += 1
+
+    def record(self, outcome: HedgeOutcome) -> float:
+        """记录一次对冲执行，返回节省的时间（秒）"""
+        self._stats["hedged"] += 1
+        if outcome.winner is None:
+            self._stats["no_winner"] += 1
+        else:
+            self._stats["wins"][outcome.winner] = self._stats["wins"].get(outcome.winner, 0) + 1
+        for name in outcome.cancelled:
+            self._stats["cancelled"][name] = self._stats["cancelled"].get(name, 0) + 1
+        saved = 0.0
+        if outcome.winner is not None and outcome.winner != self.primary:
+            saved = outcome.elapsed.get(self.primary, 0.0)
+        self._stats["saved_seconds"] += saved
+        return saved
+
+    def get_stats(self) -> Dict[str, Any]:
+        hedged = self._stats["hedged"]
+        hedge_wins = sum(count for name, count in self._stats["wins"].items() if name != self.primary)
+        probed = self._stats["probed"]
+        return {
+            **self._stats,
+            "primary": self.primary,
+            "hedge_rate": round(hedged / probed, 3) if probed else None,
+            "hedge_win_rate": round(hedge_wins / hedged, 3) if hedged else None,
+            "avg_saved_seconds": round(self._stats["saved_seconds"] / hedged, 3) if hedged else 0.0,
+        }
+
+
+# PDF转Markdown对冲统计（主分支本地引擎解析，对冲分支整份文档 OCR）
+pdf_hedge_stats = HedgeStats(primary="local")
@@ -0,0 +1,138 @@
+"""
+事件循环延迟监控
+
+所有请求和任务共用一个事件循环，任何在协程中执行的阻塞调用（同步 HTTP 请求、同步大模型客户端、
+subprocess.run、大段 CPU 计算）都会让其他任务、健康检查和状态查询一起等待。
+
+- 监控协程每 interval 秒唤醒一次，实际唤醒时间与预期的差值即事件循环延迟
+- 延迟超过 stall_threshold 时记为一次阻塞并输出告警日志
+- 看门狗线程发现监控协程超过阈值未唤醒时，抓取事件循环线程当前的调用栈，
+  告警日志中附带阻塞位置，便于定位新引入的阻塞调用
+- 延迟分布和阻塞次数见 GET /queue/stats 的 event_loop 字段
+"""
+
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from typing import Dict, Any, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+
+# 保留的延迟样本数（按 0.1 秒间隔约 1 分钟）
+LAG_SAMPLES = 600
+
+# 告警日志中保留的调用栈层数
+STACK_DEPTH = 12
+
+
+class LoopLagMonitor:
+    """事件循环延迟监控"""
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.2, capture_stack: bool = True):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.capture_stack = capture_stack
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = time.monotonic()
+        self._stall_stack: Optional[str] = None
+        self._lags = deque(maxlen=LAG_SAMPLES)
+        self._max_lag = 0.0
+        self._stalls = 0
+        self._last_stall: Optional[Dict[str, Any]] = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._tick_loop())
+        if self.capture_stack:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+            self._watchdog.start()
+        logger.info(f"⏱️ [事件循环监控] 已启动，采样间隔 {self.interval * 1000:.0f}ms，"
+                    f"阻塞阈值 {self.stall_threshold * 1000:.0f}ms")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+    async def _tick_loop(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            self._record(max(0.0, now - expected))
+
+    def _record(self, lag: float):
+        self._lags.append(lag)
+        self._max_lag = max(self._max_lag, lag)
+        stack, self._stall_stack = self._stall_stack, None
+        if lag < self.stall_threshold:
+            return
+        self._stalls += 1
+        self._last_stall = {"at": time.time(), "lag_ms": round(lag * 1000, 1), "stack": stack}
+        if stack:
+            logger.warning(f"⚠️ [事件循环监控] 事件循环被阻塞 {lag * 1000:.0f}ms，阻塞位置:\n{stack}")
+        else:
+            logger.warning(f"⚠️ [事件循环监控] 事件循环被阻塞 {lag * 1000:.0f}ms")
+
+    def _watch(self):
+        """看门狗线程：监控协程超过阈值未唤醒时抓取事件循环线程的调用栈（每次阻塞只抓取一次）"""
+        while not self._stopped.wait(self.interval):
+            if self._stall_stack is not None:
+                continue
+            if time.monotonic() - self._last_tick < self.interval + self.stall_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._stall_stack = "".join(traceback.format_stack(frame)[-STACK_DEPTH:]).rstrip()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lags = sorted(self._lags)
+
+        def percentile(q: float) -> float:
+            return round(lags[min(len(lags) - 1, int(len(lags) * q))] * 1000, 1) if lags else 0.0
+
+        return {
+            "interval_ms": round(self.interval * 1000),
+            "stall_threshold_ms": round(self.stall_threshold * 1000),
+            "p50_lag_ms": percentile(0.5),
+            "p99_lag_ms": percentile(0.99),
+            "max_lag_ms": round(self._max_lag * 1000, 1),
+            "stalls": self._stalls,
+            "last_stall": self._last_stall,
+        }
+
+
+def create_loop_monitor(enabled: bool, **kwargs) -> Optional[LoopLagMonitor]:
+    """按配置创建事件循环监控，关闭时返回 None"""
+    if not enabled:
+        return None
+    return LoopLagMonitor(**kwargs)
+
+
+# 全局事件循环监控实例（关闭时为 None）
+loop_monitor = create_loop_monitor(
+    settings.loop_monitor.enabled,
+    interval=settings.loop_monitor.interval,
+    stall_threshold=settings.loop_monitor.stall_threshold,
+    capture_stack=settings.loop_monitor.capture_stack
+)
@@ -0,0 +1,181 @@
+"""
+PDF 转 Markdown 结果缓存（按文件内容寻址）
+
+同一份报告会被反复转换：任务重试、retryReport / recoverReport 重新提交、不同机构上传同一文件。
+转换结果只取决于文件内容和解析器版本，按 "解析器版本/文件 SHA-256" 缓存到磁盘，
+相同文件再次提交时直接复用，跳过 pdfplumber 解析和 OCR。
+
+- 每个条目一个文件（{root}/{版本}/{哈希前两位}/{哈希}.md），写入采用 "临时文件 + 原子重命名"
+- 按最近使用时间（文件修改时间，命中时更新）淘汰，总大小和条目数分别有上限；
+  解析器版本变化后旧版本的条目不再命中，逐步被淘汰
+- 索引在首次使用时按目录扫描建立；多进程共用缓存目录时各自维护索引，
+  其他进程淘汰的条目在读取时按未命中处理
+"""
+
+import os
+import asyncio
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+
+class MarkdownCache:
+    """磁盘上的 Markdown 转换结果缓存（LRU，按总大小和条目数淘汰）"""
+
+    def __init__(self, root_dir: str, max_bytes: int = 1024 * 1024 * 1024, max_entries: int = 10000):
+        self.root_dir = Path(root_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # key -> 文件大小，按最近使用时间排序（最早的在前）
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    @staticmethod
+    def make_key(file_sha256: str, version: str) -> str:
+        return f"{version}/{file_sha256}"
+
+    def _path(self, key: str) -> Path:
+        version, digest = key.split("/", 1)
+        return self.root_dir / version / digest[:2] / f"{digest}.md"
+
+    def _key_of(self, path: Path) -> str:
+        return f"{path.parent.parent.name}/{path.stem}"
+
+    def _ensure_loaded(self):
+        """首次使用时扫描缓存目录建立索引（按修改时间排序）"""
+        if self._loaded:
+            return
+        entries = []
+        if self.root_dir.exists():
+            for path in self.root_dir.glob("*/*/*.md"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, self._key_of(path), stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        self._loaded = True
+        if entries:
+            logger.info(f"📚 [Markdown缓存] 已加载 {len(entries)} 个条目, "
+                        f"{self._total_bytes / 1024 / 1024:.1f}MB: {self.root_dir}")
+        self._evict()
+
+    def get_sync(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._ensure_loaded()
+            path = self._path(key)
+            try:
+                text = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except FileNotFoundError:
+                self._forget(key)
+                self._stats["misses"] += 1
+                return None
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"⚠️ [Markdown缓存] 读取失败: {key}, {e}")
+                self._stats["errors"] += 1
+                self._stats["misses"] += 1
+                return None
+            if key not in self._index:
+                # 其他进程写入的条目
+                self._index[key] = len(text.encode("utf-8"))
+                self._total_bytes += self._index[key]
+            self._index.move_to_end(key)
+            self._stats["hits"] += 1
+            return text
+
+    def put_sync(self, key: str, text: str):
+        data = text.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            path = self._path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+            except OSError as e:
+                logger.warning(f"⚠️ [Markdown缓存] 写入失败: {key}, {e}")
+                self._stats["errors"] += 1
+                return
+            self._forget(key)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._stats["writes"] += 1
+            self._evict()
+
+    def _forget(self, key: str):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        """淘汰最久未使用的条目，直到总大小和条目数都不超过上限"""
+        while self._index and (self._total_bytes > self.max_bytes or len(self._index) > self.max_entries):
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ [Markdown缓存] 删除失败: {key}, {e}")
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def put(self, key: str, text: str):
+        await asyncio.to_thread(self.put_sync, key, text)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+            "entries": len(self._index),
+            "size_mb": round(self._total_bytes / 1024 / 1024, 2),
+            "max_entries": self.max_entries,
+            "max_size_mb": round(self.max_bytes / 1024 / 1024, 2),
+        }
+
+
+def create_markdown_cache(enabled: bool, **kwargs) -> Optional[MarkdownCache]:
+    """按配置创建 Markdown 缓存，关闭时返回 None"""
+    if not enabled:
+        return None
+    return MarkdownCache(**kwargs)
+
+
+# 全局 Markdown 缓存实例（关闭时为 None）
+markdown_cache = create_markdown_cache(
+    settings.markdown_cache.enabled,
+    root_dir=settings.markdown_cache.dir,
+    max_bytes=settings.markdown_cache.max_size_mb * 1024 * 1024,
+    max_entries=settings.markdown_cache.max_entries
+)
@@ -0,0 +1,151 @@
+"""
+上传 PDF 的解码与暂存
+
+请求中的 PDF 为 base64 字符串，原实现先整体解码为 bytes，再写入从不删除的临时文件，
+同一份数据在内存中保留两份、磁盘上一份，/tmp 中的临时文件会一直累积。
+
+- 解码的同时计算文件内容的 SHA-256（Markdown 转换结果缓存的键）
+- 小文件（解码后不超过 spool_threshold）且在当前进程中解析（未启用进程池）：直接从 base64 字符串解码为
+  一个 bytes 缓冲区（binascii.a2b_base64，不经过中间的 ASCII 副本），pdfplumber 以 BytesIO 读取，不产生临时文件
+- 大文件，或在进程池中解析：分块解码，边解码边写入暂存目录，不在内存中保留完整的解码结果；
+  传给解析进程的只是文件路径（bytes 参数每次提交都会被序列化复制到子进程），
+  解析时以只读内存映射打开，多个解析进程共用页缓存中的同一份数据
+- 暂存文件在解析结束后删除（with 块退出时，包括异常和任务取消）；
+  进程崩溃遗留的文件在服务启动时按修改时间清理
+"""
+
+import os
+import time
+import hashlib
+import binascii
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from loguru import logger
+
+from config.settings import settings
+
+
+# 分块解码时每块的 base64 字符数（4 的整数倍，约解码为 3MB）
+DECODE_CHUNK_CHARS = 4 * 1024 * 1024
+
+# 暂存文件名前缀，清理时只处理本模块创建的文件
+SPOOL_PREFIX = "pdf-"
+
+# base64 文本中可能出现的换行和空白（分块解码时需要去除，保证每块按 4 个字符对齐）
+_WHITESPACE = str.maketrans("", "", " \t\r\n")
+
+
+@dataclass
+class PdfSource:
+    """解码后的 PDF：内存缓冲区或暂存文件（二者之一）"""
+    size: int
+    sha256: str  # 文件内容哈希（解码时计算），用于按内容缓存转换结果
+    buffer: Optional[bytes] = None
+    path: Optional[str] = None
+
+    @property
+    def ref(self) -> Union[bytes, str]:
+        """传给解析函数（可在进程池中执行）的 PDF 来源"""
+        return self.buffer if self.buffer is not None else self.path
+
+    @property
+    def storage(self) -> str:
+        return "memory" if self.buffer is not None else "mmap"
+
+    def close(self):
+        """释放缓冲区，删除暂存文件"""
+        self.buffer = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ [PDF暂存] 删除暂存文件失败: {self.path}, {e}")
+            self.path = None
+
+    def __enter__(self) -> "PdfSource":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PdfSpool:
+    """上传 PDF 的解码与暂存"""
+
+    def __init__(self, spool_dir: str = "", spool_threshold: int = 8 * 1024 * 1024, max_age: float = 3600.0):
+        self.spool_dir = spool_dir or os.path.join(tempfile.gettempdir(), "ai-analysis-pdf")
+        self.spool_threshold = spool_threshold
+        self.max_age = max_age
+
+    def decode(self, file_base64: str, spool: bool = False) -> PdfSource:
+        """
+        解码 base64 字符串
+
+        Args:
+            spool: 总是写入暂存文件（在进程池中解析时，只向子进程传递文件路径）
+
+        Raises:
+            binascii.Error: base64 格式错误
+        """
+        estimated = len(file_base64) // 4 * 3
+        if not spool and estimated <= self.spool_threshold:
+            buffer = binascii.a2b_base64(file_base64)
+            return PdfSource(size=len(buffer), sha256=hashlib.sha256(buffer).hexdigest(), buffer=buffer)
+        return self._decode_to_file(file_base64)
+
+    def _decode_to_file(self, file_base64: str) -> PdfSource:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=SPOOL_PREFIX, suffix=".pdf", dir=self.spool_dir)
+        size = 0
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                carry = ""
+                for start in range(0, len(file_base64), DECODE_CHUNK_CHARS):
+                    chunk = carry + file_base64[start:start + DECODE_CHUNK_CHARS].translate(_WHITESPACE)
+                    aligned = len(chunk) // 4 * 4
+                    carry = chunk[aligned:]
+                    if aligned:
+                        size += self._write(f, digest, binascii.a2b_base64(chunk[:aligned]))
+                if carry:
+                    size += self._write(f, digest, binascii.a2b_base64(carry))
+        except BaseException:
+            os.unlink(path)
+            raise
+        return PdfSource(size=size, sha256=digest.hexdigest(), path=path)
+
+    @staticmethod
+    def _write(f, digest, data: bytes) -> int:
+        digest.update(data)
+        return f.write(data)
+
+    def sweep(self) -> int:
+        """删除超过 max_age 的暂存文件（进程崩溃遗留），返回删除数量"""
+        if not os.path.isdir(self.spool_dir):
+            return 0
+        expire_before = time.time() - self.max_age
+        removed = 0
+        for entry in os.scandir(self.spool_dir):
+            if not entry.name.startswith(SPOOL_PREFIX):
+                continue
+            try:
+                if entry.stat().st_mtime < expire_before:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"🧹 [PDF暂存] 已清理 {removed} 个遗留的暂存文件: {self.spool_dir}")
+        return removed
+
+
+# 全局 PDF 暂存实例
+pdf_spool = PdfSpool(
+    spool_dir=settings.pdf.spool_dir,
+    spool_threshold=settings.pdf.spool_threshold_mb * 1024 * 1024,
+    max_age=settings.pdf.spool_max_age
+)
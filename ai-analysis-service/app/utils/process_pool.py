@@ -0,0 +1,131 @@
+"""
+CPU 密集型任务的进程池
+
+pdfplumber 的 find_tables / extract_words 是纯 Python 计算，放在事件循环或线程池中执行时
+会占用 GIL，解析一份 30 页的报告期间健康检查和状态查询都无法响应。
+进程池中的任务在独立进程中执行，多页文档按页码范围拆分后可以并行使用多个核。
+
+- 子进程以 spawn 方式启动（不继承父进程中的线程、事件循环和数据库连接），首次使用时才创建
+- 每个子进程执行 max_tasks_per_child 个任务后退出并由新进程替换，
+  限制 pdfplumber 解析大文档后残留的内存（pdfminer 的对象缓存不会归还给操作系统）
+- 子进程异常退出（如内存不足被杀）导致进程池不可用时，下次提交任务时重建进程池
+- 协程被取消时，尚未开始执行的任务一并取消；已在子进程中执行的任务无法中断，完成后结果被丢弃
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Callable
+
+from loguru import logger
+
+from config.settings import settings
+
+
+class ProcessPool:
+    """按需创建、定期回收工作进程的进程池"""
+
+    def __init__(self, name: str, max_workers: int = 2, max_tasks_per_child: int = 20):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.running = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "restarts": 0,
+            "total_busy_seconds": 0.0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks_per_child if self.max_tasks_per_child > 0 else None
+            )
+            logger.info(f"🧮 [{self.name}] 进程池已创建: {self.max_workers} 个工作进程，"
+                        f"每个进程处理 {self.max_tasks_per_child or '不限'} 个任务后回收")
+        return self._executor
+
+    def _discard_broken(self, executor: ProcessPoolExecutor):
+        """进程池因子进程异常退出不可用，丢弃后下次提交时重建"""
+        if self._executor is executor:
+            self._executor = None
+            self._stats["restarts"] += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.warning(f"⚠️ [{self.name}] 工作进程异常退出，进程池将重建")
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        在子进程中执行模块级函数 func(*args)
+
+        未启用进程池（max_workers=0）时在线程池中执行。
+        """
+        if not self.enabled:
+            return await asyncio.to_thread(func, *args)
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            self._discard_broken(executor)
+            executor = self._get_executor()
+            future = executor.submit(func, *args)
+
+        self._stats["submitted"] += 1
+        self.running += 1
+        start = time.time()
+        try:
+            result = await asyncio.wrap_future(future)
+            self._stats["completed"] += 1
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            self._stats["cancelled"] += 1
+            raise
+        except BrokenProcessPool:
+            self._stats["failed"] += 1
+            self._discard_broken(executor)
+            raise
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self.running -= 1
+            self._stats["total_busy_seconds"] += time.time() - start
+
+    def shutdown(self):
+        """关闭进程池（未开始的任务取消，执行中的任务在子进程中继续执行完）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info(f"🛑 [{self.name}] 进程池已关闭")
+
+    def get_stats(self) -> Dict[str, Any]:
+        finished = self._stats["completed"] + self._stats["failed"]
+        return {
+            **self._stats,
+            "max_workers": self.max_workers,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "started": self._executor is not None,
+            "running": self.running,
+            "avg_duration_seconds": (self._stats["total_busy_seconds"] / finished) if finished else 0.0,
+        }
+
+
+# 全局 PDF 解析进程池
+pdf_process_pool = ProcessPool(
+    "PDF解析",
+    max_workers=settings.pdf.extract_workers,
+    max_tasks_per_child=settings.pdf.extract_max_tasks_per_child
+)
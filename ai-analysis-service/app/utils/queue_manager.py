@@ -1,16 +1,42 @@
 """
 请求队列管理器
+
+支持三种部署角色（QUEUE_ROLE）：
+- all: 单进程模式，API 与工作协程在同一进程中，通过进程内队列分发任务
+- api: 只接收请求，任务写入共享的 SQLite 任务存储，由独立的工作进程处理；
+       可以用多个 uvicorn 进程部署，任意进程都可以查询/取消/订阅任务
+- worker: 独立工作进程（run_worker.py），通过租约从共享存储领取任务并定期续约，
+          进程崩溃后租约过期的任务由其他工作进程接管
 """
 
 import asyncio
+import math
+import os
+import socket
 import time
 import uuid
 import base64
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass, field
 from loguru import logger
 
+from config.settings import settings
+from utils.task_store import TaskStore, MemoryTaskStore, create_task_store
+from utils.artifact_store import ArtifactStore
+from utils.retention import RetentionPolicy, TaskRetention, estimate_task_bytes, EVICT_TTL
+from utils.checkpoint import TaskCheckpoint
+from utils.errors import is_retryable, backoff_delay, DeadlineExceeded, QueueFull
+from utils.adaptive_limiter import AdaptiveLimiter, create_limiter, classify_overload
+from utils.task_events import task_event_bus, TaskEvent, EVENT_STAGE, TERMINAL_STATUSES
+from utils.task_context import TaskContext, set_task_context, reset_task_context
+from utils.eta_estimator import eta_estimator, build_profile
+from utils.dedup import decode_file, compute_dedup_key
+from utils.admission import AdmissionController, AdmissionRejected, REASON_TENANT_QUOTA, admission_controller
+from utils.task_scheduler import TaskScheduler, PRIORITY_NORMAL, PRIORITY_URGENT, POLICY_FIFO
+from utils.tenants import TenantFairShare, create_tenant_fair_share, tenant_of
+from utils.webhooks import WebhookDispatcher, create_webhook_dispatcher
+
 
 class TaskStatus(str, Enum):
     PENDING = "pending"
@@ -20,6 +46,25 @@ class TaskStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+# 已结束状态
+FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+# 开始处理后从内存中释放的大字段（存储中保留一份，用于重试）
+PAYLOAD_FIELDS = ("file_base64", "markdown_content")
+
+# 耗时模型在产物存储中的位置，api 进程定期重新加载工作进程保存的模型
+ETA_MODEL_KEY = "eta/model.json"
+ETA_MODEL_RELOAD_INTERVAL = 60.0
+
+# 部署角色
+ROLE_ALL = "all"
+ROLE_API = "api"
+ROLE_WORKER = "worker"
+
+# api/worker 角色通过共享存储分配任务时用到的存储方法（MemoryTaskStore 未实现）
+SHARED_QUEUE_METHODS = ("claim_task", "renew_lease", "request_cancel", "count_pending_before", "attach_task")
+
+
 @dataclass
 class QueueTask:
     """队列任务"""
@@ -33,6 +78,18 @@ class QueueTask:
     error_message: Optional[str] = None
     retry_count: int = 0
     max_retries: int = 2
+    result_ref: Optional[str] = None  # 结果转存到磁盘后的引用
+    payload_released: bool = False  # 请求数据中的大字段是否已从内存释放
+    available_at: Optional[float] = None  # 重试退避期间，到期后才能被工作进程领取
+    lease_lost: bool = False  # 租约已被其他工作进程接管，本进程不再写入状态
+    profile_key: Optional[str] = None  # 任务画像（报告类型/页数/文件大小），用于耗时预测
+    dedup_key: Optional[str] = None  # 文件内容和参数的哈希，用于合并重复提交
+    idempotency_key: Optional[str] = None  # 客户端指定的幂等键
+    priority: int = PRIORITY_NORMAL  # 优先级（会员任务更高，同步接口提交的任务走紧急通道）
+    deadline: Optional[float] = None  # 期望完成时间（时间戳），edf 策略按此排序
+    cost: Optional[float] = None  # 预测处理耗时（秒），sjf 策略按此排序
+    tenant_id: Optional[str] = None  # 提交任务的租户（机构），用于按租户公平调度
+    attached: int = 0  # 重复提交关联到该任务的次数，同步接口等待超时时有其他提交关联则不取消
     
     @property
     def processing_time(self) -> Optional[float]:
@@ -48,38 +105,250 @@ class QueueTask:
             return self.started_at - self.created_at
         return None
 
+    def to_record(self, include_payload: bool = False) -> Dict[str, Any]:
+        """转换为存储记录"""
+        record = {
+            "task_id": self.task_id,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "retry_count": self.retry_count,
+            "max_retries": self.max_retries,
+            "error_message": self.error_message,
+            "result": self.result,
+            "result_ref": self.result_ref,
+            "available_at": self.available_at,
+            "profile_key": self.profile_key,
+            "dedup_key": self.dedup_key,
+            "idempotency_key": self.idempotency_key,
+            "priority": self.priority,
+            "deadline": self.deadline,
+            "cost": self.cost,
+            "tenant_id": self.tenant_id,
+            "attached": self.attached,
+        }
+        if include_payload:
+            record["request_data"] = self.request_data
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "QueueTask":
+        """从存储记录恢复任务"""
+        return cls(
+            task_id=record["task_id"],
+            request_data=record.get("request_data") or {},
+            status=TaskStatus(record["status"]),
+            created_at=record["created_at"],
+            started_at=record.get("started_at"),
+            completed_at=record.get("completed_at"),
+            result=record.get("result"),
+            error_message=record.get("error_message"),
+            retry_count=record.get("retry_count", 0),
+            max_retries=record.get("max_retries", 2),
+            result_ref=record.get("result_ref"),
+            available_at=record.get("available_at"),
+            profile_key=record.get("profile_key"),
+            dedup_key=record.get("dedup_key"),
+            idempotency_key=record.get("idempotency_key"),
+            priority=record.get("priority") or PRIORITY_NORMAL,
+            deadline=record.get("deadline"),
+            cost=record.get("cost"),
+            tenant_id=record.get("tenant_id"),
+            attached=record.get("attached") or 0,
+        )
+
+
+def _preload_report_pipeline():
+    """
+    预先导入报告生成模块
+
+    playwright、openai 等依赖的导入超过 1 秒（openai 的延迟导入由 product_recommend_service 一并完成），
+    在线程中提前完成，避免第一个任务在事件循环中导入时阻塞其他请求。
+    """
+    from service.brief_report_service import BriefReportService  # noqa: F401
+
 
 class RequestQueue:
     """请求队列管理器"""
     
-    def __init__(self, max_concurrent_tasks: int = 3, max_queue_size: int = 100):
+    def __init__(
+        self,
+        max_concurrent_tasks: int = 3,
+        max_queue_size: int = 100,
+        store: Optional[TaskStore] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        retention: Optional[RetentionPolicy] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        task_timeout: Optional[float] = None,
+        role: str = ROLE_ALL,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        dedup_enabled: bool = True,
+        result_cache_ttl: float = 3600.0,
+        admission: Optional[AdmissionController] = None,
+        urgent_burst: int = 3,
+        scheduling_policy: str = POLICY_FIFO,
+        aging_seconds: float = 120.0,
+        default_deadline: float = 1800.0,
+        tenants: Optional[TenantFairShare] = None,
+        webhooks: Optional[WebhookDispatcher] = None
+    ):
+        if role not in (ROLE_ALL, ROLE_API, ROLE_WORKER):
+            raise ValueError(f"不支持的队列角色: {role}")
+        self.role = role
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        # 重复提交合并：相同内容的任务排队/处理中时关联到该任务，完成后 result_cache_ttl 内直接复用结果
+        self.dedup_enabled = dedup_enabled
+        self.result_cache_ttl = result_cache_ttl
+        # 准入控制：按在途数据量和预测工作量拒绝新任务，未配置时只按排队长度限制
+        self.admission = admission
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
         self.max_concurrent_tasks = max_concurrent_tasks
         self.max_queue_size = max_queue_size
-        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        # 全局并发限流：工作协程数为并发上限，实际同时处理的任务数由限流器动态调整
+        self.limiter = limiter or AdaptiveLimiter("global", max_concurrent_tasks, adaptive=False)
+        self.task_timeout = task_timeout
+        # 队列本身不设上限，由 add_task 控制新任务的排队长度，
+        # 避免重试和重启恢复的任务在队列满时阻塞工作协程；紧急任务优先出队，通道内按调度策略排序
+        self.queue = TaskScheduler(
+            policy=scheduling_policy,
+            urgent_burst=urgent_burst,
+            aging_seconds=aging_seconds,
+            default_deadline=default_deadline,
+            tenants=tenants
+        )
+        # 按租户的公平调度、并发上限和排队配额，未配置时不区分租户
+        self.tenants = tenants
+        self._tenant_counts: Dict[str, Dict[str, int]] = {}
+        # 任务完成回调，未配置时不支持 callback_url
+        self.webhooks = webhooks
+        self.store = store or MemoryTaskStore()
+        if role != ROLE_ALL:
+            self._check_shared_store()
+        # 结果产物存储，未配置时结果保留在内存中
+        self.artifacts = artifacts
+        self.retention = TaskRetention(retention or RetentionPolicy())
         self.tasks: Dict[str, QueueTask] = {}
         self.processing_tasks: Dict[str, asyncio.Task] = {}
+        self.task_contexts: Dict[str, TaskContext] = {}
         self.worker_tasks: list = []
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self._relay_task: Optional[asyncio.Task] = None
+        self._event_writes: set = set()
+        # 退避等待中、到期后重新入队的任务（单进程模式）
+        self._requeue_tasks: set = set()
         self.is_running = False
         self._stats = {
             "total_requests": 0,
             "completed_requests": 0,
             "failed_requests": 0,
             "current_queue_size": 0,
-            "current_processing": 0
+            "current_processing": 0,
+            "recovered_requests": 0,
+            "retried_requests": 0,
+            "deduplicated_requests": 0,
+            "cached_results": 0
         }
     
+    def _check_shared_store(self):
+        """
+        api/worker 角色需要多进程共享、且实现了租约领取的任务存储
+
+        Raises:
+            ValueError: 任务存储不能在进程之间共享（例如 QUEUE_STORE_BACKEND=memory）
+        """
+        missing = [
+            name for name in SHARED_QUEUE_METHODS
+            if getattr(type(self.store), name) is getattr(TaskStore, name)
+        ]
+        if not self.store.shared or missing:
+            raise ValueError(
+                f"队列角色 {self.role} 需要多进程共享的任务存储（QUEUE_STORE_BACKEND=sqlite），"
+                f"当前存储: {type(self.store).__name__}"
+            )
+
     async def start(self):
         """启动队列处理器"""
         if self.is_running:
             return
+        if self.role != ROLE_ALL:
+            # 存储可能在创建后被替换，启动前再次检查，避免工作协程反复领取失败
+            self._check_shared_store()
         
         self.is_running = True
-        logger.info(f"启动请求队列，最大并发: {self.max_concurrent_tasks}, 最大队列长度: {self.max_queue_size}")
-        
+        logger.info(
+            f"启动请求队列，角色: {self.role}, 最大并发: {self.max_concurrent_tasks}, 最大队列长度: {self.max_queue_size}"
+        )
+
+        # 加载耗时模型（由处理任务的进程定期保存）
+        await self._load_eta_model()
+
+        if self.admission:
+            self.admission.concurrency_provider = lambda: self.limiter.limit
+
+        # 所有角色都投递回调（api 进程取消等待中的任务时也会产生回调），多进程通过租约分配
+        if self.webhooks:
+            await self.webhooks.start(self.store, self.worker_id)
+
+        if self.role == ROLE_API:
+            # 只接收请求，转发其他进程产生的任务事件
+            self._relay_task = asyncio.create_task(self._event_relay())
+            return
+
+        try:
+            await asyncio.to_thread(_preload_report_pipeline)
+        except Exception as e:
+            logger.warning(f"⚠️ 预先导入报告生成模块失败（将在处理任务时导入）: {e}")
+
+        if self.role == ROLE_ALL:
+            # 恢复上次未完成的任务
+            await self._recover_tasks()
+            worker_func = self._worker
+        else:
+            # 阶段进度写入共享存储，供 API 进程推送给订阅者
+            task_event_bus.sink = self._record_stage_event
+            worker_func = self._lease_worker
+
         # 启动工作协程
         for i in range(self.max_concurrent_tasks):
-            worker = asyncio.create_task(self._worker(f"worker-{i}"))
+            worker = asyncio.create_task(worker_func(f"worker-{i}"))
             self.worker_tasks.append(worker)
+
+        # 启动已结束任务的定期清理
+        self._sweeper_task = asyncio.create_task(self._retention_sweeper())
+
+    async def _recover_tasks(self):
+        """从存储中恢复 PENDING 和中断的 PROCESSING 任务并重新入队"""
+        try:
+            records = await asyncio.to_thread(self.store.load_unfinished)
+        except Exception as e:
+            logger.error(f"恢复任务失败: {e}")
+            return
+
+        for record in records:
+            task = QueueTask.from_record(record)
+            if task.cost is None:
+                task.cost = eta_estimator.task_estimate(task.profile_key)[0]
+            if task.status == TaskStatus.PROCESSING:
+                # 上次进程在处理中退出，视为孤儿任务，重置为等待状态
+                task.status = TaskStatus.PENDING
+                task.started_at = None
+                await self._persist(task)
+
+            self.tasks[task.task_id] = task
+            self._publish_status(task)
+            if self.admission:
+                self.admission.admit(
+                    task.task_id, estimate_task_bytes(task),
+                    eta_estimator.task_estimate(task.profile_key)[0], force=True
+                )
+            await self.queue.put(task)
+            self._stats["recovered_requests"] += 1
+
+        if records:
+            logger.info(f"已从存储恢复 {len(records)} 个未完成任务")
     
     async def stop(self):
         """停止队列处理器"""
@@ -89,59 +358,596 @@ class RequestQueue:
         self.is_running = False
         logger.info("停止请求队列...")
         
-        # 取消所有工作协程
+        # 取消定期清理、事件转发和所有工作协程
+        for background in (self._sweeper_task, self._relay_task):
+            if background:
+                background.cancel()
+        self._sweeper_task = None
+        self._relay_task = None
         for worker in self.worker_tasks:
             worker.cancel()
+        # 退避等待中的任务保留为等待状态，重启后恢复执行
+        for requeue in self._requeue_tasks:
+            requeue.cancel()
         
         # 等待所有工作协程结束
-        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        await asyncio.gather(*self.worker_tasks, *self._requeue_tasks, return_exceptions=True)
         self.worker_tasks.clear()
+        self._requeue_tasks.clear()
         
         # 取消所有处理中的任务
         for task in self.processing_tasks.values():
             task.cancel()
+
+        # 等待未完成的事件写入，保存耗时模型
+        if self._event_writes:
+            await asyncio.gather(*self._event_writes, return_exceptions=True)
+        if self.role != ROLE_API:
+            await self._save_eta_model()
+        if self.webhooks:
+            await self.webhooks.stop()
+
+        # 关闭任务存储
+        self.store.close()
         
         logger.info("请求队列已停止")
     
-    async def add_task(self, request_data: Dict[str, Any]) -> str:
-        """添加任务到队列"""
+    async def add_task(
+        self,
+        request_data: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL,
+        deadline: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        callback_url: Optional[str] = None,
+        callback_data: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, bool]:
+        """
+        添加任务到队列
+
+        存在可复用的任务（幂等键相同，或内容相同且排队/处理中/最近已完成）时不新增任务。
+
+        Args:
+            request_data: 任务请求数据
+            idempotency_key: 客户端指定的幂等键
+            priority: 优先级（PRIORITY_URGENT 及以上走紧急通道）
+            deadline: 期望完成时间（时间戳）
+            tenant_id: 提交任务的租户（机构）
+            callback_url: 任务结束时回调的地址（复用已有任务时同样在该任务结束时回调）
+            callback_data: 回调时原样返回的业务数据
+
+        Returns:
+            (任务ID, 是否复用了已有任务)
+
+        Raises:
+            QueueFull: 队列已满
+            RuntimeError: 队列未启动，或当前进程不接收新任务
+            AdmissionRejected: 超出在途数据量、预测延迟预算或租户排队配额
+            ValueError: 回调地址不可用
+        """
         if not self.is_running:
             raise RuntimeError("队列未启动")
-        
-        if self.queue.qsize() >= self.max_queue_size:
-            raise RuntimeError(f"队列已满，当前长度: {self.queue.qsize()}")
-        
+        if self.role == ROLE_WORKER:
+            raise RuntimeError("工作进程不接收新任务")
+        if callback_url:
+            if not self.webhooks:
+                raise ValueError("任务回调未启用（WEBHOOK_ENABLED=false）")
+            # 未配置允许列表时需要解析域名，放到线程中执行
+            await asyncio.to_thread(self.webhooks.validate_url, callback_url)
+
+        # 文件只解码一次，同时用于任务画像和去重键
+        profile, dedup_key = await asyncio.to_thread(self._describe_request, request_data)
         task_id = str(uuid.uuid4())
-        task = QueueTask(task_id=task_id, request_data=request_data)
-        
+        task = QueueTask(
+            task_id=task_id,
+            request_data=request_data,
+            profile_key=profile["key"],
+            dedup_key=dedup_key if self.dedup_enabled else None,
+            idempotency_key=idempotency_key,
+            priority=priority,
+            deadline=deadline,
+            cost=eta_estimator.task_estimate(profile["key"])[0],
+            tenant_id=tenant_of(tenant_id)
+        )
+        completed_since = time.time() - self.result_cache_ttl
+
+        # 重复提交直接关联到已有任务，不受排队长度和准入预算限制
+        existing = await asyncio.to_thread(
+            self.store.find_reusable_task, task.dedup_key, idempotency_key, completed_since
+        )
+        if existing is None:
+            queue_size = await self._current_queue_size()
+            if queue_size >= self.max_queue_size:
+                raise QueueFull(f"队列已满，当前长度: {queue_size}")
+            if self.tenants:
+                await self._check_tenant_quota(task)
+
+            # 超出在途数据量或预测延迟预算时抛出 AdmissionRejected
+            if self.admission:
+                self.admission.admit(task_id, profile["file_size"], task.cost)
+            try:
+                # 查找和新增在同一事务中完成，并发的重复提交只会新增一个任务
+                existing = await asyncio.to_thread(
+                    self.store.save_task_unless_duplicate, task.to_record(include_payload=True), completed_since
+                )
+            except Exception:
+                self._release_admission(task_id)
+                raise
+            if existing is not None:
+                self._release_admission(task_id)
+
+        if existing is not None:
+            if existing["status"] == TaskStatus.COMPLETED.value:
+                self._stats["cached_results"] += 1
+                logger.info(f"重复提交，复用已完成任务的结果: {existing['task_id']}")
+            else:
+                self._stats["deduplicated_requests"] += 1
+                logger.info(f"重复提交，关联到{existing['status']}任务: {existing['task_id']}")
+                await self._attach(existing["task_id"], priority)
+                if existing["status"] == TaskStatus.PENDING.value and (existing.get("priority") or 0) < priority:
+                    logger.info(f"等待中的任务出队优先级提升为 {priority}: {existing['task_id']}")
+            if callback_url:
+                await self._register_callback(existing["task_id"], callback_url, callback_data, task.tenant_id)
+            return existing["task_id"], True
+
+        self._stats["total_requests"] += 1
+        if callback_url:
+            await self._register_callback(task_id, callback_url, callback_data, task.tenant_id)
+
+        if self.role == ROLE_API:
+            # 写入共享存储即完成提交，由工作进程领取
+            self._stats["current_queue_size"] = queue_size + 1
+            logger.info(f"任务已加入共享队列: {task_id}, 队列长度: {queue_size + 1}")
+            return task_id, False
+
         self.tasks[task_id] = task
+        self._publish_status(task)
         await self.queue.put(task)
-        
-        self._stats["total_requests"] += 1
         self._stats["current_queue_size"] = self.queue.qsize()
         
         logger.info(f"任务已加入队列: {task_id}, 队列长度: {self.queue.qsize()}")
-        return task_id
+        return task_id, False
+
+    async def _attach(self, task_id: str, priority: int):
+        """记录重复提交的关联，等待中的任务提升到新提交的出队通道（同步接口的提交不会排在普通通道）"""
+        await asyncio.to_thread(self.store.attach_task, task_id, priority)
+        task = self.tasks.get(task_id)
+        if task is not None:
+            # 单进程模式下调度器直接使用内存中的任务，同步更新
+            task.attached += 1
+            if task.status == TaskStatus.PENDING and task.priority < priority:
+                task.priority = priority
+
+    async def _register_callback(self, task_id: str, callback_url: str,
+                                 callback_data: Optional[Dict[str, Any]], tenant_id: Optional[str]):
+        """登记任务结束回调；任务已经结束（复用已完成任务的结果，或登记前刚结束）时立即转为待发送"""
+        await self.webhooks.register(task_id, callback_url, callback_data, tenant_id)
+        task = await self.get_task_status(task_id)
+        if task and task.status in FINISHED_STATUSES:
+            await self._notify_webhooks(task)
+
+    async def _notify_webhooks(self, task: QueueTask):
+        """任务结束：为该任务登记的回调生成回调内容并转为待发送"""
+        if not self.webhooks:
+            return
+        try:
+            result = None
+            if self.webhooks.include_result and task.status == TaskStatus.COMPLETED:
+                result = await self.load_result(task)
+            await self.webhooks.task_finished(
+                task.task_id, task.status.value, task.error_message,
+                task.processing_time, task.completed_at, result
+            )
+        except Exception as e:
+            logger.error(f"任务回调登记失败: {task.task_id}, 错误: {e}")
+
+    async def _check_tenant_quota(self, task: QueueTask):
+        """租户排队和处理中的任务数达到配额时拒绝提交"""
+        max_queued = self.tenants.limits(task.tenant_id).max_queued
+        if max_queued <= 0:
+            return
+        counts = (await self._count_tenant_tasks()).get(task.tenant_id, {})
+        unfinished = counts.get(TaskStatus.PENDING.value, 0) + counts.get(TaskStatus.PROCESSING.value, 0)
+        if unfinished >= max_queued:
+            self.tenants.record_rejected(task.tenant_id)
+            retry_after = min(settings.admission.max_retry_after, max(1, math.ceil(task.cost or 1.0)))
+            message = f"租户 {task.tenant_id} 的未完成任务数已达配额 ({unfinished}/{max_queued})"
+            logger.warning(f"🚦 请求被租户配额拒绝: {message}, Retry-After: {retry_after}s")
+            raise AdmissionRejected(REASON_TENANT_QUOTA, retry_after, message)
+
+    async def _count_tenant_tasks(self) -> Dict[str, Dict[str, int]]:
+        """各租户等待和处理中的任务数（api 角色从共享存储统计）"""
+        if self.role != ROLE_API:
+            return self._current_tenant_counts()
+
+        counts: Dict[str, Dict[str, int]] = {}
+        raw = await asyncio.to_thread(self.store.count_unfinished_by_tenant)
+        for tenant_id, by_status in raw.items():
+            # 旧版本任务没有记录租户，归入默认租户
+            merged = counts.setdefault(tenant_of(tenant_id), {})
+            for status, count in by_status.items():
+                merged[status] = merged.get(status, 0) + count
+        return counts
+
+    def _release_admission(self, task_id: str):
+        if self.admission:
+            self.admission.release(task_id)
+
+    async def submit_and_wait(
+        self,
+        request_data: Dict[str, Any],
+        timeout: float,
+        priority: int = PRIORITY_NORMAL,
+        tenant_id: Optional[str] = None
+    ) -> QueueTask:
+        """
+        提交任务并等待结束（同步接口使用），与队列任务共用工作协程和并发限制
+
+        Args:
+            request_data: 任务请求数据
+            timeout: 从提交开始的最长等待时间（秒）
+            priority: 出队通道
+            tenant_id: 提交任务的租户（机构）
+
+        Returns:
+            已结束的任务
+
+        Raises:
+            asyncio.TimeoutError: 超过等待时间（新建且没有其他提交关联的任务会被取消，关联的已有任务继续处理）
+        """
+        deadline = time.time() + timeout
+        task_id, deduplicated = await self.add_task(
+            request_data, priority=priority, deadline=deadline, tenant_id=tenant_id
+        )
+        try:
+            return await self.wait_for_task(task_id, deadline - time.time())
+        except asyncio.TimeoutError:
+            if not deduplicated:
+                # 其他提交已关联到该任务时继续处理，由其他提交获取结果
+                task = await self.get_task_status(task_id)
+                if task is not None and not task.attached:
+                    await self.cancel_task(task_id)
+            raise
+
+    async def wait_for_task(self, task_id: str, timeout: float) -> QueueTask:
+        """
+        等待任务结束
+
+        订阅任务事件，同时按轮询间隔检查任务状态（事件可能因订阅队列满被丢弃）。
+        """
+        deadline = time.time() + timeout
+        async with task_event_bus.subscribe(task_id) as events:
+            while True:
+                task = await self.get_task_status(task_id)
+                if task is None:
+                    raise KeyError(f"任务不存在: {task_id}")
+                if task.status in FINISHED_STATUSES:
+                    return task
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"等待任务超时: {task_id}")
+                try:
+                    await asyncio.wait_for(events.get(), timeout=min(remaining, max(self.poll_interval, 1.0)))
+                except asyncio.TimeoutError:
+                    continue
+
+    @staticmethod
+    def _describe_request(request_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """计算任务画像和去重键"""
+        file_bytes = decode_file(request_data)
+        return build_profile(request_data, file_bytes), compute_dedup_key(request_data, file_bytes)
+
+    async def get_task_eta(self, task: QueueTask) -> Optional[Dict[str, Any]]:
+        """
+        预测任务的排队位置、开始时间和完成时间（已结束的任务返回 None）
+
+        单进程/工作进程按内存中的排队任务画像和处理中任务的剩余时间逐个模拟；
+        api 角色只能从共享存储获取排队数量，排在前面的任务按同类任务估计。
+        """
+        if task.status not in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+            return None
+
+        now = time.time()
+        if task.status == TaskStatus.PROCESSING and task.started_at:
+            context = self.task_contexts.get(task.task_id)
+            remaining = eta_estimator.remaining(
+                task.profile_key, now - task.started_at, context.completed_stages if context else ()
+            )
+            _, p90 = eta_estimator.task_estimate(task.profile_key, context.completed_stages if context else ())
+            return {
+                "queue_position": 0,
+                "estimated_wait_time": 0.0,
+                "estimated_start_time": task.started_at,
+                "estimated_finish_time": now + remaining,
+                "estimated_finish_time_p90": now + max(remaining, p90 - (now - task.started_at)),
+            }
+
+        if self.role == ROLE_API:
+            ahead = await asyncio.to_thread(self.store.count_pending_before, task.created_at, task.priority)
+            processing = self._stats["current_processing"]
+            half = eta_estimator.task_estimate(task.profile_key)[0] / 2
+            return eta_estimator.predict(
+                task.profile_key,
+                ahead_keys=[task.profile_key] * ahead,
+                running_remaining=[half] * processing,
+                workers=max(processing, self.max_concurrent_tasks),
+                now=now
+            )
+
+        # 按调度策略的当前排序计算排在前面的任务（紧急通道在前，忽略紧急任务连续出队后的让出）
+        def order(other: QueueTask) -> tuple:
+            return (
+                other.priority < PRIORITY_URGENT,
+                self.queue.rank(other.priority, other.created_at, other.deadline, other.cost, now=now)
+            )
+
+        own_order = order(task)
+        ahead = [
+            other for other in self.tasks.values()
+            if other.status == TaskStatus.PENDING and other.task_id != task.task_id and order(other) < own_order
+        ]
+        ahead_keys = [other.profile_key for other in sorted(ahead, key=order)]
+        running_remaining = []
+        for other_id, context in self.task_contexts.items():
+            other = self.tasks.get(other_id)
+            if other and other.started_at:
+                running_remaining.append(eta_estimator.remaining(
+                    other.profile_key, now - other.started_at, context.completed_stages
+                ))
+        return eta_estimator.predict(
+            task.profile_key, ahead_keys, running_remaining, workers=self.limiter.limit, now=now
+        )
+
+    async def _load_eta_model(self):
+        if not self.artifacts:
+            return
+        try:
+            snapshot = await asyncio.to_thread(self.artifacts.get_json, ETA_MODEL_KEY)
+            if snapshot:
+                eta_estimator.restore(snapshot)
+        except Exception as e:
+            logger.warning(f"加载耗时模型失败: {e}")
+
+    async def _save_eta_model(self):
+        if not self.artifacts:
+            return
+        try:
+            await asyncio.to_thread(self.artifacts.put_json, ETA_MODEL_KEY, eta_estimator.snapshot())
+        except Exception as e:
+            logger.warning(f"保存耗时模型失败: {e}")
+
+    async def _current_queue_size(self) -> int:
+        """当前排队任务数（api 角色从共享存储统计）"""
+        if self.role == ROLE_API:
+            counts = await asyncio.to_thread(self.store.count_by_status)
+            return counts.get(TaskStatus.PENDING.value, 0)
+        return self.queue.qsize()
     
     async def get_task_status(self, task_id: str) -> Optional[QueueTask]:
-        """获取任务状态"""
-        return self.tasks.get(task_id)
+        """获取任务状态（内存中不存在时从存储读取，例如重启前已完成的任务或其他进程处理的任务）"""
+        task = self.tasks.get(task_id)
+        if task:
+            self.retention.touch(task_id)
+            return task
+
+        record = await asyncio.to_thread(self.store.load_task, task_id)
+        return QueueTask.from_record(record) if record else None
+
+    async def load_result(self, task: QueueTask) -> Optional[Dict[str, Any]]:
+        """获取任务结果（已转存到磁盘的结果按引用读取）"""
+        if task.result is not None or not task.result_ref or not self.artifacts:
+            return task.result
+
+        try:
+            return await asyncio.to_thread(self.artifacts.get_json, task.result_ref)
+        except Exception as e:
+            logger.error(f"读取任务结果失败: {task.task_id}, 错误: {e}")
+            return None
+
+    async def _persist(self, task: QueueTask):
+        """持久化任务状态并推送状态事件，任务结束时清理请求数据"""
+        if task.lease_lost:
+            return
+        # worker 角色处理的任务都是从共享存储领取的，只在租约仍属于本进程时写入
+        lease_owner = self.worker_id if self.role == ROLE_WORKER else None
+        try:
+            updated = await asyncio.to_thread(self.store.update_task, task.to_record(), lease_owner)
+            if not updated:
+                logger.warning(f"任务租约已失效，放弃写入状态: {task.task_id}")
+                task.lease_lost = True
+                return
+            if task.status in FINISHED_STATUSES:
+                await asyncio.to_thread(self.store.clear_payload, task.task_id)
+        except Exception as e:
+            logger.error(f"持久化任务状态失败: {task.task_id}, 错误: {e}")
+        self._publish_status(task)
+
+    def _publish_status(self, task: QueueTask):
+        """推送任务状态事件（结果较大，不随事件推送，客户端收到结束事件后通过 /task/{task_id} 获取）"""
+        task_event_bus.publish_status(
+            task.task_id,
+            task.status.value,
+            retry_count=task.retry_count,
+            started_at=task.started_at,
+            completed_at=task.completed_at,
+            error_message=task.error_message
+        )
+
+    async def _load_request_data(self, task: QueueTask) -> Dict[str, Any]:
+        """获取任务的完整请求数据（重试时大字段已释放，需要从存储中重新读取）"""
+        if not task.payload_released:
+            return task.request_data
+
+        payload = await asyncio.to_thread(self.store.load_payload, task.task_id)
+        if not payload:
+            raise RuntimeError(f"任务请求数据已丢失，无法重试: {task.task_id}")
+        return payload
+
+    def _release_payload(self, task: QueueTask):
+        """开始处理后释放内存中的大字段"""
+        if task.payload_released:
+            return
+        task.request_data = {
+            key: value for key, value in task.request_data.items() if key not in PAYLOAD_FIELDS
+        }
+        task.payload_released = True
+        self.retention.record_payload_released()
+
+    async def _spill_result(self, task: QueueTask):
+        """将成功结果转存到磁盘，内存中只保留引用"""
+        if not self.artifacts or task.result is None:
+            return
+        try:
+            task.result_ref = await asyncio.to_thread(
+                self.artifacts.put_json, f"results/{task.task_id}.json", task.result
+            )
+            task.result = None
+            self.retention.record_result_spilled()
+        except Exception as e:
+            # 转存失败时结果继续保留在内存中
+            logger.error(f"结果转存失败: {task.task_id}, 错误: {e}")
+
+    def _record_stage_event(self, event: TaskEvent):
+        """工作进程：将阶段进度写入共享存储（不阻塞发布方）"""
+        if event.event != EVENT_STAGE:
+            return
+        write = asyncio.create_task(asyncio.to_thread(
+            self.store.append_event, event.task_id, EVENT_STAGE, event.stage, event.data
+        ))
+        self._event_writes.add(write)
+        write.add_done_callback(self._event_writes.discard)
+
+    async def _event_relay(self):
+        """api 进程：转发工作进程写入共享存储的任务事件，并刷新排队统计"""
+        last_event_id = await asyncio.to_thread(self.store.last_event_id)
+        # 同一状态可能被记录多次（领取任务和开始处理），只转发状态变化
+        last_status: Dict[str, str] = {}
+        model_loaded_at = time.time()
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.poll_interval)
+                if time.time() - model_loaded_at >= ETA_MODEL_RELOAD_INTERVAL:
+                    await self._load_eta_model()
+                    model_loaded_at = time.time()
+                events = await asyncio.to_thread(self.store.load_events_since, last_event_id)
+                for row in events:
+                    last_event_id = row["id"]
+                    if row["stage"]:
+                        task_event_bus.publish(TaskEvent(
+                            task_id=row["task_id"], event=EVENT_STAGE, stage=row["stage"],
+                            data=row["data"] or {}, timestamp=row["timestamp"]
+                        ))
+                        continue
+                    if last_status.get(row["task_id"]) == row["status"]:
+                        continue
+                    if row["status"] in TERMINAL_STATUSES:
+                        last_status.pop(row["task_id"], None)
+                        self._release_admission(row["task_id"])
+                    else:
+                        last_status[row["task_id"]] = row["status"]
+                    record = await asyncio.to_thread(self.store.load_task, row["task_id"])
+                    if record:
+                        task = QueueTask.from_record(record)
+                        task.status = TaskStatus(row["status"])
+                        self._publish_status(task)
+                        if self.tenants and task.status in FINISHED_STATUSES:
+                            self._record_tenant_finished(task)
+
+                counts = await asyncio.to_thread(self.store.count_by_status)
+                self._stats["current_queue_size"] = counts.get(TaskStatus.PENDING.value, 0)
+                self._stats["current_processing"] = counts.get(TaskStatus.PROCESSING.value, 0)
+                if self.tenants:
+                    self._tenant_counts = await self._count_tenant_tasks()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"任务事件转发异常: {e}")
+
+    async def _requeue_later(self, task: QueueTask, delay: float):
+        """退避等待后重新入队（等待期间任务被取消或服务关闭则放弃，关闭时由重启恢复）"""
+        await asyncio.sleep(delay)
+        if self.is_running and task.status == TaskStatus.PENDING:
+            await self.queue.put(task)
+
+    async def _finish_task(self, task: QueueTask):
+        """任务结束后发送回调、释放准入名额、登记保留策略，并按数量/内存上限淘汰"""
+        await self._notify_webhooks(task)
+        self._release_admission(task.task_id)
+        if self.tenants:
+            self._record_tenant_finished(task)
+        if self.artifacts:
+            await TaskCheckpoint(self.artifacts, task.task_id).clear()
+        if self.role == ROLE_WORKER:
+            # 工作进程不对外提供查询，结束的任务以共享存储为准
+            self.tasks.pop(task.task_id, None)
+            return
+        self.retention.track(task.task_id, estimate_task_bytes(task))
+        await self._evict_tasks()
+
+    def _record_tenant_finished(self, task: QueueTask):
+        self.tenants.record_finished(
+            tenant_of(task.tenant_id), task.status.value, task.created_at, task.started_at, task.completed_at
+        )
+
+    async def _evict_tasks(self):
+        """淘汰内存中的已结束任务，TTL 过期的任务同时删除结果产物"""
+        evictions = self.retention.select_evictions(self.tasks)
+        for task_id, reason in evictions:
+            task = self.tasks.pop(task_id, None)
+            if reason == EVICT_TTL and task and task.result_ref and self.artifacts:
+                await asyncio.to_thread(self.artifacts.delete, task.result_ref)
+
+    async def _purge_expired_tasks(self):
+        """清理存储中过期的任务（包括已从内存淘汰的任务）及其结果产物"""
+        expire_before = time.time() - self.retention.policy.ttl_seconds
+        expired = await asyncio.to_thread(self.store.purge_finished, expire_before)
+        for record in expired:
+            if record.get("result_ref") and self.artifacts:
+                await asyncio.to_thread(self.artifacts.delete, record["result_ref"])
+        if expired:
+            logger.info(f"已清理 {len(expired)} 个过期任务")
+
+    async def _retention_sweeper(self, interval: float = 60.0):
+        """定期执行保留策略（处理 TTL 过期）"""
+        while self.is_running:
+            try:
+                await asyncio.sleep(interval)
+                await self._evict_tasks()
+                await self._purge_expired_tasks()
+                await self._save_eta_model()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"任务保留策略执行异常: {e}")
     
     async def cancel_task(self, task_id: str) -> bool:
         """取消任务"""
+        if self.role == ROLE_API:
+            # 等待中的任务直接取消，处理中的任务由持有租约的工作进程在续约时取消
+            status = await asyncio.to_thread(self.store.request_cancel, task_id)
+            if status:
+                logger.info(f"已请求取消任务: {task_id}, 状态: {status}")
+            if status == TaskStatus.CANCELLED.value:
+                task = await self.get_task_status(task_id)
+                if task:
+                    await self._notify_webhooks(task)
+            return status is not None
+
         task = self.tasks.get(task_id)
         if not task:
             return False
         
         if task.status == TaskStatus.PENDING:
             task.status = TaskStatus.CANCELLED
+            task.completed_at = time.time()
+            await self._persist(task)
+            await self._finish_task(task)
             logger.info(f"任务已取消: {task_id}")
             return True
         elif task.status == TaskStatus.PROCESSING:
             # 取消正在处理的任务
-            processing_task = self.processing_tasks.get(task_id)
-            if processing_task:
-                processing_task.cancel()
+            if self._cancel_processing(task_id):
                 task.status = TaskStatus.CANCELLED
                 logger.info(f"正在处理的任务已取消: {task_id}")
                 return True
@@ -150,32 +956,61 @@ class RequestQueue:
     
     def get_queue_stats(self) -> Dict[str, Any]:
         """获取队列统计信息"""
-        self._stats["current_queue_size"] = self.queue.qsize()
-        self._stats["current_processing"] = len(self.processing_tasks)
+        if self.role == ROLE_ALL:
+            self._stats["current_queue_size"] = self.queue.qsize()
+        if self.role != ROLE_API:
+            self._stats["current_processing"] = len(self.processing_tasks)
         
         return {
             **self._stats,
+            "role": self.role,
             "queue_capacity": self.max_queue_size,
             "max_concurrent": self.max_concurrent_tasks,
-            "is_running": self.is_running
+            "current_concurrency_limit": self.limiter.limit,
+            "is_running": self.is_running,
+            "retention": self.retention.get_stats(),
+            "eta_model": eta_estimator.get_stats(),
+            "admission": self.admission.get_stats() if self.admission else None,
+            "scheduler": self.queue.get_stats(),
+            "tenants": self.tenants.get_stats(self._current_tenant_counts()) if self.tenants else None,
+            "webhooks": self.webhooks.get_stats() if self.webhooks else None,
+            "concurrency": self.limiter.get_stats()
         }
     
+    def _current_tenant_counts(self) -> Dict[str, Dict[str, int]]:
+        """各租户等待和处理中的任务数（api 角色使用事件转发时刷新的统计）"""
+        if self.role == ROLE_API:
+            return self._tenant_counts
+        counts: Dict[str, Dict[str, int]] = {}
+        for task in self.tasks.values():
+            if task.status in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+                tenant = counts.setdefault(tenant_of(task.tenant_id), {})
+                tenant[task.status.value] = tenant.get(task.status.value, 0) + 1
+        return counts
+
     async def _worker(self, worker_name: str):
         """工作协程"""
         logger.info(f"工作协程启动: {worker_name}")
         
         while self.is_running:
+            acquired = False
             try:
+                # 先获取全局并发名额，再从队列获取任务
+                acquired = await self.limiter.acquire(timeout=1.0)
+                if not acquired:
+                    continue
+
                 # 从队列获取任务
                 task = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-                
-                if task.status == TaskStatus.CANCELLED:
-                    self.queue.task_done()
-                    continue
-                
-                # 处理任务
-                await self._process_task(task, worker_name)
-                self.queue.task_done()
+                try:
+                    if task.status == TaskStatus.CANCELLED:
+                        continue
+
+                    # 处理任务
+                    await self._process_task(task, worker_name)
+                finally:
+                    # 释放租户并发名额（重试的任务重新入队后再次计入）
+                    self.queue.release(task.tenant_id)
                 
             except asyncio.TimeoutError:
                 # 超时继续循环
@@ -186,9 +1021,124 @@ class RequestQueue:
             except Exception as e:
                 logger.error(f"工作协程异常: {worker_name}, 错误: {e}")
                 await asyncio.sleep(1)
+            finally:
+                if acquired:
+                    self.limiter.release()
         
         logger.info(f"工作协程结束: {worker_name}")
+
+    async def _lease_worker(self, worker_name: str):
+        """工作协程（worker 角色）：从共享存储领取任务，处理期间定期续约"""
+        logger.info(f"工作协程启动: {worker_name}, 工作进程: {self.worker_id}")
+
+        while self.is_running:
+            acquired = False
+            try:
+                acquired = await self.limiter.acquire(timeout=1.0)
+                if not acquired:
+                    continue
+
+                # 在领取事务中按调度策略选择任务（租户并发按所有工作进程统计）
+                record = await asyncio.to_thread(
+                    self.store.claim_task, self.worker_id, self.lease_seconds,
+                    lambda candidates, running: self.queue.select(candidates, running=running)
+                )
+                if record is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                task = QueueTask.from_record(record)
+                self.queue.record_dispatch(task.priority, tenant_id=task.tenant_id, cost=task.cost)
+                task.available_at = None
+                self.tasks[task.task_id] = task
+                if task.retry_count > task.max_retries:
+                    # 接管的任务多次在处理中导致工作进程退出（租约过期），不再执行
+                    await self._fail_reclaimed(task)
+                    self.queue.release(task.tenant_id)
+                    continue
+                heartbeat = asyncio.create_task(self._heartbeat(task))
+                try:
+                    await self._process_task(task, worker_name)
+                finally:
+                    heartbeat.cancel()
+                    self.queue.release(task.tenant_id)
+
+            except asyncio.CancelledError:
+                logger.info(f"工作协程被取消: {worker_name}")
+                break
+            except Exception as e:
+                logger.error(f"工作协程异常: {worker_name}, 错误: {e}")
+                await asyncio.sleep(1)
+            finally:
+                if acquired:
+                    self.limiter.release()
+
+        logger.info(f"工作协程结束: {worker_name}")
+
+    async def _fail_reclaimed(self, task: QueueTask):
+        """将超过最大重试次数的接管任务标记为失败"""
+        task.status = TaskStatus.FAILED
+        task.completed_at = time.time()
+        task.error_message = "任务处理中工作进程多次退出，已达最大重试次数"
+        task.result = {"success": False, "error_message": task.error_message, "request_id": task.task_id}
+        self._stats["failed_requests"] += 1
+        logger.error(f"任务租约多次过期，已达最大重试次数: {task.task_id}")
+        await self._persist(task)
+        if task.lease_lost:
+            self.tasks.pop(task.task_id, None)
+        else:
+            await self._finish_task(task)
+
+    async def _heartbeat(self, task: QueueTask):
+        """定期续约，并检查 API 进程发来的取消请求"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                lease = await asyncio.to_thread(
+                    self.store.renew_lease, task.task_id, self.worker_id, self.lease_seconds
+                )
+            except Exception as e:
+                logger.error(f"任务续约失败: {task.task_id}, 错误: {e}")
+                continue
+
+            if lease is None:
+                # 续约不及时，任务已被其他工作进程接管
+                logger.warning(f"任务租约已失效，停止处理: {task.task_id}")
+                task.lease_lost = True
+                self._cancel_processing(task.task_id)
+                return
+            if lease["cancel_requested"] and task.task_id in self.processing_tasks:
+                task.status = TaskStatus.CANCELLED
+                self._cancel_processing(task.task_id)
+                logger.info(f"正在处理的任务已取消: {task.task_id}")
+                return
+
+    def _cancel_processing(self, task_id: str) -> bool:
+        """
+        取消处理中的任务：先标记任务上下文（线程池中的同步代码在下一次检查时退出），
+        再取消处理协程（正在等待的上游调用和子进程随之取消）
+        """
+        context = self.task_contexts.get(task_id)
+        if context:
+            context.cancel()
+        processing_task = self.processing_tasks.get(task_id)
+        if processing_task is None:
+            return False
+        processing_task.cancel()
+        return True
     
+    def _task_deadline(self, task: QueueTask) -> Tuple[Optional[float], bool]:
+        """
+        任务的处理截止时间
+
+        Returns:
+            (截止时间, 是否由客户端截止时间决定)，都未设置时截止时间为 None
+        """
+        timeout_at = task.started_at + self.task_timeout if self.task_timeout else None
+        if task.deadline and (timeout_at is None or task.deadline <= timeout_at):
+            return task.deadline, True
+        return timeout_at, False
+
     async def _process_task(self, task: QueueTask, worker_name: str):
         """处理单个任务"""
         task_id = task.task_id
@@ -197,8 +1147,14 @@ class RequestQueue:
             # 更新任务状态
             task.status = TaskStatus.PROCESSING
             task.started_at = time.time()
+            await self._persist(task)
             
             logger.info(f"开始处理任务: {task_id}, 工作协程: {worker_name}")
+
+            # 截止时间：客户端截止时间与处理超时中较早的一个，各阶段的上游调用超时不超过剩余时间
+            deadline, client_bound = self._task_deadline(task)
+            if client_bound and deadline <= task.started_at:
+                raise DeadlineExceeded(f"任务在开始处理前已超过截止时间: {task_id}")
             
             # 创建处理协程
             from service.brief_report_service import BriefReportService
@@ -207,30 +1163,53 @@ class RequestQueue:
             brief_report_service = BriefReportService()
 
             # 构建AnalysisRequest对象
+            request_data = await self._load_request_data(task)
             analysis_request = AnalysisRequest(
-                file_base64=task.request_data.get("file_base64"),
-                markdown_content=task.request_data.get("markdown_content"),
-                mime_type=task.request_data.get("mime_type"),
-                report_type=task.request_data["report_type"],
-                custom_prompt=task.request_data.get("custom_prompt"),
-                file_name=task.request_data.get("file_name"),
-                name=task.request_data.get("name"),
-                id_card=task.request_data.get("id_card"),
-                mobile_no=task.request_data.get("mobile_no"),
-                auth_file=task.request_data.get("auth_file"),
-                customer_info=task.request_data.get("customer_info")
+                file_base64=request_data.get("file_base64"),
+                markdown_content=request_data.get("markdown_content"),
+                mime_type=request_data.get("mime_type"),
+                report_type=request_data["report_type"],
+                custom_prompt=request_data.get("custom_prompt"),
+                file_name=request_data.get("file_name"),
+                name=request_data.get("name"),
+                id_card=request_data.get("id_card"),
+                mobile_no=request_data.get("mobile_no"),
+                auth_file=request_data.get("auth_file"),
+                customer_info=request_data.get("customer_info")
             )
+            del request_data
+
+            # 请求数据已交给处理流程，释放任务中持有的大字段
+            self._release_payload(task)
+
+            # 阶段检查点：重试或重启恢复时从第一个未完成的阶段继续
+            checkpoint = TaskCheckpoint(self.artifacts, task_id) if self.artifacts else None
 
             processing_coro = brief_report_service.generate_report(
                 analysisRequest=analysis_request,
-                request_id=task_id
+                request_id=task_id,
+                checkpoint=checkpoint
             )
 
-            processing_task = asyncio.create_task(processing_coro)
+            # 处理协程及其子任务继承任务上下文（阶段耗时按任务画像记录）
+            task_context = TaskContext(task_id=task_id, profile_key=task.profile_key, deadline=deadline)
+            token = set_task_context(task_context)
+            try:
+                processing_task = asyncio.create_task(processing_coro)
+            finally:
+                reset_task_context(token)
             self.processing_tasks[task_id] = processing_task
+            self.task_contexts[task_id] = task_context
 
             # 等待处理完成 - generate_report返回三个值: (visualization_report, html_file, pdf_file)
-            visualization_report, html_file, pdf_file = await processing_task
+            try:
+                visualization_report, html_file, pdf_file = await asyncio.wait_for(
+                    processing_task, timeout=max(deadline - time.time(), 0) if deadline else None
+                )
+            except asyncio.TimeoutError:
+                if client_bound:
+                    raise DeadlineExceeded(f"任务未能在截止时间前完成: {task_id}")
+                raise asyncio.TimeoutError(f"任务处理超时 (>{self.task_timeout}s)")
 
             # 更新任务结果
             task.completed_at = time.time()
@@ -239,6 +1218,7 @@ class RequestQueue:
             if visualization_report is not None:
                 task.status = TaskStatus.COMPLETED
                 self._stats["completed_requests"] += 1
+                self.limiter.record_latency(task.processing_time)
                 logger.info(f"任务处理成功: {task_id}, 耗时: {task.processing_time:.2f}s")
 
                 # 将PDF二进制转换为base64字符串
@@ -263,6 +1243,7 @@ class RequestQueue:
                     "request_id": task_id,
                     "processing_time": task.processing_time
                 }
+                await self._spill_result(task)
             else:
                 task.status = TaskStatus.FAILED
                 task.error_message = "报告生成失败"
@@ -275,31 +1256,117 @@ class RequestQueue:
                 }
         
         except asyncio.CancelledError:
-            task.status = TaskStatus.CANCELLED
-            task.completed_at = time.time()
-            logger.info(f"任务被取消: {task_id}")
+            if not self.is_running and task.status != TaskStatus.CANCELLED:
+                # 服务关闭导致的中断，保留为等待状态，重启后恢复执行
+                task.status = TaskStatus.PENDING
+                task.started_at = None
+                logger.info(f"服务关闭，任务将在重启后恢复: {task_id}")
+            else:
+                task.status = TaskStatus.CANCELLED
+                task.completed_at = time.time()
+                logger.info(f"任务被取消: {task_id}")
         
         except Exception as e:
             task.completed_at = time.time()
             task.status = TaskStatus.FAILED
             task.error_message = str(e)
-            self._stats["failed_requests"] += 1
+
+            # 超时、上游限流或5xx时减小全局并发
+            overload_reason = classify_overload(e)
+            if overload_reason:
+                self.limiter.record_overload(overload_reason)
             
-            # 重试逻辑
-            if task.retry_count < task.max_retries:
+            # 重试逻辑：仅重试可恢复的错误，按指数退避延迟重新入队；已超过客户端截止时间的任务不再重试
+            if not is_retryable(e) or (task.deadline and task.deadline <= time.time()):
+                self._stats["failed_requests"] += 1
+                logger.error(f"任务处理失败（不可重试）: {task_id}, 错误: {e}")
+            elif task.retry_count < task.max_retries:
                 task.retry_count += 1
                 task.status = TaskStatus.PENDING
                 task.started_at = None
                 task.completed_at = None
-                await self.queue.put(task)
-                logger.warning(f"任务处理失败，重试 {task.retry_count}/{task.max_retries}: {task_id}, 错误: {e}")
+                self._stats["retried_requests"] += 1
+                delay = backoff_delay(
+                    task.retry_count, settings.stage.retry_backoff_base, settings.stage.retry_backoff_max
+                )
+                if self.role == ROLE_ALL:
+                    requeue = asyncio.create_task(self._requeue_later(task, delay))
+                    self._requeue_tasks.add(requeue)
+                    requeue.add_done_callback(self._requeue_tasks.discard)
+                else:
+                    # 共享队列：退避到期后由任意工作进程重新领取
+                    task.available_at = time.time() + delay
+                logger.warning(
+                    f"任务处理失败，{delay:.1f}s 后重试 {task.retry_count}/{task.max_retries}: {task_id}, 错误: {e}"
+                )
             else:
+                self._stats["failed_requests"] += 1
                 logger.error(f"任务处理失败，已达最大重试次数: {task_id}, 错误: {e}")
         
         finally:
-            # 清理处理中的任务记录
+            # 清理处理中的任务记录；线程池中仍在运行的同步代码在下一次检查时退出
             self.processing_tasks.pop(task_id, None)
+            context = self.task_contexts.pop(task_id, None)
+            if context:
+                context.cancel()
+            await self._persist(task)
+            if task.lease_lost:
+                # 已由其他工作进程接管，不再写入状态和清理检查点
+                self.tasks.pop(task_id, None)
+            elif task.status in FINISHED_STATUSES:
+                await self._finish_task(task)
 
 
 # 全局队列实例
-request_queue = RequestQueue(max_concurrent_tasks=3, max_queue_size=100)
+request_queue = RequestQueue(
+    max_concurrent_tasks=settings.queue.max_concurrent_tasks,
+    max_queue_size=settings.queue.max_queue_size,
+    store=create_task_store(settings.queue.store_backend, settings.queue.store_path),
+    artifacts=ArtifactStore(settings.queue.artifact_dir),
+    retention=RetentionPolicy(
+        ttl_seconds=settings.queue.retention_ttl,
+        max_tasks=settings.queue.retention_max_tasks,
+        max_memory_bytes=settings.queue.retention_max_memory_mb * 1024 * 1024
+    ),
+    limiter=create_limiter(
+        "global",
+        max_limit=settings.queue.max_concurrent_tasks,
+        target_latency=settings.adaptive.global_target_latency,
+        min_limit=settings.adaptive.global_min_tasks
+    ),
+    task_timeout=settings.queue.task_timeout,
+    role=settings.queue.role,
+    lease_seconds=settings.queue.lease_seconds,
+    poll_interval=settings.queue.poll_interval,
+    dedup_enabled=settings.queue.dedup_enabled,
+    result_cache_ttl=settings.queue.result_cache_ttl,
+    admission=admission_controller,
+    urgent_burst=settings.queue.urgent_burst,
+    scheduling_policy=settings.queue.scheduling_policy,
+    aging_seconds=settings.queue.aging_seconds,
+    default_deadline=settings.queue.default_deadline,
+    tenants=create_tenant_fair_share(
+        enabled=settings.tenant.enabled,
+        default_weight=settings.tenant.default_weight,
+        max_concurrent=settings.tenant.max_concurrent,
+        max_queued=settings.tenant.max_queued,
+        overrides=settings.tenant.overrides
+    ),
+    webhooks=create_webhook_dispatcher(
+        enabled=settings.webhook.enabled,
+        secret=settings.webhook.secret,
+        timeout=settings.webhook.timeout,
+        max_attempts=settings.webhook.max_attempts,
+        backoff_base=settings.webhook.backoff_base,
+        backoff_max=settings.webhook.backoff_max,
+        batch_tenants=settings.webhook.batch_tenants,
+        batch_size=settings.webhook.batch_size,
+        batch_window=settings.webhook.batch_window,
+        include_result=settings.webhook.include_result,
+        max_inline_bytes=settings.webhook.max_inline_bytes,
+        public_base_url=settings.webhook.public_base_url,
+        allowed_hosts=settings.webhook.allowed_hosts,
+        poll_interval=settings.queue.poll_interval,
+        lease_seconds=settings.queue.lease_seconds
+    )
+)
@@ -0,0 +1,136 @@
+"""
+任务保留策略
+
+控制 RequestQueue 中已结束任务占用的内存：
+- 按 TTL 过期：超过保留时间的已结束任务从内存、存储和产物目录中清除
+- 按 LRU 淘汰：超过数量上限或内存上限时，淘汰最久未访问的已结束任务
+  （仅从内存中移除，仍可通过任务存储查询）
+"""
+
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
+from loguru import logger
+
+
+# 淘汰原因
+EVICT_TTL = "ttl"
+EVICT_COUNT = "count"
+EVICT_MEMORY = "memory"
+
+
+@dataclass
+class RetentionPolicy:
+    """保留策略配置"""
+    ttl_seconds: float = 7 * 24 * 3600  # 已结束任务保留时间
+    max_tasks: int = 1000  # 内存中保留的已结束任务数上限
+    max_memory_bytes: int = 512 * 1024 * 1024  # 内存中已结束任务数据总量上限
+
+
+def estimate_task_bytes(task) -> int:
+    """粗略估计任务在内存中占用的字节数（请求数据中的字符串 + 内存中的结果）"""
+    size = 512  # 对象本身开销的粗略估计
+    for value in task.request_data.values():
+        if isinstance(value, str):
+            size += len(value)
+    if task.result is not None:
+        try:
+            size += len(json.dumps(task.result, ensure_ascii=False, default=str))
+        except Exception:
+            pass
+    return size
+
+
+class TaskRetention:
+    """已结束任务的保留管理（LRU + TTL）"""
+
+    def __init__(self, policy: RetentionPolicy):
+        self.policy = policy
+        # 已结束任务: task_id -> 估计占用字节数，按访问时间排序（最久未访问在前）
+        self._finished: "OrderedDict[str, int]" = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = {
+            "released_payloads": 0,
+            "spilled_results": 0,
+            "evicted_ttl": 0,
+            "evicted_count": 0,
+            "evicted_memory": 0,
+        }
+
+    def record_payload_released(self):
+        self._stats["released_payloads"] += 1
+
+    def record_result_spilled(self):
+        self._stats["spilled_results"] += 1
+
+    def track(self, task_id: str, size_bytes: int):
+        """登记一个已结束的任务"""
+        self.forget(task_id)
+        self._finished[task_id] = size_bytes
+        self._memory_bytes += size_bytes
+
+    def touch(self, task_id: str):
+        """任务被访问，更新 LRU 顺序"""
+        if task_id in self._finished:
+            self._finished.move_to_end(task_id)
+
+    def forget(self, task_id: str):
+        """移除登记（任务被淘汰或重新入队）"""
+        size = self._finished.pop(task_id, None)
+        if size is not None:
+            self._memory_bytes -= size
+
+    def select_evictions(self, tasks: Dict[str, Any], now: float = None) -> List[Tuple[str, str]]:
+        """
+        选出需要淘汰的任务
+
+        Args:
+            tasks: RequestQueue.tasks
+            now: 当前时间
+
+        Returns:
+            [(task_id, 淘汰原因)]，调用方负责实际移除
+        """
+        now = now or time.time()
+        evictions = []
+
+        # 1. TTL 过期
+        expire_before = now - self.policy.ttl_seconds
+        for task_id in list(self._finished):
+            task = tasks.get(task_id)
+            completed_at = task.completed_at if task else None
+            if completed_at is not None and completed_at < expire_before:
+                evictions.append((task_id, EVICT_TTL))
+
+        for task_id, _ in evictions:
+            self.forget(task_id)
+
+        # 2. 数量上限（LRU）
+        while len(self._finished) > self.policy.max_tasks:
+            task_id, size = self._finished.popitem(last=False)
+            self._memory_bytes -= size
+            evictions.append((task_id, EVICT_COUNT))
+
+        # 3. 内存上限（LRU）
+        while self._finished and self._memory_bytes > self.policy.max_memory_bytes:
+            task_id, size = self._finished.popitem(last=False)
+            self._memory_bytes -= size
+            evictions.append((task_id, EVICT_MEMORY))
+
+        for task_id, reason in evictions:
+            self._stats[f"evicted_{reason}"] += 1
+            logger.info(f"淘汰已结束任务: {task_id}, 原因: {reason}")
+
+        return evictions
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "retained_finished_tasks": len(self._finished),
+            "retained_memory_bytes": self._memory_bytes,
+            "ttl_seconds": self.policy.ttl_seconds,
+            "max_tasks": self.policy.max_tasks,
+            "max_memory_bytes": self.policy.max_memory_bytes,
+        }
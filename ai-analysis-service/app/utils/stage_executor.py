@@ -0,0 +1,306 @@
+"""
+分阶段执行器
+
+将报告生成流程拆分为独立调度的阶段，每个阶段拥有独立的工作池和有界队列：
+- markdown: PDF转Markdown（pdfplumber 解析 / OCR 服务）
+- dify: Dify 工作流
+- bigdata: 天远大数据接口
+- convert: 数据转换与大模型增强（产品推荐、专家分析）
+- html: Node 渲染 HTML
+- pdf: Chromium 渲染 PDF
+
+I/O 密集型阶段（dify/bigdata）与 CPU/浏览器密集型阶段（markdown/html/pdf）可以分别设置并发，
+慢速的 Chromium 渲染不会再占用发起下一个 Dify 调用的槽位。
+
+各阶段可单独设置重试次数，仅对可重试错误（超时、限流、上游5xx）按指数退避重试，
+失败的阶段在阶段内重试，不会让整个任务从头开始；任务剩余时间不足以等待退避时不再重试。
+
+阶段任务在提交方的上下文中执行（继承任务上下文中的截止时间和取消标记）。
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable, Awaitable
+from loguru import logger
+
+from config.settings import settings
+from utils.errors import is_retryable, backoff_delay
+from utils.task_context import get_task_context, check_cancelled
+from utils.eta_estimator import eta_estimator
+
+
+STAGE_MARKDOWN = "markdown"
+STAGE_DIFY = "dify"
+STAGE_BIGDATA = "bigdata"
+STAGE_CONVERT = "convert"
+STAGE_HTML = "html"
+STAGE_PDF = "pdf"
+
+
+@dataclass
+class StageJob:
+    """阶段任务"""
+    func: Callable[..., Awaitable[Any]]
+    args: tuple
+    kwargs: dict
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.time)
+    # 提交方的上下文（任务上下文），阶段任务在其中执行
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class StagePool:
+    """单个阶段的工作池：有界队列 + 固定数量的工作协程"""
+
+    # 吞吐量统计窗口（秒）
+    THROUGHPUT_WINDOW = 60.0
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, max_retries: int = 0):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker_tasks: list = []
+        self.running = 0
+        self._recent_completions: deque = deque()
+        self._recent_durations: deque = deque(maxlen=200)
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "retried": 0,
+            "total_busy_seconds": 0.0,
+            "total_wait_seconds": 0.0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.worker_tasks)
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        for i in range(self.concurrency):
+            self.worker_tasks.append(asyncio.create_task(self._worker(f"{self.name}-{i}")))
+
+    async def stop(self):
+        for worker in self.worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        self.worker_tasks.clear()
+
+        # 未执行的任务直接取消
+        while self.queue and not self.queue.empty():
+            job = self.queue.get_nowait()
+            if not job.future.done():
+                job.future.cancel()
+
+    async def submit(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """提交任务并等待结果，队列已满时等待（反压）"""
+        self._stats["submitted"] += 1
+        job = StageJob(func, args, kwargs, asyncio.get_running_loop().create_future())
+        await self.queue.put(job)
+        return await job.future
+
+    async def run_inline(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """工作池未启动时（如脚本直接调用服务）在当前协程中执行，仍然记录统计"""
+        self._stats["submitted"] += 1
+        self.running += 1
+        started_at = time.time()
+        try:
+            result = await func(*args, **kwargs)
+            self._record(started_at, success=True)
+            return result
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            raise
+        except Exception:
+            self._record(started_at, success=False)
+            raise
+        finally:
+            self.running -= 1
+
+    async def _worker(self, worker_name: str):
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.future.done():
+                    # 提交方已取消
+                    self._stats["cancelled"] += 1
+                    continue
+                await self._execute(job)
+            finally:
+                self.queue.task_done()
+
+    async def _execute(self, job: StageJob):
+        started_at = time.time()
+        self._stats["total_wait_seconds"] += started_at - job.enqueued_at
+        self.running += 1
+
+        # 新建的 Task 复制当前上下文，在提交方的上下文中创建即可继承任务上下文
+        job_task = job.context.run(asyncio.ensure_future, job.func(*job.args, **job.kwargs))
+        # 提交方取消等待时，同步取消正在执行的任务
+        job.future.add_done_callback(lambda f: job_task.cancel() if f.cancelled() else None)
+
+        try:
+            await asyncio.wait([job_task])
+        except asyncio.CancelledError:
+            # 工作池被关闭
+            job_task.cancel()
+            if not job.future.done():
+                job.future.cancel()
+            raise
+        finally:
+            self.running -= 1
+
+        if job.future.done():
+            self._stats["cancelled"] += 1
+            if not job_task.cancelled():
+                job_task.exception()
+        elif job_task.cancelled():
+            self._stats["cancelled"] += 1
+            job.future.cancel()
+        elif job_task.exception() is not None:
+            self._record(started_at, success=False)
+            job.future.set_exception(job_task.exception())
+        else:
+            self._record(started_at, success=True)
+            job.future.set_result(job_task.result())
+
+    def _record(self, started_at: float, success: bool):
+        now = time.time()
+        duration = now - started_at
+        self._stats["total_busy_seconds"] += duration
+        self._stats["completed" if success else "failed"] += 1
+        if success:
+            self._recent_durations.append(duration)
+        self._recent_completions.append(now)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        while self._recent_completions and self._recent_completions[0] < now - self.THROUGHPUT_WINDOW:
+            self._recent_completions.popleft()
+
+        finished = self._stats["completed"] + self._stats["failed"]
+        durations = sorted(self._recent_durations)
+        return {
+            **self._stats,
+            "concurrency": self.concurrency,
+            "max_retries": self.max_retries,
+            "queue_size": self.queue_size,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "running": self.running,
+            "throughput_per_minute": len(self._recent_completions) * 60.0 / self.THROUGHPUT_WINDOW,
+            "avg_duration_seconds": (self._stats["total_busy_seconds"] / finished) if finished else 0.0,
+            "p95_duration_seconds": durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else 0.0,
+            "avg_wait_seconds": (self._stats["total_wait_seconds"] / finished) if finished else 0.0,
+        }
+
+
+class StageExecutor:
+    """分阶段执行器：按阶段名称将任务分发到对应的工作池"""
+
+    def __init__(
+        self,
+        concurrency: Dict[str, int],
+        queue_size: int = 100,
+        retries: Optional[Dict[str, int]] = None,
+        backoff_base: float = 2.0,
+        backoff_max: float = 60.0
+    ):
+        retries = retries or {}
+        self.pools: Dict[str, StagePool] = {
+            name: StagePool(name, limit, queue_size, retries.get(name, 0))
+            for name, limit in concurrency.items()
+        }
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    async def start(self):
+        for pool in self.pools.values():
+            if not pool.is_running:
+                pool.start()
+        logger.info("阶段执行器已启动: " + ", ".join(
+            f"{name}={pool.concurrency}" for name, pool in self.pools.items()
+        ))
+
+    async def stop(self):
+        await asyncio.gather(*(pool.stop() for pool in self.pools.values()))
+        logger.info("阶段执行器已停止")
+
+    async def run(self, stage: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        在指定阶段的工作池中执行协程函数，可重试错误按阶段配置重试
+
+        Args:
+            stage: 阶段名称
+            func: 协程函数（同步函数可通过 asyncio.to_thread 包装）
+        """
+        pool = self.pools[stage]
+        attempt = 0
+        started_at = time.time()
+        while True:
+            try:
+                # 任务已取消或超过截止时间时不再执行
+                check_cancelled()
+                if pool.is_running:
+                    result = await pool.submit(func, *args, **kwargs)
+                else:
+                    result = await pool.run_inline(func, *args, **kwargs)
+                self._record_task_stage(stage, time.time() - started_at)
+                return result
+            except Exception as e:
+                if attempt >= pool.max_retries or not is_retryable(e):
+                    raise
+                attempt += 1
+                pool._stats["retried"] += 1
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                context = get_task_context()
+                remaining = context.remaining() if context else None
+                if remaining is not None and remaining <= delay:
+                    logger.warning(f"任务剩余时间 {remaining:.1f}s 不足以重试阶段: {stage}, 错误: {e}")
+                    raise
+                logger.warning(
+                    f"阶段执行失败，{delay:.1f}s 后重试 {attempt}/{pool.max_retries}: {stage}, 错误: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _record_task_stage(stage: str, duration: float):
+        """记录当前任务的阶段耗时（含阶段排队和重试），用于完成时间预测"""
+        context = get_task_context()
+        if context is None:
+            return
+        context.completed_stages.add(stage)
+        eta_estimator.observe(stage, context.profile_key, duration)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
+
+
+# 全局阶段执行器实例
+stage_executor = StageExecutor(
+    concurrency={
+        STAGE_MARKDOWN: settings.stage.markdown_concurrency,
+        STAGE_DIFY: settings.stage.dify_concurrency,
+        STAGE_BIGDATA: settings.stage.bigdata_concurrency,
+        STAGE_CONVERT: settings.stage.convert_concurrency,
+        STAGE_HTML: settings.stage.html_concurrency,
+        STAGE_PDF: settings.stage.pdf_concurrency,
+    },
+    queue_size=settings.stage.queue_size,
+    retries={
+        STAGE_MARKDOWN: settings.stage.markdown_retries,
+        STAGE_DIFY: settings.stage.dify_retries,
+        STAGE_BIGDATA: settings.stage.bigdata_retries,
+        STAGE_CONVERT: settings.stage.convert_retries,
+        STAGE_HTML: settings.stage.html_retries,
+        STAGE_PDF: settings.stage.pdf_retries,
+    },
+    backoff_base=settings.stage.retry_backoff_base,
+    backoff_max=settings.stage.retry_backoff_max
+)
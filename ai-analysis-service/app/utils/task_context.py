@@ -0,0 +1,99 @@
+"""
+任务上下文
+
+通过 contextvars 在报告生成流程中传递当前任务的信息，避免在各阶段函数之间逐层传参。
+RequestQueue 在处理任务前设置，处理协程及其创建的子任务（如并行的大数据调用）、
+阶段执行器中的阶段任务和 asyncio.to_thread 线程中的同步代码自动继承。
+
+截止时间与取消：
+- 任务的截止时间取 客户端截止时间（deadline_seconds / 同步接口等待时间）和 开始处理 + QUEUE_TASK_TIMEOUT 中较早的一个
+- 各阶段调用上游前通过 remaining_timeout(默认超时) 取得本次调用的超时时间，不超过任务剩余时间
+- 协程（包括所有上游调用，均使用异步客户端）在任务取消或超时时由 asyncio 取消；
+  线程池中的同步代码无法被中断，在循环中调用 check_cancelled() 尽早退出
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, Set, Dict, Any
+
+from utils.errors import DeadlineExceeded, TaskCancelled
+
+
+@dataclass
+class TaskContext:
+    """当前处理中任务的上下文"""
+    task_id: str
+    profile_key: Optional[str] = None  # 任务画像（报告类型/页数/文件大小），用于耗时预测
+    completed_stages: Set[str] = field(default_factory=set)
+    deadline: Optional[float] = None  # 截止时间（时间戳），None 表示不限制
+    cancelled: bool = False  # 任务已取消或处理已结束，线程中的同步代码应停止
+    metrics: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # 各阶段的资源指标（如PDF解析峰值内存），随阶段事件推送
+
+    def remaining(self) -> Optional[float]:
+        """距截止时间的剩余秒数，不限制时返回 None"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def check(self):
+        """任务已取消或超过截止时间时抛出异常"""
+        if self.cancelled:
+            raise TaskCancelled(f"任务已取消: {self.task_id}")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"任务已超过截止时间: {self.task_id}")
+
+    def cancel(self):
+        self.cancelled = True
+
+
+_current_task: ContextVar[Optional[TaskContext]] = ContextVar("current_task", default=None)
+
+
+def get_task_context() -> Optional[TaskContext]:
+    """获取当前任务上下文，不在任务处理流程中（如同步接口）时返回 None"""
+    return _current_task.get()
+
+
+def set_task_context(context: Optional[TaskContext]):
+    """设置当前任务上下文，返回用于恢复的 token"""
+    return _current_task.set(context)
+
+
+def reset_task_context(token):
+    _current_task.reset(token)
+
+
+def remaining_timeout(default: float) -> float:
+    """
+    本次上游调用的超时时间：默认超时与任务剩余时间中较小的一个
+
+    不在任务处理流程中时返回默认超时；任务已取消或超过截止时间时抛出异常，不再发起调用。
+    """
+    context = _current_task.get()
+    if context is None:
+        return default
+    context.check()
+    remaining = context.remaining()
+    return default if remaining is None else min(default, remaining)
+
+
+def check_cancelled():
+    """任务已取消或超过截止时间时抛出异常（用于线程池中的长循环）"""
+    context = _current_task.get()
+    if context is not None:
+        context.check()
+
+
+def record_stage_metrics(stage: str, **metrics):
+    """记录当前任务某个阶段的指标（不在任务处理流程中时忽略）"""
+    context = _current_task.get()
+    if context is not None:
+        context.metrics.setdefault(stage, {}).update(metrics)
+
+
+def stage_metrics(stage: str) -> Dict[str, Any]:
+    """当前任务某个阶段已记录的指标"""
+    context = _current_task.get()
+    return dict(context.metrics.get(stage, {})) if context is not None else {}
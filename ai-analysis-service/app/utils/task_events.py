@@ -0,0 +1,131 @@
+"""
+任务事件推送
+
+RequestQueue 在任务状态变化时发布状态事件，报告生成流程在每个阶段完成时发布进度事件，
+/task/{task_id}/events 通过 SSE 推送给订阅者，客户端无需轮询 /task/{task_id}。
+
+每个订阅者拥有独立的有界队列，发布操作只做 put_nowait，不会被慢速订阅者阻塞；
+队列满时丢弃该订阅者最旧的事件（状态事件总是携带完整的当前状态，丢弃中间事件不影响正确性）。
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional, Set, List, AsyncIterator, Callable
+
+
+EVENT_STATUS = "status"
+EVENT_STAGE = "stage"
+
+# 已结束状态（与 TaskStatus 的取值一致）
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+@dataclass
+class TaskEvent:
+    """任务事件"""
+    task_id: str
+    event: str  # status / stage
+    status: Optional[str] = None
+    stage: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.event == EVENT_STATUS and self.status in TERMINAL_STATUSES
+
+    def to_sse(self, event_id: Optional[int] = None) -> str:
+        """格式化为 SSE 消息"""
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {self.event}")
+        lines.append(f"data: {json.dumps(asdict(self), ensure_ascii=False)}")
+        return "\n".join(lines) + "\n\n"
+
+
+class TaskEventBus:
+    """任务事件总线（进程内）"""
+
+    def __init__(self, subscriber_queue_size: int = 100, history_size: int = 20):
+        self.subscriber_queue_size = subscriber_queue_size
+        self.history_size = history_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # 事件转存（worker 进程将阶段进度写入共享存储，由 API 进程转发）
+        self.sink: Optional[Callable[[TaskEvent], None]] = None
+        # 进行中任务的最近事件，供中途订阅的客户端补齐已完成的阶段
+        self._history: Dict[str, deque] = {}
+        self._stats = {
+            "published_events": 0,
+            "delivered_events": 0,
+            "dropped_events": 0,
+        }
+
+    def publish(self, event: TaskEvent):
+        """发布事件（非阻塞）"""
+        if self.sink:
+            self.sink(event)
+
+        history = self._history.get(event.task_id)
+        if event.event == EVENT_STATUS:
+            if event.is_terminal:
+                self._history.pop(event.task_id, None)
+            else:
+                if history is None:
+                    history = self._history[event.task_id] = deque(maxlen=self.history_size)
+                history.append(event)
+        elif history is not None:
+            history.append(event)
+        else:
+            # 不在队列中的任务（如同步接口）且无人订阅，直接忽略
+            if event.task_id not in self._subscribers:
+                return
+
+        self._stats["published_events"] += 1
+        for queue in self._subscribers.get(event.task_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self._stats["dropped_events"] += 1
+            queue.put_nowait(event)
+            self._stats["delivered_events"] += 1
+
+    def publish_status(self, task_id: str, status: str, **data):
+        self.publish(TaskEvent(task_id=task_id, event=EVENT_STATUS, status=status, data=data))
+
+    def publish_stage(self, task_id: Optional[str], stage: str, state: str = "completed", **data):
+        if not task_id:
+            return
+        self.publish(TaskEvent(task_id=task_id, event=EVENT_STAGE, stage=stage, data={"state": state, **data}))
+
+    def history(self, task_id: str) -> List[TaskEvent]:
+        return list(self._history.get(task_id, ()))
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        """订阅任务事件，退出上下文时自动取消订阅"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    self._subscribers.pop(task_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "subscribed_tasks": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "tracked_tasks": len(self._history),
+        }
+
+
+# 全局任务事件总线
+task_event_bus = TaskEventBus()
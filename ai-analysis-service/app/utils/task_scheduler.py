@@ -0,0 +1,218 @@
+"""
+任务出队调度
+
+排队任务分为两条通道：
+- 紧急通道（priority >= PRIORITY_URGENT）: 同步接口 /analyze/sync 提交的任务，优先出队
+- 普通通道: /analyze、/analysis 提交的任务（会员任务为 PRIORITY_MEMBER）
+
+紧急任务与普通任务使用同一组工作协程和全局并发限流，不会额外占用 Chromium/Node 等资源；
+连续出队 urgent_burst 个紧急任务后，如果普通通道有任务在等待，则让出一次给普通任务，
+避免紧急请求持续涌入时普通任务被饿死。
+
+通道内按调度策略（QUEUE_SCHEDULING_POLICY）选择下一个任务：
+- fifo: 先进先出
+- priority: 优先级高的先出队；每等待 aging_seconds 提升一级，低优先级任务不会被饿死
+- edf: 截止时间最早的先出队（未指定截止时间的任务按 创建时间 + default_deadline 计算）
+- sjf: 预测耗时（按页数/文件大小画像的 EWMA 估计）最短的先出队；
+       等待每满 aging_seconds 预测耗时按一半计算，大任务等待足够久后会排到新来的小任务之前
+
+启用租户公平调度（TENANT_ENABLED）时，先排除达到并发上限的租户，在通道内按租户权重选出租户，
+再在该租户的任务中按调度策略选择（见 utils/tenants.py）。
+
+老化使排序键随时间变化，每次出队对候选任务线性扫描（排队长度受 QUEUE_MAX_QUEUE_SIZE 限制）。
+单进程模式下 TaskScheduler 直接管理内存中的排队任务；worker 角色从共享存储领取任务时，
+在领取事务中用同一个 select 方法选择任务。
+"""
+
+import asyncio
+import time
+from typing import Dict, Any, List, Optional, Callable, TypeVar
+
+from utils.tenants import TenantFairShare, tenant_of
+
+
+PRIORITY_NORMAL = 0
+PRIORITY_MEMBER = 1
+PRIORITY_URGENT = 2
+
+POLICY_FIFO = "fifo"
+POLICY_PRIORITY = "priority"
+POLICY_EDF = "edf"
+POLICY_SJF = "sjf"
+POLICIES = (POLICY_FIFO, POLICY_PRIORITY, POLICY_EDF, POLICY_SJF)
+
+T = TypeVar("T")
+
+
+class TaskScheduler:
+    """排队任务调度器（进程内）
+
+    调度只依赖任务的 priority / created_at / deadline / cost / tenant_id 五个字段，
+    既可以调度 QueueTask，也可以调度共享存储中的任务记录（字典）。
+    """
+
+    def __init__(
+        self,
+        policy: str = POLICY_FIFO,
+        urgent_burst: int = 3,
+        aging_seconds: float = 120.0,
+        default_deadline: float = 1800.0,
+        tenants: Optional[TenantFairShare] = None
+    ):
+        """
+        Args:
+            policy: 调度策略（fifo/priority/edf/sjf）
+            urgent_burst: 普通任务等待时，最多连续出队的紧急任务数
+            aging_seconds: 老化周期（秒），priority 策略每个周期提升一级，sjf 策略每个周期预测耗时减半
+            default_deadline: edf 策略下未指定截止时间的任务，按创建后多少秒计算截止时间
+            tenants: 租户公平调度状态，未配置时不区分租户
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"不支持的调度策略: {policy}")
+        self.policy = policy
+        self.urgent_burst = max(1, urgent_burst)
+        self.aging_seconds = aging_seconds
+        self.default_deadline = default_deadline
+        self.tenants = tenants
+        self._pending: List[Any] = []
+        # 新任务入队或租户释放并发名额时通知等待中的 get
+        self._changed = asyncio.Event()
+        self._urgent_streak = 0
+        self._stats = {
+            "dispatched_urgent": 0,
+            "dispatched_normal": 0,
+            "urgent_yields": 0,
+        }
+
+    # ==================== 进程内队列 ====================
+
+    async def put(self, task):
+        self.put_nowait(task)
+
+    def put_nowait(self, task):
+        self._pending.append(task)
+        self._changed.set()
+
+    async def get(self):
+        """按调度策略取出下一个任务，没有可出队的任务（队列为空或租户均达到并发上限）时等待"""
+        while True:
+            task = self.select(self._pending, _task_fields) if self._pending else None
+            if task is not None:
+                self._pending.remove(task)
+                self.record_dispatch(
+                    task.priority,
+                    normal_waiting=any(other.priority < PRIORITY_URGENT for other in self._pending),
+                    tenant_id=task.tenant_id,
+                    cost=task.cost
+                )
+                return task
+            self._changed.clear()
+            await self._changed.wait()
+
+    def release(self, tenant_id: Optional[str]):
+        """出队的任务处理结束（或重新入队等待重试），释放租户并发名额"""
+        if self.tenants:
+            self.tenants.release(tenant_of(tenant_id))
+            self._changed.set()
+
+    def qsize(self) -> int:
+        return len(self._pending)
+
+    # ==================== 调度 ====================
+
+    def select(
+        self,
+        items: List[T],
+        fields: Optional[Callable[[T], tuple]] = None,
+        now: Optional[float] = None,
+        running: Optional[Dict[Optional[str], int]] = None
+    ) -> Optional[T]:
+        """
+        从候选任务中选出下一个出队的任务，候选任务所属租户均达到并发上限时返回 None
+
+        Args:
+            items: 候选任务（非空）
+            fields: 提取 (priority, created_at, deadline, cost, tenant_id) 的函数，默认按字典记录读取
+            now: 当前时间（基准测试回放时传入模拟时间）
+            running: 各租户处理中的任务数（worker 角色按共享存储统计），默认按本进程统计
+        """
+        fields = fields or _record_fields
+        now = now if now is not None else time.time()
+
+        if self.tenants:
+            if running is not None:
+                running = _merge_tenants(running)
+            items = [item for item in items if self.tenants.has_capacity(tenant_of(fields(item)[4]), running)]
+            if not items:
+                return None
+
+        urgent = [item for item in items if fields(item)[0] >= PRIORITY_URGENT]
+        normal = [item for item in items if fields(item)[0] < PRIORITY_URGENT]
+        if urgent and (not normal or not self.should_yield_to_normal()):
+            candidates = urgent
+        else:
+            candidates = normal
+        if self.tenants:
+            tenant = self.tenants.choose((tenant_of(fields(item)[4]) for item in candidates), running)
+            candidates = [item for item in candidates if tenant_of(fields(item)[4]) == tenant]
+        return min(candidates, key=lambda item: self.rank(*fields(item)[:4], now=now))
+
+    def rank(self, priority: int, created_at: float, deadline: Optional[float], cost: Optional[float],
+             now: float) -> tuple:
+        """按调度策略计算排序键（越小越先出队）"""
+        waited = max(0.0, now - created_at)
+        if self.policy == POLICY_PRIORITY:
+            return -(priority + waited / self.aging_seconds), created_at
+        if self.policy == POLICY_EDF:
+            return deadline if deadline else created_at + self.default_deadline, created_at
+        if self.policy == POLICY_SJF:
+            return (cost or 0.0) * 0.5 ** (waited / self.aging_seconds), created_at
+        return (created_at,)
+
+    def should_yield_to_normal(self) -> bool:
+        """连续出队的紧急任务已达上限，下一次应优先普通任务"""
+        return self._urgent_streak >= self.urgent_burst
+
+    def record_dispatch(self, priority: int, normal_waiting: bool = True,
+                        tenant_id: Optional[str] = None, cost: Optional[float] = None):
+        """记录一次出队，用于判断是否需要让出给普通任务，并按预测耗时计入租户的已获得服务"""
+        if self.tenants:
+            self.tenants.charge(tenant_of(tenant_id), cost)
+        if priority >= PRIORITY_URGENT:
+            self._stats["dispatched_urgent"] += 1
+            # 普通通道为空时不累计，避免紧急任务在空闲时积累让出次数
+            self._urgent_streak = self._urgent_streak + 1 if normal_waiting else 0
+        else:
+            self._stats["dispatched_normal"] += 1
+            if self._urgent_streak >= self.urgent_burst:
+                self._stats["urgent_yields"] += 1
+            self._urgent_streak = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "policy": self.policy,
+            "urgent_burst": self.urgent_burst,
+            "urgent_queued": sum(1 for task in self._pending if task.priority >= PRIORITY_URGENT),
+            "normal_queued": sum(1 for task in self._pending if task.priority < PRIORITY_URGENT),
+        }
+
+
+def _task_fields(task) -> tuple:
+    return task.priority, task.created_at, task.deadline, task.cost, task.tenant_id
+
+
+def _record_fields(record: Dict[str, Any]) -> tuple:
+    return (
+        record.get("priority") or 0, record["created_at"], record.get("deadline"), record.get("cost"),
+        record.get("tenant_id")
+    )
+
+
+def _merge_tenants(counts: Dict[Optional[str], int]) -> Dict[str, int]:
+    """未指定租户的统计合并到默认租户"""
+    merged: Dict[str, int] = {}
+    for tenant_id, count in counts.items():
+        tenant = tenant_of(tenant_id)
+        merged[tenant] = merged.get(tenant, 0) + count
+    return merged
@@ -0,0 +1,930 @@
+"""
+任务持久化存储
+
+为 RequestQueue 提供可插拔的持久化后端，保证服务重启/崩溃后任务不丢失：
+- MemoryTaskStore: 纯内存实现（不持久化，保持原有行为，便于测试和基准对比）
+- SQLiteTaskStore: SQLite WAL 模式实现，记录任务元数据、状态变更历史和结果
+
+SQLiteTaskStore 同时可以作为多进程共享的任务队列（broker）：工作进程通过租约领取任务
+（claim_task）并定期续约（renew_lease），进程崩溃后租约过期的任务会被其他工作进程重新领取；
+API 进程通过 request_cancel 跨进程取消任务，通过 load_events_since 读取其他进程产生的任务事件。
+
+save_task_unless_duplicate 在同一事务中查找可复用的任务（幂等键或内容去重键相同）并新增任务，
+保证并发的重复提交只会产生一个任务。
+
+任务完成回调（webhook）的发件箱也保存在任务存储中：提交时登记回调（waiting），任务结束时写入
+回调内容并转为待发送（pending），由各进程的 WebhookDispatcher 通过租约领取并发送，进程重启后继续投递。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable
+from loguru import logger
+
+
+class TaskStore:
+    """任务存储接口
+
+    所有方法均为同步方法，调用方（RequestQueue）通过 asyncio.to_thread 调用，
+    避免阻塞事件循环。任务以字典记录（QueueTask.to_record）的形式读写。
+    """
+
+    # 是否可以在多个进程之间共享（作为 api/worker 分离部署的任务队列）
+    shared = False
+
+    def save_task(self, record: Dict[str, Any]) -> None:
+        """新增任务（包含请求数据）"""
+        raise NotImplementedError
+
+    def find_reusable_task(self, dedup_key: Optional[str], idempotency_key: Optional[str],
+                           completed_since: float) -> Optional[Dict[str, Any]]:
+        """
+        查找可复用的任务
+
+        - 幂等键相同且未失败/取消的任务
+        - 去重键相同且正在排队/处理中，或在 completed_since 之后成功完成的任务
+        """
+        raise NotImplementedError
+
+    def save_task_unless_duplicate(self, record: Dict[str, Any], completed_since: float) -> Optional[Dict[str, Any]]:
+        """存在可复用的任务时返回该任务的记录（不新增任务），否则新增任务并返回 None"""
+        raise NotImplementedError
+
+    def attach_task(self, task_id: str, priority: int) -> Optional[Dict[str, Any]]:
+        """
+        重复提交关联到已有任务：关联次数加 1，等待中的任务优先级低于新提交时提升到新提交的优先级（出队通道），
+        返回更新后的记录；任务不存在时返回 None
+        """
+        raise NotImplementedError
+
+    def update_task(self, record: Dict[str, Any], lease_owner: Optional[str] = None) -> bool:
+        """
+        更新任务状态字段（不包含请求数据），并记录一次状态变更
+
+        Args:
+            lease_owner: 持有租约的工作进程，指定时只在租约仍属于该工作进程时更新
+
+        Returns:
+            是否已更新（租约已被其他工作进程接管时为 False）
+        """
+        raise NotImplementedError
+
+    def load_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务记录（不包含请求数据）"""
+        raise NotImplementedError
+
+    def load_payload(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务的请求数据"""
+        raise NotImplementedError
+
+    def clear_payload(self, task_id: str) -> None:
+        """任务结束后清理请求数据，释放存储空间"""
+        raise NotImplementedError
+
+    def load_unfinished(self) -> List[Dict[str, Any]]:
+        """读取所有未完成（pending/processing）的任务，按创建时间排序，包含请求数据"""
+        raise NotImplementedError
+
+    def purge_finished(self, completed_before: float) -> List[Dict[str, Any]]:
+        """删除在指定时间之前结束的任务，返回被删除任务的记录（用于清理结果产物）"""
+        raise NotImplementedError
+
+    def count_by_status(self) -> Dict[str, int]:
+        """按状态统计任务数"""
+        raise NotImplementedError
+
+    def count_pending_before(self, created_at: float, priority: int = 0) -> int:
+        """统计排在指定任务之前的等待任务数（优先级更高，或优先级相同且创建更早），用于计算排队位置"""
+        raise NotImplementedError
+
+    def count_unfinished_by_tenant(self) -> Dict[Optional[str], Dict[str, int]]:
+        """按租户统计等待和处理中的任务数 {tenant_id: {status: count}}"""
+        raise NotImplementedError
+
+    def claim_task(
+        self,
+        worker_id: str,
+        lease_seconds: float,
+        select: Optional[Callable[[List[Dict[str, Any]], Dict[Optional[str], int]], Optional[Dict[str, Any]]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        领取一个可执行的任务（到期的等待任务或租约已过期的处理中任务），返回包含请求数据的记录
+
+        接管租约已过期的任务时重试次数加 1（上一个工作进程在处理中退出），
+        超过最大重试次数的任务仍被领取，由调用方标记为失败
+
+        Args:
+            select: 从候选任务（task_id/priority/created_at/deadline/cost/tenant_id）中选择一个，
+                    第二个参数为各租户处理中的任务数；返回 None 时不领取。默认按创建时间最早
+        """
+        raise NotImplementedError
+
+    def renew_lease(self, task_id: str, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """续约，返回 {"cancel_requested": bool}；租约已不属于该工作进程时返回 None"""
+        raise NotImplementedError
+
+    def request_cancel(self, task_id: str) -> Optional[str]:
+        """请求取消任务：等待中的任务直接取消，处理中的任务标记为待取消，返回任务状态；不可取消时返回 None"""
+        raise NotImplementedError
+
+    def append_event(self, task_id: str, status: str, stage: Optional[str] = None,
+                     data: Optional[Dict[str, Any]] = None) -> None:
+        """记录任务事件（阶段进度等）"""
+
+    def load_events_since(self, last_event_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """读取指定 ID 之后的任务事件"""
+        return []
+
+    def last_event_id(self) -> int:
+        """最新的任务事件 ID"""
+        return 0
+
+    def add_webhook(self, task_id: str, url: str, data: Optional[Dict[str, Any]],
+                    tenant_id: Optional[str], batch: bool) -> int:
+        """登记任务结束时的回调（等待任务结束），返回回调 ID"""
+        raise NotImplementedError
+
+    def activate_webhooks(self, task_id: str, event: Dict[str, Any], batch_delay: float = 0.0) -> int:
+        """
+        任务结束：为该任务登记的回调写入回调内容并转为待发送，返回转换的回调数
+
+        Args:
+            batch_delay: 批量投递的回调延后多少秒发送，以便与同一地址的其他回调合并
+        """
+        raise NotImplementedError
+
+    def claim_webhooks(self, owner: str, lease_seconds: float, limit: int = 100,
+                       batch_size: int = 50) -> List[Dict[str, Any]]:
+        """
+        领取到期的待发送回调
+
+        批量投递的回调到期时，同一地址尚未到期的首次投递回调一并领取（每个地址最多 batch_size 个）
+        """
+        raise NotImplementedError
+
+    def update_webhooks(self, webhook_ids: List[int], status: str, next_attempt_at: Optional[float] = None,
+                        error: Optional[str] = None) -> None:
+        """记录一次投递结果：delivered / dead，或 pending（在 next_attempt_at 重试），并释放租约"""
+        raise NotImplementedError
+
+    def count_webhooks_by_status(self) -> Dict[str, int]:
+        """按状态统计回调数"""
+        return {}
+
+    def close(self) -> None:
+        """关闭存储"""
+
+
+class MemoryTaskStore(TaskStore):
+    """内存任务存储（不持久化）"""
+
+    def __init__(self):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._webhooks: Dict[int, Dict[str, Any]] = {}
+        self._webhook_seq = 0
+        self._lock = threading.Lock()
+
+    def save_task(self, record: Dict[str, Any]) -> None:
+        record = dict(record)
+        self._payloads[record["task_id"]] = record.pop("request_data", None)
+        self._records[record["task_id"]] = record
+
+    def find_reusable_task(self, dedup_key: Optional[str], idempotency_key: Optional[str],
+                           completed_since: float) -> Optional[Dict[str, Any]]:
+        candidates = sorted(self._records.values(), key=lambda record: record["created_at"], reverse=True)
+        if idempotency_key:
+            for record in candidates:
+                if record.get("idempotency_key") == idempotency_key and record["status"] not in ("failed", "cancelled"):
+                    return dict(record)
+        if dedup_key:
+            for record in candidates:
+                if record.get("dedup_key") != dedup_key:
+                    continue
+                if record["status"] in ("pending", "processing") or (
+                    record["status"] == "completed" and (record.get("completed_at") or 0) >= completed_since
+                ):
+                    return dict(record)
+        return None
+
+    def save_task_unless_duplicate(self, record: Dict[str, Any], completed_since: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            existing = self.find_reusable_task(record.get("dedup_key"), record.get("idempotency_key"), completed_since)
+            if existing is None:
+                self.save_task(record)
+            return existing
+
+    def attach_task(self, task_id: str, priority: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None:
+                return None
+            record["attached"] = (record.get("attached") or 0) + 1
+            if record["status"] == "pending" and (record.get("priority") or 0) < priority:
+                record["priority"] = priority
+            return dict(record)
+
+    def update_task(self, record: Dict[str, Any], lease_owner: Optional[str] = None) -> bool:
+        # 内存存储不在进程之间共享，不使用租约
+        record = dict(record)
+        record.pop("request_data", None)
+        self._records[record["task_id"]] = record
+        return True
+
+    def load_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(task_id)
+        return dict(record) if record else None
+
+    def load_payload(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._payloads.get(task_id)
+
+    def clear_payload(self, task_id: str) -> None:
+        self._payloads.pop(task_id, None)
+
+    def load_unfinished(self) -> List[Dict[str, Any]]:
+        return []
+
+    def purge_finished(self, completed_before: float) -> List[Dict[str, Any]]:
+        expired = [
+            record for record in self._records.values()
+            if record.get("completed_at") is not None and record["completed_at"] < completed_before
+        ]
+        for record in expired:
+            self._records.pop(record["task_id"], None)
+            self._payloads.pop(record["task_id"], None)
+        expired_ids = {record["task_id"] for record in expired}
+        with self._lock:
+            for webhook_id in [key for key, row in self._webhooks.items() if row["task_id"] in expired_ids]:
+                self._webhooks.pop(webhook_id)
+        return expired
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for record in self._records.values():
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        return counts
+
+    def count_unfinished_by_tenant(self) -> Dict[Optional[str], Dict[str, int]]:
+        counts: Dict[Optional[str], Dict[str, int]] = {}
+        for record in self._records.values():
+            if record["status"] in ("pending", "processing"):
+                tenant = counts.setdefault(record.get("tenant_id"), {})
+                tenant[record["status"]] = tenant.get(record["status"], 0) + 1
+        return counts
+
+    def add_webhook(self, task_id: str, url: str, data: Optional[Dict[str, Any]],
+                    tenant_id: Optional[str], batch: bool) -> int:
+        with self._lock:
+            self._webhook_seq += 1
+            now = time.time()
+            self._webhooks[self._webhook_seq] = {
+                "id": self._webhook_seq, "task_id": task_id, "url": url, "data": data,
+                "tenant_id": tenant_id, "batch": batch, "status": "waiting", "event": None,
+                "attempts": 0, "next_attempt_at": None, "last_error": None,
+                "lease_expires_at": None, "created_at": now
+            }
+            return self._webhook_seq
+
+    def activate_webhooks(self, task_id: str, event: Dict[str, Any], batch_delay: float = 0.0) -> int:
+        now = time.time()
+        activated = 0
+        with self._lock:
+            for row in self._webhooks.values():
+                if row["task_id"] == task_id and row["status"] == "waiting":
+                    row.update(status="pending", event=event, next_attempt_at=now + (batch_delay if row["batch"] else 0))
+                    activated += 1
+        return activated
+
+    def claim_webhooks(self, owner: str, lease_seconds: float, limit: int = 100,
+                       batch_size: int = 50) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            available = [
+                row for row in self._webhooks.values()
+                if row["status"] == "pending" and (row["lease_expires_at"] is None or row["lease_expires_at"] < now)
+            ]
+            claimed = sorted(
+                (row for row in available if row["next_attempt_at"] <= now), key=lambda row: row["next_attempt_at"]
+            )[:limit]
+            claimed_ids = {row["id"] for row in claimed}
+            for url in {row["url"] for row in claimed if row["batch"]}:
+                room = batch_size - sum(1 for row in claimed if row["url"] == url)
+                extra = [
+                    row for row in available
+                    if row["url"] == url and row["batch"] and row["attempts"] == 0 and row["id"] not in claimed_ids
+                ]
+                claimed.extend(sorted(extra, key=lambda row: row["next_attempt_at"])[:max(room, 0)])
+            for row in claimed:
+                row["lease_expires_at"] = now + lease_seconds
+            return [dict(row) for row in claimed]
+
+    def update_webhooks(self, webhook_ids: List[int], status: str, next_attempt_at: Optional[float] = None,
+                        error: Optional[str] = None) -> None:
+        with self._lock:
+            for webhook_id in webhook_ids:
+                row = self._webhooks.get(webhook_id)
+                if row:
+                    row.update(status=status, attempts=row["attempts"] + 1, last_error=error, lease_expires_at=None)
+                    if next_attempt_at is not None:
+                        row["next_attempt_at"] = next_attempt_at
+
+    def count_webhooks_by_status(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for row in self._webhooks.values():
+                counts[row["status"]] = counts.get(row["status"], 0) + 1
+        return counts
+
+
+class SQLiteTaskStore(TaskStore):
+    """SQLite 任务存储（WAL 模式）
+
+    表结构：
+    - tasks: 任务元数据、当前状态、结果、请求数据和租约信息
+    - task_events: 状态变更和阶段进度历史（追加写入）
+    - webhook_outbox: 任务完成回调的发件箱（登记、待发送、已送达、放弃）
+    """
+
+    shared = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            completed_at REAL,
+            retry_count INTEGER NOT NULL DEFAULT 0,
+            max_retries INTEGER NOT NULL DEFAULT 2,
+            error_message TEXT,
+            result TEXT,
+            result_ref TEXT,
+            request_data TEXT,
+            updated_at REAL NOT NULL,
+            available_at REAL,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            profile_key TEXT,
+            dedup_key TEXT,
+            idempotency_key TEXT,
+            priority INTEGER NOT NULL DEFAULT 0,
+            deadline REAL,
+            cost REAL,
+            tenant_id TEXT,
+            attached INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, created_at);
+        CREATE TABLE IF NOT EXISTS task_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            stage TEXT,
+            data TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_task_events_task ON task_events(task_id);
+        CREATE TABLE IF NOT EXISTS webhook_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL,
+            url TEXT NOT NULL,
+            data TEXT,
+            tenant_id TEXT,
+            batch INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            event TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL,
+            last_error TEXT,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_webhook_task ON webhook_outbox(task_id);
+        CREATE INDEX IF NOT EXISTS idx_webhook_due ON webhook_outbox(status, next_attempt_at);
+    """
+
+    # 回调字段
+    _WEBHOOK_FIELDS = (
+        "id", "task_id", "url", "data", "tenant_id", "batch", "status", "event",
+        "attempts", "next_attempt_at", "last_error", "created_at"
+    )
+
+    # 状态字段（不含请求数据）
+    _FIELDS = (
+        "task_id", "status", "created_at", "started_at", "completed_at",
+        "retry_count", "max_retries", "error_message", "result", "result_ref",
+        "available_at", "cancel_requested", "profile_key", "dedup_key", "idempotency_key",
+        "priority", "deadline", "cost", "tenant_id", "attached"
+    )
+
+    # 旧版本数据库需要补充的字段
+    _MIGRATIONS = (
+        ("tasks", "result_ref", "TEXT"),
+        ("tasks", "available_at", "REAL"),
+        ("tasks", "lease_owner", "TEXT"),
+        ("tasks", "lease_expires_at", "REAL"),
+        ("tasks", "cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+        ("tasks", "profile_key", "TEXT"),
+        ("tasks", "dedup_key", "TEXT"),
+        ("tasks", "idempotency_key", "TEXT"),
+        ("tasks", "priority", "INTEGER NOT NULL DEFAULT 0"),
+        ("tasks", "deadline", "REAL"),
+        ("tasks", "cost", "REAL"),
+        ("tasks", "tenant_id", "TEXT"),
+        ("tasks", "attached", "INTEGER NOT NULL DEFAULT 0"),
+        ("task_events", "stage", "TEXT"),
+        ("task_events", "data", "TEXT"),
+    )
+
+    # 领取任务时参与调度的候选任务数上限（按创建时间最早）
+    CLAIM_CANDIDATES = 500
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 单连接 + 锁，允许在 asyncio.to_thread 的线程池中使用
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # 多进程共享时等待其他进程释放写锁
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self._SCHEMA)
+        self._migrate()
+        # 去重查询的索引（依赖迁移后补充的字段）
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_dedup ON tasks(dedup_key, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_idempotency ON tasks(idempotency_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_tenant ON tasks(tenant_id, status)")
+        logger.info(f"任务存储已启用: SQLite(WAL) {self.db_path}")
+
+    def save_task(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._insert_task(record)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def find_reusable_task(self, dedup_key: Optional[str], idempotency_key: Optional[str],
+                           completed_since: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._find_reusable(dedup_key, idempotency_key, completed_since)
+
+    def save_task_unless_duplicate(self, record: Dict[str, Any], completed_since: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            # IMMEDIATE 事务保证多个 API 进程并发提交同一文件时只新增一个任务
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._find_reusable(
+                    record.get("dedup_key"), record.get("idempotency_key"), completed_since
+                )
+                if existing is None:
+                    self._insert_task(record)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return existing
+
+    def attach_task(self, task_id: str, priority: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            # 只提升出队通道，不修改截止时间（截止时间到期后任务失败，会影响先提交的客户端）
+            self._conn.execute(
+                "UPDATE tasks SET attached = attached + 1, "
+                "priority = CASE WHEN status = 'pending' AND priority < ? THEN ? ELSE priority END, "
+                "updated_at = ? WHERE task_id = ?",
+                (priority, priority, time.time(), task_id)
+            )
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._FIELDS)} FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def update_task(self, record: Dict[str, Any], lease_owner: Optional[str] = None) -> bool:
+        now = time.time()
+        params = [
+            record["status"], record.get("started_at"), record.get("completed_at"),
+            record.get("retry_count", 0), record.get("error_message"),
+            self._dumps(record.get("result")), record.get("result_ref"), now,
+            record.get("available_at"), record["status"], record["status"], record["task_id"]
+        ]
+        condition = "task_id = ?"
+        if lease_owner is not None:
+            # 租约已被其他工作进程接管时不覆盖其写入的状态
+            condition += " AND lease_owner = ?"
+            params.append(lease_owner)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # 离开处理中状态时释放租约
+                cursor = self._conn.execute(
+                    "UPDATE tasks SET status = ?, started_at = ?, completed_at = ?, retry_count = ?, "
+                    "error_message = ?, result = ?, result_ref = ?, updated_at = ?, available_at = ?, "
+                    "lease_owner = CASE WHEN ? = 'processing' THEN lease_owner END, "
+                    "lease_expires_at = CASE WHEN ? = 'processing' THEN lease_expires_at END "
+                    f"WHERE {condition}",
+                    params
+                )
+                if lease_owner is not None and cursor.rowcount == 0:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT INTO task_events (task_id, status, timestamp) VALUES (?, ?, ?)",
+                    (record["task_id"], record["status"], now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def load_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._FIELDS)} FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def load_payload(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT request_data FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._loads(row["request_data"]) if row else None
+
+    def clear_payload(self, task_id: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE tasks SET request_data = NULL WHERE task_id = ?", (task_id,))
+
+    def load_unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self._FIELDS)}, request_data FROM tasks "
+                "WHERE status IN ('pending', 'processing') ORDER BY created_at"
+            ).fetchall()
+
+        records = []
+        for row in rows:
+            record = self._row_to_record(row)
+            record["request_data"] = self._loads(row["request_data"])
+            records.append(record)
+        return records
+
+    def purge_finished(self, completed_before: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(self._FIELDS)} FROM tasks "
+                    "WHERE completed_at IS NOT NULL AND completed_at < ? "
+                    "AND status IN ('completed', 'failed', 'cancelled')",
+                    (completed_before,)
+                ).fetchall()
+                task_ids = [(row["task_id"],) for row in rows]
+                self._conn.executemany("DELETE FROM tasks WHERE task_id = ?", task_ids)
+                self._conn.executemany("DELETE FROM task_events WHERE task_id = ?", task_ids)
+                self._conn.executemany("DELETE FROM webhook_outbox WHERE task_id = ?", task_ids)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._row_to_record(row) for row in rows]
+
+    def count_pending_before(self, created_at: float, priority: int = 0) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS count FROM tasks WHERE status = 'pending' "
+                "AND (priority > ? OR (priority = ? AND created_at < ?))",
+                (priority, priority, created_at)
+            ).fetchone()
+        return row["count"]
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS count FROM tasks GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def count_unfinished_by_tenant(self) -> Dict[Optional[str], Dict[str, int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tenant_id, status, COUNT(*) AS count FROM tasks "
+                "WHERE status IN ('pending', 'processing') GROUP BY tenant_id, status"
+            ).fetchall()
+        counts: Dict[Optional[str], Dict[str, int]] = {}
+        for row in rows:
+            counts.setdefault(row["tenant_id"], {})[row["status"]] = row["count"]
+        return counts
+
+    def claim_task(
+        self,
+        worker_id: str,
+        lease_seconds: float,
+        select: Optional[Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE 事务在读取前获取写锁，保证多个进程不会领取到同一个任务
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT task_id, priority, created_at, deadline, cost, tenant_id FROM tasks "
+                    "WHERE (status = 'pending' AND (available_at IS NULL OR available_at <= ?)) "
+                    "OR (status = 'processing' AND lease_expires_at IS NOT NULL AND lease_expires_at < ?) "
+                    "ORDER BY created_at LIMIT ?",
+                    (now, now, self.CLAIM_CANDIDATES)
+                ).fetchall()
+                if not rows:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                candidates = [dict(row) for row in rows]
+                if select:
+                    # 租户并发上限按所有工作进程中持有有效租约的任务统计
+                    running = {
+                        row["tenant_id"]: row["count"] for row in self._conn.execute(
+                            "SELECT tenant_id, COUNT(*) AS count FROM tasks WHERE status = 'processing' "
+                            "AND (lease_expires_at IS NULL OR lease_expires_at >= ?) GROUP BY tenant_id",
+                            (now,)
+                        )
+                    }
+                    chosen = select(candidates, running)
+                else:
+                    chosen = candidates[0]
+                if chosen is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                task_id = chosen["task_id"]
+                # 接管租约已过期的处理中任务时计入重试次数，避免反复导致工作进程退出的任务被无限次领取
+                self._conn.execute(
+                    "UPDATE tasks SET retry_count = retry_count + CASE WHEN status = 'processing' THEN 1 ELSE 0 END, "
+                    "status = 'processing', started_at = ?, lease_owner = ?, "
+                    "lease_expires_at = ?, updated_at = ? WHERE task_id = ?",
+                    (now, worker_id, now + lease_seconds, now, task_id)
+                )
+                self._conn.execute(
+                    "INSERT INTO task_events (task_id, status, timestamp) VALUES (?, 'processing', ?)",
+                    (task_id, now)
+                )
+                row = self._conn.execute(
+                    f"SELECT {', '.join(self._FIELDS)}, request_data FROM tasks WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        record = self._row_to_record(row)
+        record["request_data"] = self._loads(row["request_data"])
+        return record
+
+    def renew_lease(self, task_id: str, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_expires_at = ? "
+                "WHERE task_id = ? AND lease_owner = ? AND status = 'processing'",
+                (now + lease_seconds, task_id, worker_id)
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return {"cancel_requested": bool(row["cancel_requested"])}
+
+    def request_cancel(self, task_id: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT status FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+                status = row["status"] if row else None
+                if status == "pending":
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'cancelled', completed_at = ?, request_data = NULL, "
+                        "updated_at = ? WHERE task_id = ?",
+                        (now, now, task_id)
+                    )
+                    self._conn.execute(
+                        "INSERT INTO task_events (task_id, status, timestamp) VALUES (?, 'cancelled', ?)",
+                        (task_id, now)
+                    )
+                    status = "cancelled"
+                elif status == "processing":
+                    # 由持有租约的工作进程在下次续约时取消
+                    self._conn.execute(
+                        "UPDATE tasks SET cancel_requested = 1, updated_at = ? WHERE task_id = ?", (now, task_id)
+                    )
+                else:
+                    status = None
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def append_event(self, task_id: str, status: str, stage: Optional[str] = None,
+                     data: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO task_events (task_id, status, timestamp, stage, data) VALUES (?, ?, ?, ?, ?)",
+                (task_id, status, time.time(), stage, self._dumps(data))
+            )
+
+    def load_events_since(self, last_event_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, task_id, status, timestamp, stage, data FROM task_events "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (last_event_id, limit)
+            ).fetchall()
+        return [
+            {
+                "id": row["id"], "task_id": row["task_id"], "status": row["status"],
+                "timestamp": row["timestamp"], "stage": row["stage"], "data": self._loads(row["data"])
+            }
+            for row in rows
+        ]
+
+    def last_event_id(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) AS id FROM task_events").fetchone()
+        return row["id"] or 0
+
+    def add_webhook(self, task_id: str, url: str, data: Optional[Dict[str, Any]],
+                    tenant_id: Optional[str], batch: bool) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO webhook_outbox (task_id, url, data, tenant_id, batch, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'waiting', ?, ?)",
+                (task_id, url, self._dumps(data), tenant_id, int(batch), now, now)
+            )
+        return cursor.lastrowid
+
+    def activate_webhooks(self, task_id: str, event: Dict[str, Any], batch_delay: float = 0.0) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE webhook_outbox SET status = 'pending', event = ?, "
+                "next_attempt_at = CASE WHEN batch = 1 THEN ? ELSE ? END, updated_at = ? "
+                "WHERE task_id = ? AND status = 'waiting'",
+                (self._dumps(event), now + batch_delay, now, now, task_id)
+            )
+        return cursor.rowcount
+
+    def claim_webhooks(self, owner: str, lease_seconds: float, limit: int = 100,
+                       batch_size: int = 50) -> List[Dict[str, Any]]:
+        now = time.time()
+        fields = ", ".join(self._WEBHOOK_FIELDS)
+        available = "status = 'pending' AND (lease_expires_at IS NULL OR lease_expires_at < ?)"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT {fields} FROM webhook_outbox WHERE {available} AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                claimed_ids = [row["id"] for row in rows]
+                # 批量投递的地址：同一地址尚未到期的首次投递回调一并发送
+                for url in {row["url"] for row in rows if row["batch"]}:
+                    room = batch_size - sum(1 for row in rows if row["url"] == url)
+                    if room <= 0:
+                        continue
+                    extra = self._conn.execute(
+                        f"SELECT {fields} FROM webhook_outbox WHERE {available} AND url = ? AND batch = 1 "
+                        f"AND attempts = 0 AND id NOT IN ({', '.join('?' * len(claimed_ids))}) "
+                        "ORDER BY next_attempt_at LIMIT ?",
+                        (now, url, *claimed_ids, room)
+                    ).fetchall()
+                    rows.extend(extra)
+                    claimed_ids.extend(row["id"] for row in extra)
+                self._conn.executemany(
+                    "UPDATE webhook_outbox SET lease_owner = ?, lease_expires_at = ? WHERE id = ?",
+                    [(owner, now + lease_seconds, webhook_id) for webhook_id in claimed_ids]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._row_to_webhook(row) for row in rows]
+
+    def update_webhooks(self, webhook_ids: List[int], status: str, next_attempt_at: Optional[float] = None,
+                        error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE webhook_outbox SET status = ?, attempts = attempts + 1, "
+                "next_attempt_at = COALESCE(?, next_attempt_at), last_error = ?, "
+                "lease_owner = NULL, lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                [(status, next_attempt_at, error, now, webhook_id) for webhook_id in webhook_ids]
+            )
+
+    def count_webhooks_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM webhook_outbox GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _insert_task(self, record: Dict[str, Any]):
+        """在当前事务中新增任务（调用方持有锁）"""
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, status, created_at, started_at, completed_at, "
+            "retry_count, max_retries, error_message, result, result_ref, request_data, updated_at, "
+            "available_at, profile_key, dedup_key, idempotency_key, priority, deadline, cost, tenant_id, attached) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                record["task_id"], record["status"], record["created_at"],
+                record.get("started_at"), record.get("completed_at"),
+                record.get("retry_count", 0), record.get("max_retries", 2),
+                record.get("error_message"), self._dumps(record.get("result")),
+                record.get("result_ref"), self._dumps(record.get("request_data")), now,
+                record.get("available_at"), record.get("profile_key"),
+                record.get("dedup_key"), record.get("idempotency_key"), record.get("priority", 0),
+                record.get("deadline"), record.get("cost"), record.get("tenant_id"), record.get("attached", 0)
+            )
+        )
+        self._conn.execute(
+            "INSERT INTO task_events (task_id, status, timestamp) VALUES (?, ?, ?)",
+            (record["task_id"], record["status"], now)
+        )
+
+    def _find_reusable(self, dedup_key: Optional[str], idempotency_key: Optional[str],
+                       completed_since: float) -> Optional[Dict[str, Any]]:
+        """查找可复用的任务（调用方持有锁）"""
+        row = None
+        if idempotency_key:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._FIELDS)} FROM tasks "
+                "WHERE idempotency_key = ? AND status NOT IN ('failed', 'cancelled') "
+                "ORDER BY created_at DESC LIMIT 1",
+                (idempotency_key,)
+            ).fetchone()
+        if row is None and dedup_key:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._FIELDS)} FROM tasks "
+                "WHERE dedup_key = ? AND (status IN ('pending', 'processing') "
+                "OR (status = 'completed' AND completed_at >= ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (dedup_key, completed_since)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def _migrate(self):
+        """为旧版本数据库补充新增字段"""
+        for table, column, definition in self._MIGRATIONS:
+            columns = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _row_to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = {key: row[key] for key in self._FIELDS}
+        record["result"] = self._loads(record["result"])
+        record["cancel_requested"] = bool(record["cancel_requested"])
+        return record
+
+    def _row_to_webhook(self, row: sqlite3.Row) -> Dict[str, Any]:
+        webhook = {key: row[key] for key in self._WEBHOOK_FIELDS}
+        webhook["data"] = self._loads(webhook["data"])
+        webhook["event"] = self._loads(webhook["event"])
+        webhook["batch"] = bool(webhook["batch"])
+        return webhook
+
+    @staticmethod
+    def _dumps(value: Any) -> Optional[str]:
+        return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+    @staticmethod
+    def _loads(value: Optional[str]) -> Any:
+        return json.loads(value) if value else None
+
+
+def create_task_store(backend: str, path: str) -> TaskStore:
+    """
+    根据配置创建任务存储
+
+    Args:
+        backend: 存储后端 (sqlite/memory)
+        path: SQLite 数据库文件路径
+    """
+    if backend == "sqlite":
+        return SQLiteTaskStore(path)
+    if backend == "memory":
+        return MemoryTaskStore()
+    raise ValueError(f"不支持的任务存储后端: {backend}")
@@ -0,0 +1,176 @@
+"""
+按租户（机构）的加权公平调度
+
+任务按提交时的 tenant_id 归属租户（未指定时归入 DEFAULT_TENANT）。每次出队时：
+1. 排除已达到并发上限（max_concurrent）的租户的任务
+2. 在剩余租户中按加权公平队列（start-time fair queuing，赤字轮询的按耗时加权版本）选择租户：
+   每个租户记录已获得服务的虚拟完成时间，出队一个任务增加 预测耗时 / 权重，
+   虚拟完成时间最小的租户先出队；长时间空闲的租户从当前虚拟时间开始计算，不会积累额度
+3. 租户内按调度策略（fifo/priority/edf/sjf）选择任务
+
+某个机构批量上传上百份报告时，其他机构的任务按权重比例交替出队，不再排在整批任务之后。
+排队配额（max_queued）在提交时检查，超出时返回 429。
+
+多进程部署时并发上限按共享存储中处理中的任务统计，虚拟完成时间由各工作进程分别维护。
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Iterable, Deque, Tuple
+
+from loguru import logger
+
+
+# 未指定 tenant_id 的任务
+DEFAULT_TENANT = "default"
+
+# 每个租户保留的最近完成任务数（用于延迟统计）
+LATENCY_SAMPLES = 200
+
+
+@dataclass
+class TenantLimits:
+    """租户的调度参数"""
+    weight: float = 1.0  # 公平调度权重
+    max_concurrent: int = 0  # 同时处理的任务数上限，0 表示不限制
+    max_queued: int = 0  # 排队和处理中的任务数上限，0 表示不限制
+
+
+def parse_overrides(spec: str, defaults: TenantLimits) -> Dict[str, TenantLimits]:
+    """
+    解析租户参数配置
+
+    格式: "租户:权重[:并发上限[:排队上限]]"，多个租户用逗号分隔，例如 "org_a:3:4:200,org_b:0.5"
+    """
+    overrides: Dict[str, TenantLimits] = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        parts = item.split(":")
+        try:
+            overrides[parts[0]] = TenantLimits(
+                weight=float(parts[1]) if len(parts) > 1 and parts[1] else defaults.weight,
+                max_concurrent=int(parts[2]) if len(parts) > 2 and parts[2] else defaults.max_concurrent,
+                max_queued=int(parts[3]) if len(parts) > 3 and parts[3] else defaults.max_queued
+            )
+        except ValueError:
+            logger.warning(f"租户参数配置格式错误，已忽略: {item}")
+    return overrides
+
+
+def tenant_of(tenant_id: Optional[str]) -> str:
+    return tenant_id or DEFAULT_TENANT
+
+
+class TenantFairShare:
+    """租户公平调度状态（进程内）"""
+
+    def __init__(self, defaults: Optional[TenantLimits] = None, overrides: Optional[Dict[str, TenantLimits]] = None):
+        self.defaults = defaults or TenantLimits()
+        self.overrides = overrides or {}
+        # 本进程出队后尚未结束的任务数
+        self.running: Dict[str, int] = {}
+        self._finish_tags: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._dispatched: Dict[str, int] = {}
+        self._finished: Dict[str, Dict[str, int]] = {}
+        self._rejected: Dict[str, int] = {}
+        # 最近完成任务的 (等待时间, 提交到结束的总耗时)
+        self._latencies: Dict[str, Deque[Tuple[float, float]]] = {}
+
+    def limits(self, tenant: str) -> TenantLimits:
+        return self.overrides.get(tenant, self.defaults)
+
+    def choose(self, tenants: Iterable[str], running: Optional[Dict[str, int]] = None) -> Optional[str]:
+        """
+        从有排队任务的租户中选出下一个出队的租户，全部达到并发上限时返回 None
+
+        Args:
+            tenants: 有候选任务的租户
+            running: 各租户处理中的任务数（默认按本进程统计）
+        """
+        running = self.running if running is None else running
+        eligible = [tenant for tenant in set(tenants) if self.has_capacity(tenant, running)]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda tenant: (max(self._finish_tags.get(tenant, 0.0), self._virtual_time), tenant))
+
+    def has_capacity(self, tenant: str, running: Optional[Dict[str, int]] = None) -> bool:
+        running = self.running if running is None else running
+        cap = self.limits(tenant).max_concurrent
+        return cap <= 0 or running.get(tenant, 0) < cap
+
+    def charge(self, tenant: str, cost: Optional[float]):
+        """记录一次出队：按预测耗时 / 权重推进该租户的虚拟完成时间"""
+        weight = self.limits(tenant).weight
+        start = max(self._finish_tags.get(tenant, 0.0), self._virtual_time)
+        self._finish_tags[tenant] = start + max(cost or 0.0, 1.0) / (weight if weight > 0 else 1.0)
+        self._virtual_time = start
+        self.running[tenant] = self.running.get(tenant, 0) + 1
+        self._dispatched[tenant] = self._dispatched.get(tenant, 0) + 1
+
+    def release(self, tenant: str):
+        """本进程出队的任务处理结束（包括重新入队等待重试）"""
+        count = self.running.get(tenant, 0) - 1
+        if count > 0:
+            self.running[tenant] = count
+        else:
+            self.running.pop(tenant, None)
+
+    def record_rejected(self, tenant: str):
+        """记录一次因排队配额已满被拒绝的提交"""
+        self._rejected[tenant] = self._rejected.get(tenant, 0) + 1
+
+    def record_finished(self, tenant: str, status: str, created_at: float,
+                        started_at: Optional[float], completed_at: Optional[float]):
+        """记录任务结束，用于按租户统计完成数和延迟"""
+        counts = self._finished.setdefault(tenant, {})
+        counts[status] = counts.get(status, 0) + 1
+        if started_at and completed_at:
+            samples = self._latencies.setdefault(tenant, deque(maxlen=LATENCY_SAMPLES))
+            samples.append((started_at - created_at, completed_at - created_at))
+
+    def get_stats(self, counts: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+        """
+        按租户汇总统计
+
+        Args:
+            counts: 各租户按状态的未结束任务数 {tenant: {"pending": n, "processing": n}}
+        """
+        tenants = set(counts) | set(self._dispatched) | set(self._finished) | set(self._rejected) | set(self.overrides)
+        stats = {}
+        for tenant in sorted(tenants):
+            limits = self.limits(tenant)
+            samples = self._latencies.get(tenant) or ()
+            totals = sorted(total for _, total in samples)
+            stats[tenant] = {
+                "weight": limits.weight,
+                "max_concurrent": limits.max_concurrent,
+                "max_queued": limits.max_queued,
+                "queued": counts.get(tenant, {}).get("pending", 0),
+                "processing": counts.get(tenant, {}).get("processing", 0),
+                "dispatched": self._dispatched.get(tenant, 0),
+                "finished": dict(self._finished.get(tenant, {})),
+                "rejected": self._rejected.get(tenant, 0),
+                "avg_wait_seconds": round(sum(wait for wait, _ in samples) / len(samples), 2) if samples else None,
+                "p50_latency_seconds": round(_percentile(totals, 0.5), 2) if totals else None,
+                "p95_latency_seconds": round(_percentile(totals, 0.95), 2) if totals else None,
+            }
+        return stats
+
+
+def _percentile(values, q: float) -> float:
+    return values[min(len(values) - 1, max(0, math.ceil(len(values) * q) - 1))]
+
+
+def create_tenant_fair_share(
+    enabled: bool,
+    default_weight: float = 1.0,
+    max_concurrent: int = 0,
+    max_queued: int = 0,
+    overrides: str = ""
+) -> Optional[TenantFairShare]:
+    """按配置创建租户公平调度状态，关闭时返回 None"""
+    if not enabled:
+        return None
+    defaults = TenantLimits(weight=default_weight, max_concurrent=max_concurrent, max_queued=max_queued)
+    return TenantFairShare(defaults, parse_overrides(overrides, defaults))
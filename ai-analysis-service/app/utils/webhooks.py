@@ -0,0 +1,334 @@
+"""
+任务完成回调（webhook）
+
+提交任务时可以指定 callback_url，任务结束（完成/失败/取消）后服务主动 POST 通知，客户端无需轮询 /task/{task_id}：
+- 回调登记和待发送的回调保存在任务存储的发件箱中（见 TaskStore.add_webhook），进程重启后继续投递
+- 回调内容使用 HMAC-SHA256 签名（WEBHOOK_SECRET），接收方按请求头校验：
+  X-Webhook-Signature: sha256=HMAC(secret, "{X-Webhook-Timestamp}.{请求体}")
+- 默认只发送结果的引用（taskId / resultUrl），WEBHOOK_INCLUDE_RESULT=true 时附带分析结果
+  （超过 WEBHOOK_MAX_INLINE_BYTES 时仍只发送引用），HTML 和 PDF 通过 /task/{task_id} 获取
+- 网络错误、HTTP 408/429/5xx 按指数退避重试，达到 WEBHOOK_MAX_ATTEMPTS 次或其他 4xx 时放弃
+- WEBHOOK_BATCH_TENANTS 中的租户（高频提交的机构）在 WEBHOOK_BATCH_WINDOW 秒内结束的任务
+  合并为一次请求发送到同一地址：{"event": "task.batch", "count": n, "events": [...]}
+
+回调内容的字段与云函数 handleAnalysisCallback 一致（taskId / success / analysisResult / errorMessage /
+processingTime），提交时的 callback_data（例如 reportId）原样合并到回调内容中（与服务字段同名时以服务字段为准）。
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+import time
+from typing import Dict, Any, Optional, List, Set
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+from utils.errors import backoff_delay
+from utils.task_store import TaskStore
+
+
+EVENT_BATCH = "task.batch"
+
+# 4xx 中可以重试的状态码，其他 4xx 视为永久失败
+RETRYABLE_STATUS = (408, 425, 429)
+
+
+class WebhookDispatcher:
+    """从发件箱领取到期的回调并发送"""
+
+    def __init__(
+        self,
+        secret: str = "",
+        timeout: float = 10.0,
+        max_attempts: int = 8,
+        backoff_base: float = 5.0,
+        backoff_max: float = 600.0,
+        batch_tenants: str = "",
+        batch_size: int = 50,
+        batch_window: float = 5.0,
+        include_result: bool = False,
+        max_inline_bytes: int = 256 * 1024,
+        public_base_url: str = "",
+        allowed_hosts: str = "",
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0
+    ):
+        """
+        Args:
+            secret: 签名密钥，为空时不签名
+            timeout: 单次投递的超时时间（秒）
+            max_attempts: 最大投递次数
+            backoff_base: 首次重试等待时间（秒），之后指数增长
+            backoff_max: 最大重试等待时间（秒）
+            batch_tenants: 合并投递的租户，逗号分隔，"*" 表示所有租户
+            batch_size: 每次合并投递的回调数上限
+            batch_window: 合并投递的等待时间（秒）
+            include_result: 回调内容是否附带分析结果
+            max_inline_bytes: 附带分析结果的大小上限（字节）
+            public_base_url: 服务的外部访问地址，用于生成 resultUrl
+            allowed_hosts: 允许回调的域名，逗号分隔，为空时只允许解析到公网地址的域名
+            poll_interval: 没有到期回调时的轮询间隔（秒）
+            lease_seconds: 领取回调的租约时长（秒），投递进程退出后由其他进程重新发送
+        """
+        self.secret = secret.encode("utf-8") if secret else b""
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_tenants: Set[str] = {item.strip() for item in batch_tenants.split(",") if item.strip()}
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.include_result = include_result
+        self.max_inline_bytes = max_inline_bytes
+        self.public_base_url = public_base_url.rstrip("/")
+        self.allowed_hosts: Set[str] = {item.strip().lower() for item in allowed_hosts.split(",") if item.strip()}
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.store: Optional[TaskStore] = None
+        self.owner = ""
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._outbox_counts: Dict[str, int] = {}
+        self._counts_refreshed_at = 0.0
+        self._stats = {
+            "registered": 0,
+            "delivered": 0,
+            "batches": 0,
+            "retried": 0,
+            "dead": 0,
+        }
+
+    async def start(self, store: TaskStore, owner: str):
+        """启动投递协程（每个进程一个，多进程通过租约分配回调）"""
+        if self._loop_task:
+            return
+        self.store = store
+        self.owner = owner
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._loop_task = asyncio.create_task(self._deliver_loop())
+        if not self.secret:
+            logger.warning("⚠️ 未配置 WEBHOOK_SECRET，任务回调将不签名发送")
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def validate_url(self, url: str):
+        """校验回调地址，不允许时抛出 ValueError"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"回调地址必须是 http/https 地址: {url}")
+        host = parsed.hostname.lower()
+        if self.allowed_hosts:
+            if host not in self.allowed_hosts:
+                raise ValueError(f"回调地址的域名不在允许列表中: {parsed.hostname}")
+            return
+        try:
+            self._check_public_host(host, parsed.port or (443 if parsed.scheme == "https" else 80))
+        except (socket.gaierror, UnicodeError):
+            raise ValueError(f"回调地址的域名无法解析: {parsed.hostname}")
+
+    def _check_public_host(self, host: str, port: int):
+        """未配置允许列表时，拒绝解析到内网、回环、链路本地（含 169.254.169.254）等非公网地址的回调
+
+        Raises:
+            ValueError: 地址不是公网地址
+            socket.gaierror: 域名解析失败
+        """
+        if host == "localhost" or host.endswith(".localhost"):
+            raise ValueError(f"回调地址不能指向本机: {host}")
+        for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+            address = ipaddress.ip_address(info[4][0].split("%")[0])
+            if not address.is_global or address.is_multicast:
+                raise ValueError(f"回调地址指向非公网地址 {address}，如需回调内网服务请配置 WEBHOOK_ALLOWED_HOSTS: {host}")
+
+    def is_batched(self, tenant_id: Optional[str]) -> bool:
+        return "*" in self.batch_tenants or (tenant_id or "") in self.batch_tenants
+
+    async def register(self, task_id: str, url: str, data: Optional[Dict[str, Any]], tenant_id: Optional[str]):
+        """登记任务结束时的回调"""
+        await asyncio.to_thread(self.store.add_webhook, task_id, url, data, tenant_id, self.is_batched(tenant_id))
+        self._stats["registered"] += 1
+
+    async def task_finished(
+        self,
+        task_id: str,
+        status: str,
+        error_message: Optional[str] = None,
+        processing_time: Optional[float] = None,
+        completed_at: Optional[float] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """任务结束：生成回调内容，已登记的回调转为待发送，返回待发送的回调数"""
+        event = self.build_event(task_id, status, error_message, processing_time, completed_at, result)
+        activated = await asyncio.to_thread(self.store.activate_webhooks, task_id, event, self.batch_window)
+        if activated:
+            self._wake.set()
+        return activated
+
+    def build_event(
+        self,
+        task_id: str,
+        status: str,
+        error_message: Optional[str] = None,
+        processing_time: Optional[float] = None,
+        completed_at: Optional[float] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """回调内容（字段与云函数 handleAnalysisCallback 一致）"""
+        event = {
+            "event": f"task.{status}",
+            "taskId": task_id,
+            "status": status,
+            "success": status == "completed",
+            "errorMessage": error_message,
+            "processingTime": processing_time,
+            "completedAt": completed_at,
+            "resultUrl": f"{self.public_base_url}/task/{task_id}" if self.public_base_url else None,
+        }
+        analysis = (result or {}).get("visualization_report")
+        if self.include_result and analysis is not None:
+            size = len(json.dumps(analysis, ensure_ascii=False, default=str).encode("utf-8"))
+            if size <= self.max_inline_bytes:
+                event["analysisResult"] = analysis
+            else:
+                logger.info(f"分析结果过大 ({size // 1024}KB)，回调只发送引用: {task_id}")
+        return event
+
+    def sign(self, timestamp: str, body: bytes) -> Optional[str]:
+        """签名：sha256=HMAC(secret, "{timestamp}.{body}")"""
+        if not self.secret:
+            return None
+        digest = hmac.new(self.secret, timestamp.encode("utf-8") + b"." + body, hashlib.sha256).hexdigest()
+        return f"sha256={digest}"
+
+    async def _deliver_loop(self):
+        while True:
+            try:
+                rows = await asyncio.to_thread(
+                    self.store.claim_webhooks, self.owner, self.lease_seconds, self.batch_size * 4, self.batch_size
+                )
+                if not rows:
+                    await self._refresh_counts()
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await asyncio.gather(*(self._deliver(group) for group in self._group(rows)))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"任务回调投递异常: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def _group(self, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """单独投递的回调各自一组，合并投递的回调按地址分组"""
+        groups: List[List[Dict[str, Any]]] = []
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            if not row["batch"]:
+                groups.append([row])
+                continue
+            batch = batches.setdefault(row["url"], [])
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                groups.append(batches.pop(row["url"]))
+        groups.extend(batches.values())
+        return groups
+
+    async def _deliver(self, rows: List[Dict[str, Any]]):
+        """投递一组回调（同一地址），按结果更新发件箱"""
+        # 服务字段覆盖客户端的 callback_data，避免提交方伪造已签名回调中的任务状态和结果
+        events = [{**(row["data"] or {}), **(row["event"] or {})} for row in rows]
+        if rows[0]["batch"]:
+            payload = {"event": EVENT_BATCH, "count": len(events), "events": events}
+        else:
+            payload = events[0]
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        timestamp = str(int(time.time()))
+        attempt = max(row["attempts"] for row in rows) + 1
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Id": ",".join(str(row["id"]) for row in rows),
+            "X-Webhook-Timestamp": timestamp,
+            "X-Webhook-Attempt": str(attempt),
+        }
+        signature = self.sign(timestamp, body)
+        if signature:
+            headers["X-Webhook-Signature"] = signature
+
+        url = rows[0]["url"]
+        ids = [row["id"] for row in rows]
+        retry_after = 0.0
+        try:
+            if not self.allowed_hosts:
+                # 投递前重新解析，避免提交后域名改为解析到内网地址
+                parsed = urlparse(url)
+                await asyncio.to_thread(
+                    self._check_public_host, parsed.hostname.lower(),
+                    parsed.port or (443 if parsed.scheme == "https" else 80)
+                )
+            response = await self._client.post(url, content=body, headers=headers)
+            if 200 <= response.status_code < 300:
+                await asyncio.to_thread(self.store.update_webhooks, ids, "delivered")
+                self._stats["delivered"] += len(rows)
+                if len(rows) > 1:
+                    self._stats["batches"] += 1
+                logger.info(f"📮 任务回调已送达: {url}, 回调数: {len(rows)}, 第 {attempt} 次投递")
+                return
+            error = f"HTTP {response.status_code}"
+            permanent = 400 <= response.status_code < 500 and response.status_code not in RETRYABLE_STATUS
+            header = response.headers.get("Retry-After", "")
+            retry_after = float(header) if header.isdigit() else 0.0
+        except (httpx.HTTPError, socket.gaierror) as e:
+            error = f"{e.__class__.__name__}: {e}"
+            permanent = False
+        except ValueError as e:
+            error = str(e)
+            permanent = True
+
+        if permanent or attempt >= self.max_attempts:
+            await asyncio.to_thread(self.store.update_webhooks, ids, "dead", None, error)
+            self._stats["dead"] += len(rows)
+            logger.error(f"任务回调投递失败，已放弃: {url}, 回调数: {len(rows)}, 投递次数: {attempt}, 错误: {error}")
+            return
+        delay = max(backoff_delay(attempt, self.backoff_base, self.backoff_max), retry_after)
+        await asyncio.to_thread(self.store.update_webhooks, ids, "pending", time.time() + delay, error)
+        self._stats["retried"] += len(rows)
+        logger.warning(f"任务回调投递失败，{delay:.1f}s 后重试 {attempt}/{self.max_attempts}: {url}, 错误: {error}")
+
+    async def _refresh_counts(self, interval: float = 10.0):
+        """空闲时刷新发件箱统计（供 /queue/stats 使用）"""
+        if time.time() - self._counts_refreshed_at < interval:
+            return
+        self._counts_refreshed_at = time.time()
+        self._outbox_counts = await asyncio.to_thread(self.store.count_webhooks_by_status)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "outbox": dict(self._outbox_counts),
+            "signed": bool(self.secret),
+            "include_result": self.include_result,
+            "batch_tenants": sorted(self.batch_tenants),
+        }
+
+
+def create_webhook_dispatcher(enabled: bool, **kwargs) -> Optional[WebhookDispatcher]:
+    """按配置创建回调投递器，关闭时返回 None"""
+    if not enabled:
+        return None
+    return WebhookDispatcher(**kwargs)
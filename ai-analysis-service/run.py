@@ -3,14 +3,33 @@
 AI文档分析服务启动脚本
 """
 
+import sys
+
 import uvicorn
 from app.config.settings import settings
 
 if __name__ == "__main__":
+    if not settings.app.debug and settings.app.workers > 1 and settings.queue.role != "api":
+        # 每个 uvicorn 进程都会启动自己的工作协程，同一任务会被多个进程重复处理
+        sys.exit(
+            f"APP_WORKERS={settings.app.workers} 时需要设置 QUEUE_ROLE=api 并部署独立工作进程（run_worker.py），"
+            f"当前 QUEUE_ROLE={settings.queue.role}"
+        )
+    if not settings.app.debug and settings.app.workers > 1 and settings.batch.enabled:
+        # 批次状态只保存在接收批次的进程内存中，查询/结果/取消请求落到其他进程时找不到批次
+        sys.exit(f"APP_WORKERS={settings.app.workers} 时需要设置 BATCH_ENABLED=false（批次状态不在进程之间共享）")
+    if settings.queue.role != "all" and settings.queue.store_backend != "sqlite":
+        # 内存存储不能在进程之间共享，api 进程提交的任务不会被工作进程领取
+        sys.exit(
+            f"QUEUE_ROLE={settings.queue.role} 需要 QUEUE_STORE_BACKEND=sqlite，"
+            f"当前 QUEUE_STORE_BACKEND={settings.queue.store_backend}"
+        )
     uvicorn.run(
         "app.main:app",
         host=settings.app.host,
         port=settings.app.port,
         reload=settings.app.debug,
+        # 多进程部署时任务由独立工作进程处理（QUEUE_ROLE=api + run_worker.py）
+        workers=None if settings.app.debug else settings.app.workers,
         log_level=settings.log.level.lower()
     )
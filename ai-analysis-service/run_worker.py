@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+队列工作进程启动脚本
+
+与 API 进程（QUEUE_ROLE=api）共享 SQLite 任务存储，通过租约领取并处理任务。
+可以同时启动多个工作进程，充分利用多核进行 PDF 解析和 Chromium/Node 渲染：
+
+    python run_worker.py
+"""
+
+import os
+import sys
+import signal
+import asyncio
+from pathlib import Path
+
+# 工作进程角色需在加载配置之前设置
+os.environ["QUEUE_ROLE"] = "worker"
+sys.path.append(str(Path(__file__).resolve().parent / "app"))
+
+from loguru import logger
+from config.settings import settings
+from utils.stage_executor import stage_executor
+from utils.queue_manager import request_queue
+from utils.process_pool import pdf_process_pool
+from utils.pdf_spool import pdf_spool
+from utils.loop_monitor import loop_monitor
+
+
+async def main():
+    logger.remove()
+    logger.add(sys.stdout, level=settings.log.level)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    logger.info(f"启动队列工作进程: {request_queue.worker_id}")
+    if loop_monitor:
+        await loop_monitor.start()
+    await asyncio.to_thread(pdf_spool.sweep)
+    await stage_executor.start()
+    await request_queue.start()
+
+    await stop_event.wait()
+
+    # 处理中的任务保留为等待状态，由其他工作进程或重启后继续处理
+    logger.info("关闭队列工作进程...")
+    await request_queue.stop()
+    await stage_executor.stop()
+    pdf_process_pool.shutdown()
+    if loop_monitor:
+        await loop_monitor.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 本地解析引擎基准测试
+对比各引擎（service/pdf_engines.py）在样例报告上的速度（页/秒）和输出保真度，
+用于确定每种报告类型使用的引擎（PDF_EXTRACT_ENGINE_OVERRIDES）。
+
+保真度以 pdfplumber 的输出为基准，按字符统计（忽略空白、Markdown 表格分隔符和分页标记，不受分词和换行方式影响）：
+- 召回率: pdfplumber 输出的字符中被该引擎输出的比例（低说明漏字）
+- 精确率: 该引擎输出的字符中与 pdfplumber 相同的比例（低说明多出重复或乱码）
+- 表格行: 输出中 Markdown 表格的行数（只有 pdfplumber 识别表格，其他引擎的表格按行输出为文字）
+
+PDF 来源：
+- 默认: 生成合成 PDF（与 test/bench_pdf_extraction.py 相同）
+- --pdf: 一个或多个 PDF 文件；--base64: 一个或多个 Base64 文本文件（与 test/pdf_to_base64.py 的输出格式相同）
+
+用法:
+    python test/bench_extractors.py --pages 30
+    python test/bench_extractors.py --base64 简版征信.txt 详版征信.txt 银行流水.txt --engines pdfplumber pypdfium2
+"""
+
+import os
+import re
+import sys
+import time
+import base64
+import argparse
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+# 添加 app 目录和测试目录到 sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from service.pdf_engines import get_engine, available_engines, ENGINE_MODULES, ENGINE_PDFPLUMBER
+from service.pdf_extractor import merge_pages, PAGE_BREAK
+from bench_pdf_extraction import build_synthetic_pdf
+
+
+# Markdown 表格行（| a | b |）和分隔行（| --- |）
+_TABLE_ROW = re.compile(r"^\|.*\|$", re.MULTILINE)
+_IGNORED = re.compile(r"\s|\||-{3,}")
+
+
+def extract(engine, pdf_path: str) -> str:
+    """在当前进程中顺序解析全部页面（不经过进程池，只比较引擎本身的速度）"""
+    page_count = engine.count_pages(pdf_path)
+    return merge_pages(engine.extract_chunk(pdf_path, 0, page_count)["pages"])
+
+
+def char_counts(markdown: str) -> Counter:
+    return Counter(_IGNORED.sub("", markdown.replace(PAGE_BREAK, "")))
+
+
+def fidelity(reference: str, output: str):
+    """返回 (召回率, 精确率)"""
+    expected = char_counts(reference)
+    actual = char_counts(output)
+    matched = sum((expected & actual).values())
+    recall = matched / sum(expected.values()) if expected else 1.0
+    precision = matched / sum(actual.values()) if actual else 1.0
+    return recall, precision
+
+
+def bench(engine, pdf_path: str, rounds: int):
+    """返回 (输出, 最快一次耗时)"""
+    best = float("inf")
+    output = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        output = extract(engine, pdf_path)
+        best = min(best, time.perf_counter() - start)
+    return output, best
+
+
+def load_sources(args, temp_dir: str):
+    """返回 [(名称, PDF 路径)]"""
+    sources = [(Path(path).name, path) for path in args.pdf or []]
+    for path in args.base64 or []:
+        pdf_path = os.path.join(temp_dir, Path(path).stem + ".pdf")
+        with open(path, "r", encoding="utf-8") as f:
+            with open(pdf_path, "wb") as out:
+                out.write(base64.b64decode(f.read().strip()))
+        sources.append((Path(path).name, pdf_path))
+    if not sources:
+        pdf_path = os.path.join(temp_dir, "synthetic.pdf")
+        build_synthetic_pdf(pdf_path, args.pages)
+        sources.append((f"合成({args.pages}页)", pdf_path))
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 本地解析引擎基准测试")
+    parser.add_argument("--pdf", nargs="+", help="PDF 文件路径")
+    parser.add_argument("--base64", nargs="+", help="Base64 文本文件路径")
+    parser.add_argument("--pages", type=int, default=30, help="合成 PDF 页数")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINE_MODULES), help="参与对比的引擎，默认所有可用引擎")
+    parser.add_argument("--rounds", type=int, default=3, help="每个引擎重复次数（取最快一次）")
+    parser.add_argument("--save-dir", help="保存各引擎的输出（{样例}.{引擎}.md），便于人工比对")
+    args = parser.parse_args()
+
+    engines = args.engines or available_engines()
+    if ENGINE_PDFPLUMBER not in engines:
+        # pdfplumber 的输出作为保真度基准
+        engines = [ENGINE_PDFPLUMBER] + engines
+    unavailable = [name for name in ENGINE_MODULES if name not in available_engines()]
+    if unavailable:
+        print(f"⚠️ 未安装的引擎: {', '.join(unavailable)}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, pdf_path in load_sources(args, temp_dir):
+            pages = get_engine(ENGINE_PDFPLUMBER).count_pages(pdf_path)
+            print(f"\n📄 {name}，{pages} 页，{os.path.getsize(pdf_path) / 1024:.0f}KB")
+            print(f"{'引擎':<12} {'页/秒':>9} {'耗时(s)':>9} {'加速':>7} {'召回率':>8} {'精确率':>8} {'表格行':>7} {'字符数':>9}")
+
+            reference = None
+            baseline = None
+            for engine_name in engines:
+                try:
+                    engine = get_engine(engine_name)
+                except ImportError as e:
+                    print(f"{engine_name:<14} 不可用: {e}")
+                    continue
+                output, elapsed = bench(engine, pdf_path, args.rounds)
+                if engine_name == ENGINE_PDFPLUMBER:
+                    reference, baseline = output, elapsed
+                recall, precision = fidelity(reference, output)
+                print(f"{engine_name:<14} {pages / elapsed:>9.1f} {elapsed:>9.3f} {baseline / elapsed:>6.1f}x "
+                      f"{recall:>9.1%} {precision:>9.1%} {len(_TABLE_ROW.findall(output)):>8} {len(output):>10,}")
+
+                if args.save_dir:
+                    os.makedirs(args.save_dir, exist_ok=True)
+                    with open(os.path.join(args.save_dir, f"{Path(name).stem}.{engine_name}.md"), "w",
+                              encoding="utf-8") as f:
+                        f.write(output)
+
+
+if __name__ == "__main__":
+    main()
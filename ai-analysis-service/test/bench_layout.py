@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+版面重建基准测试与输出一致性检查
+对比 service/pdf_extractor.py 中的 layout_page（排序扫描 + 表格区间索引）与原实现
+（每行逐个扫描表格区域、逐词比较行首坐标、逐行重新排序单词）的耗时，并逐页检查两者输出完全一致。
+
+只计时版面重建：每页的单词和表格区域预先用 pdfplumber 提取一次，两种实现使用同一份输入。
+
+PDF 来源（二选一）：
+- 默认: 生成合成的高密度征信报告页面（每页多个表格，表格之间穿插段落）
+- --pdf: 指定 PDF 文件
+
+一致性检查：
+- 每页与原实现的输出逐项比较，不一致时列出页码并以非零状态退出
+- --golden: 与保存的 Markdown 输出（merge_pages 的结果）比较，文件不存在或不一致时以非零状态退出，
+  用于修改版面算法前后的回归检查；--update-golden 重新写入
+- --check: 只做一致性检查（不计时），使用固定参数的小型合成 PDF 与仓库中的 test/golden/layout_synthetic.md 比较，
+  可在 CI 中直接运行
+
+用法:
+    python test/bench_layout.py --check
+    python test/bench_layout.py --pages 20 --tables 6
+    python test/bench_layout.py --pdf 征信报告.pdf --golden 征信报告.golden.md --update-golden
+    python test/bench_layout.py --pdf 征信报告.pdf --golden 征信报告.golden.md
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加 app 目录到 sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+
+import pdfplumber
+
+from service.pdf_extractor import layout_page, table_to_markdown, merge_pages
+
+# --check 使用的合成 PDF 参数和保存的输出（修改参数后需用 --check --update-golden 重新生成）
+CHECK_GOLDEN = Path(__file__).resolve().parent / "golden" / "layout_synthetic.md"
+CHECK_PAGES = 3
+CHECK_TABLES = 2
+CHECK_ROWS = 4
+
+
+def build_dense_pdf(path: str, pages: int, tables: int = 6, rows: int = 8, columns: int = 5):
+    """生成合成 PDF：每页 tables 个带边框的表格，表格之间穿插两行段落文字"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    width = 495 // columns
+    for p in range(pages):
+        ops = ["BT /F1 12 Tf 50 815 Td (Personal Credit Report Page %d) Tj ET" % (p + 1)]
+        y = 795
+        for t in range(tables):
+            for line in range(2):
+                ops.append("BT /F1 8 Tf 50 %d Td (Section %d note %d: account status normal, overdue 0, "
+                           "guarantee none, query %d) Tj ET" % (y, t, line, p * 10 + t))
+                y -= 10
+            y -= 4
+            top = y
+            for r in range(rows + 1):
+                ops.append("50 %d m %d %d l S" % (top - r * 11, 50 + width * columns, top - r * 11))
+            for c in range(columns + 1):
+                ops.append("%d %d m %d %d l S" % (50 + c * width, top, 50 + c * width, top - rows * 11))
+            for r in range(rows):
+                for c in range(columns):
+                    ops.append("BT /F1 7 Tf %d %d Td (T%dR%dC%d %d) Tj ET"
+                               % (53 + c * width, top - r * 11 - 8, t, r, c, (r + 3) * (c + 11) + p))
+            y = top - rows * 11 - 12
+        stream = "\n".join(ops)
+        objects.append("<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join("%d 0 R" % i for i in page_ids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += ("%d 0 obj\n%s\nendobj\n" % (i, body)).encode("latin-1")
+    xref = len(out)
+    out += ("xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)).encode()
+    out += "".join("%010d 00000 n \n" % offset for offset in offsets).encode()
+    out += ("trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)).encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def reference_layout(words, table_regions):
+    """原实现（保持不变，作为输出一致性的基准）"""
+    content_items = []
+
+    if not words:
+        for region in sorted(table_regions, key=lambda x: x['y0']):
+            content_items.append({
+                'type': 'table',
+                'content': table_to_markdown(region['data'])
+            })
+        return content_items
+
+    lines = []
+    current_line = []
+    current_top = None
+    line_tolerance = 3
+    sorted_words = sorted(words, key=lambda w: (w['top'], w['x0']))
+
+    for word in sorted_words:
+        if current_top is None or abs(word['top'] - current_top) <= line_tolerance:
+            if current_top is None:
+                current_top = word['top']
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append({
+                    'y0': current_top,
+                    'y1': current_line[0]['bottom'],
+                    'words': current_line
+                })
+            current_top = word['top']
+            current_line = [word]
+
+    if current_line:
+        lines.append({
+            'y0': current_top,
+            'y1': current_line[0]['bottom'],
+            'words': current_line
+        })
+
+    def is_in_table(line_y0, line_y1):
+        for table_region in table_regions:
+            if line_y0 < table_region['y1'] and line_y1 > table_region['y0']:
+                return True
+        return False
+
+    all_items = []
+
+    for region in table_regions:
+        all_items.append({
+            'type': 'table',
+            'y0': region['y0'],
+            'content': table_to_markdown(region['data'])
+        })
+
+    text_lines = [line for line in lines if not is_in_table(line['y0'], line['y1'])]
+
+    if text_lines:
+        current_paragraph = []
+        current_y0 = text_lines[0]['y0'] if text_lines else 0
+        paragraph_gap = 15
+
+        for i, line in enumerate(text_lines):
+            line_text = ' '.join([w['text'] for w in sorted(line['words'], key=lambda w: w['x0'])])
+
+            is_new_paragraph = False
+            if i > 0:
+                prev_line = text_lines[i-1]
+                gap = line['y0'] - prev_line['y1']
+                if gap > paragraph_gap:
+                    is_new_paragraph = True
+
+            if is_new_paragraph:
+                if current_paragraph:
+                    all_items.append({
+                        'type': 'text',
+                        'y0': current_y0,
+                        'content': '\n'.join(current_paragraph)
+                    })
+                current_paragraph = [line_text]
+                current_y0 = line['y0']
+            else:
+                current_paragraph.append(line_text)
+
+        if current_paragraph:
+            all_items.append({
+                'type': 'text',
+                'y0': current_y0,
+                'content': '\n'.join(current_paragraph)
+            })
+
+    all_items.sort(key=lambda x: x['y0'])
+
+    return all_items
+
+
+def load_inputs(pdf_path: str):
+    """预先提取每页的单词和表格区域（与 extract_page_content_ordered 的输入相同）"""
+    inputs = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            table_regions = []
+            for table in page.find_tables():
+                data = table.extract()
+                if data:
+                    table_regions.append({'type': 'table', 'y0': table.bbox[1], 'y1': table.bbox[3],
+                                          'bbox': table.bbox, 'data': data})
+            inputs.append((page.extract_words(), table_regions))
+            page.close()
+    return inputs
+
+
+def bench(layout, inputs, rounds: int) -> float:
+    """返回处理全部页面的最快一次耗时（秒）"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for words, table_regions in inputs:
+            layout(words, table_regions)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def to_markdown(items_per_page) -> str:
+    return merge_pages([[item['content'] for item in items if item['content']] for items in items_per_page])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="版面重建基准测试与输出一致性检查")
+    parser.add_argument("--pdf", help="PDF 文件路径")
+    parser.add_argument("--pages", type=int, default=20, help="合成 PDF 页数")
+    parser.add_argument("--tables", type=int, default=6, help="合成 PDF 每页表格数")
+    parser.add_argument("--rows", type=int, default=8, help="合成 PDF 每个表格的行数")
+    parser.add_argument("--rounds", type=int, default=20, help="重复次数（取最快一次）")
+    parser.add_argument("--golden", help="保存的 Markdown 输出")
+    parser.add_argument("--update-golden", action="store_true", help="将当前输出写入 --golden 指定的文件")
+    parser.add_argument("--check", action="store_true", help="只检查输出一致性（固定的合成 PDF，与仓库中保存的输出比较）")
+    args = parser.parse_args()
+
+    if args.check:
+        if args.pdf:
+            parser.error("--check 使用固定的合成 PDF，不能与 --pdf 同时使用")
+        args.pages, args.tables, args.rows = CHECK_PAGES, CHECK_TABLES, CHECK_ROWS
+        args.golden = args.golden or str(CHECK_GOLDEN)
+    if args.update_golden and not args.golden:
+        parser.error("--update-golden 需要指定 --golden")
+
+    temp_path = None
+    if args.pdf:
+        pdf_path = args.pdf
+    else:
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        build_dense_pdf(temp_path, args.pages, tables=args.tables, rows=args.rows)
+        pdf_path = temp_path
+
+    try:
+        start = time.perf_counter()
+        inputs = load_inputs(pdf_path)
+        extract_seconds = time.perf_counter() - start
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+    words = sum(len(w) for w, _ in inputs)
+    tables = sum(len(t) for _, t in inputs)
+    print(f"📄 PDF: {args.pdf or '合成'}，{len(inputs)} 页，{words} 个单词，{tables} 个表格，"
+          f"pdfplumber 提取单词和表格耗时 {extract_seconds * 1000:.0f}ms（不计入下方耗时）")
+
+    # 输出一致性
+    reference = [reference_layout(w, t) for w, t in inputs]
+    current = [layout_page(w, t) for w, t in inputs]
+    mismatched = [i + 1 for i, (a, b) in enumerate(zip(reference, current)) if a != b]
+    if mismatched:
+        print(f"❌ 与原实现输出不一致的页码: {mismatched}")
+    else:
+        print("✅ 与原实现输出一致")
+
+    golden_ok = True
+    if args.golden:
+        markdown = to_markdown(current)
+        if args.update_golden:
+            os.makedirs(os.path.dirname(os.path.abspath(args.golden)), exist_ok=True)
+            with open(args.golden, "w", encoding="utf-8", newline="\n") as f:
+                f.write(markdown)
+            print(f"💾 已保存输出: {args.golden}")
+        elif not os.path.exists(args.golden):
+            golden_ok = False
+            print(f"❌ 保存的输出不存在: {args.golden}（使用 --update-golden 生成）")
+        else:
+            with open(args.golden, "r", encoding="utf-8", newline="") as f:
+                golden_ok = f.read() == markdown
+            print("✅ 与保存的输出一致" if golden_ok else f"❌ 与保存的输出不一致: {args.golden}")
+
+    if args.check:
+        sys.exit(1 if mismatched or not golden_ok else 0)
+
+    # 耗时
+    before = bench(reference_layout, inputs, args.rounds)
+    after = bench(layout_page, inputs, args.rounds)
+    print(f"{'实现':<12} {'耗时(ms)':>10} {'每页(ms)':>10}")
+    print(f"{'原实现':<12} {before * 1000:>10.2f} {before * 1000 / len(inputs):>10.3f}")
+    print(f"{'区间索引':<12} {after * 1000:>10.2f} {after * 1000 / len(inputs):>10.3f}   {before / after:.2f}x")
+
+    if mismatched or not golden_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
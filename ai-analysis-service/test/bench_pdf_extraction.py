@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 解析基准测试
+对比 pdfplumber 在事件循环中顺序解析（原实现）与进程池按页码范围并行解析的吞吐量（页/秒），
+同时记录解析期间事件循环的最大延迟（健康检查、状态查询等请求需要等待的时间）。
+
+PDF 来源（二选一）：
+- 默认: 生成合成 PDF（每页若干段落和一个表格，版面接近征信报告）
+- --pdf: 指定 PDF 文件；--base64: 指定 Base64 文本文件（与 test/pdf_to_base64.py 的输出格式相同）
+
+用法:
+    python test/bench_pdf_extraction.py --pages 30 --workers 1 2 4
+    python test/bench_pdf_extraction.py --pdf 征信报告.pdf --chunk 2 --rounds 5
+"""
+
+import os
+import sys
+import time
+import base64
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加 app 目录到 sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+
+from service.pdf_extractor import count_pages, extract_page_range, split_page_ranges, merge_pages
+from utils.process_pool import ProcessPool
+
+
+def build_synthetic_pdf(path: str, pages: int, rows: int = 12):
+    """生成合成 PDF：每页标题、两段文字和一个带边框的表格"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for p in range(pages):
+        ops = ["BT /F1 14 Tf 50 800 Td (Credit Report Page %d) Tj ET" % (p + 1)]
+        y = 770
+        for paragraph in range(2):
+            for line in range(4):
+                ops.append("BT /F1 10 Tf 50 %d Td (Paragraph %d line %d account summary loan balance %d) Tj ET"
+                           % (y, paragraph, line, p * 100 + line))
+                y -= 14
+            y -= 20
+        top = y
+        for r in range(rows + 1):
+            ops.append("50 %d m 545 %d l S" % (top - r * 20, top - r * 20))
+        for x in (50, 215, 380, 545):
+            ops.append("%d %d m %d %d l S" % (x, top, x, top - rows * 20))
+        for r in range(rows):
+            for c, x in enumerate((55, 220, 385)):
+                ops.append("BT /F1 9 Tf %d %d Td (R%dC%d %d.00) Tj ET" % (x, top - r * 20 - 14, r, c, (r + 1) * (c + 7)))
+        stream = "\n".join(ops)
+        objects.append("<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join("%d 0 R" % i for i in page_ids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += ("%d 0 obj\n%s\nendobj\n" % (i, body)).encode("latin-1")
+    xref = len(out)
+    out += ("xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)).encode()
+    out += "".join("%010d 00000 n \n" % offset for offset in offsets).encode()
+    out += ("trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)).encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+async def measure(run, interval: float = 0.01):
+    """执行 run()，返回 (结果, 耗时, 事件循环最大延迟)"""
+    max_lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal max_lag
+        while not done:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            max_lag = max(max_lag, time.perf_counter() - expected)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    result = await run()
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return result, elapsed, max_lag
+
+
+async def run_inline(pdf_path: str) -> str:
+    """原实现：在事件循环中顺序解析所有页面"""
+    return merge_pages(extract_page_range(pdf_path, 0, count_pages(pdf_path)))
+
+
+async def run_pool(pool: ProcessPool, pdf_path: str, chunk: int) -> str:
+    """进程池：按页码范围并行解析后合并"""
+    page_count = await pool.run(count_pages, pdf_path)
+    chunks = await asyncio.gather(*(
+        pool.run(extract_page_range, pdf_path, start, end)
+        for start, end in split_page_ranges(page_count, chunk)
+    ))
+    return merge_pages([page for pages in chunks for page in pages])
+
+
+def report(name: str, pages: int, samples, baseline: str, output: str):
+    elapsed = min(s[0] for s in samples)
+    lag = max(s[1] for s in samples)
+    same = "✅" if output == baseline else "❌ 输出不一致"
+    print(f"{name:<22} {pages / elapsed:>10.1f} {elapsed:>10.2f} {lag * 1000:>14.0f}   {same}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="PDF 解析基准测试")
+    parser.add_argument("--pdf", help="PDF 文件路径")
+    parser.add_argument("--base64", help="Base64 文本文件路径")
+    parser.add_argument("--pages", type=int, default=30, help="合成 PDF 页数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="进程池工作进程数")
+    parser.add_argument("--chunk", type=int, default=4, help="每个子任务解析的页数")
+    parser.add_argument("--max-tasks-per-child", type=int, default=20, help="工作进程回收前处理的子任务数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    temp_path = None
+    if args.pdf:
+        pdf_path = args.pdf
+    else:
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        if args.base64:
+            with open(args.base64, "r", encoding="utf-8") as f:
+                with open(temp_path, "wb") as out:
+                    out.write(base64.b64decode(f.read().strip()))
+        else:
+            build_synthetic_pdf(temp_path, args.pages)
+        pdf_path = temp_path
+
+    try:
+        pages = count_pages(pdf_path)
+        print(f"📄 PDF: {args.pdf or args.base64 or '合成'}，{pages} 页，CPU 核数 {os.cpu_count()}")
+        print(f"{'方式':<20} {'页/秒':>10} {'耗时(s)':>10} {'循环最大延迟(ms)':>14}")
+
+        samples = []
+        baseline = None
+        for _ in range(args.rounds):
+            baseline, elapsed, lag = await measure(lambda: run_inline(pdf_path))
+            samples.append((elapsed, lag))
+        report("事件循环内顺序解析", pages, samples, baseline, baseline)
+
+        for workers in args.workers:
+            pool = ProcessPool(f"bench-{workers}", max_workers=workers, max_tasks_per_child=args.max_tasks_per_child)
+            try:
+                # 预热：启动工作进程并导入 pdfplumber，不计入耗时
+                await asyncio.gather(*(pool.run(count_pages, pdf_path) for _ in range(workers)))
+                samples = []
+                output = None
+                for _ in range(args.rounds):
+                    output, elapsed, lag = await measure(lambda: run_pool(pool, pdf_path, args.chunk))
+                    samples.append((elapsed, lag))
+                report(f"进程池 x{workers} (每块{args.chunk}页)", pages, samples, baseline, output)
+            finally:
+                pool.shutdown()
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调度策略基准测试
+按任务轨迹离线回放（模拟时钟），对比 fifo / priority / edf / sjf 各策略的延迟分布
+
+轨迹来源（三选一）：
+- 默认: 按随机种子生成的合成轨迹（简版小报告为主，混入 80 页详版大报告、会员任务和带截止时间的任务）
+- --db: 回放任务存储（SQLite）中已完成任务的到达时间、处理耗时、优先级和截止时间
+- --trace: JSONL 文件，每行 {"arrival", "service", "report_type", "pages", "file_size", "priority", "deadline"}
+  （arrival/deadline 为相对轨迹开始的秒数）
+
+预测耗时（sjf 使用）按任务画像（报告类型/页数区间/文件大小区间）对轨迹中的处理耗时取平均，
+与线上耗时模型的分组方式一致。
+
+用法:
+    python test/bench_scheduler.py --tasks 2000 --workers 4 --load 0.9
+    python test/bench_scheduler.py --db storage/queue.db --workers 3
+"""
+
+import sys
+import json
+import math
+import heapq
+import random
+import sqlite3
+import argparse
+from dataclasses import dataclass
+from typing import List, Optional, Dict
+from pathlib import Path
+
+# 添加 app 目录到 sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+
+from utils.task_scheduler import TaskScheduler, POLICIES, PRIORITY_NORMAL, PRIORITY_MEMBER, PRIORITY_URGENT
+from utils.eta_estimator import profile_key
+
+
+@dataclass
+class SimJob:
+    """回放中的任务"""
+    job_id: int
+    created_at: float  # 到达时间（模拟时钟）
+    service: float  # 实际处理耗时（秒）
+    priority: int = PRIORITY_NORMAL
+    deadline: Optional[float] = None
+    cost: Optional[float] = None  # 预测耗时（秒）
+    profile: str = ""
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+def synthetic_trace(tasks: int, workers: int, load: float, seed: int) -> List[SimJob]:
+    """生成合成轨迹：到达服从泊松过程，平均负载为 load"""
+    rng = random.Random(seed)
+    # (占比, 报告类型, 页数范围, 单页大小KB, 单页耗时秒, 固定耗时秒)
+    mix = [
+        (0.70, "simple", (2, 6), 80, 3.0, 40.0),
+        (0.20, "detail", (10, 30), 120, 4.0, 60.0),
+        (0.10, "detail", (60, 90), 400, 6.0, 90.0),
+    ]
+    mean_service = sum(share * (sum(pages) / 2 * per_page + fixed) for share, _, pages, _, per_page, fixed in mix)
+    arrival_rate = load * workers / mean_service
+
+    jobs, now = [], 0.0
+    for job_id in range(tasks):
+        now += rng.expovariate(arrival_rate)
+        pick, acc = rng.random(), 0.0
+        for share, report_type, (low, high), size_kb, per_page, fixed in mix:
+            acc += share
+            if pick <= acc:
+                break
+        pages = rng.randint(low, high)
+        service = (pages * per_page + fixed) * rng.lognormvariate(0, 0.25)
+
+        priority = PRIORITY_NORMAL
+        roll = rng.random()
+        if roll < 0.05:
+            priority = PRIORITY_URGENT
+        elif roll < 0.25:
+            priority = PRIORITY_MEMBER
+        deadline = now + rng.uniform(300, 1200) if rng.random() < 0.3 else None
+
+        jobs.append(SimJob(
+            job_id=job_id, created_at=now, service=service, priority=priority, deadline=deadline,
+            profile=profile_key(report_type, pages, pages * size_kb * 1024)
+        ))
+    return jobs
+
+
+def trace_from_db(db_path: str) -> List[SimJob]:
+    """从任务存储中读取已完成任务作为回放轨迹"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}
+    optional = [name for name in ("profile_key", "priority", "deadline") if name in columns]
+    rows = conn.execute(
+        f"SELECT created_at, started_at, completed_at{''.join(', ' + name for name in optional)} FROM tasks "
+        "WHERE status = 'completed' AND started_at IS NOT NULL AND completed_at IS NOT NULL ORDER BY created_at"
+    ).fetchall()
+    conn.close()
+    if not rows:
+        raise SystemExit(f"任务存储中没有已完成的任务: {db_path}")
+
+    origin = rows[0]["created_at"]
+    jobs = []
+    for job_id, row in enumerate(rows):
+        record = dict(row)
+        deadline = record.get("deadline")
+        jobs.append(SimJob(
+            job_id=job_id,
+            created_at=record["created_at"] - origin,
+            service=record["completed_at"] - record["started_at"],
+            priority=record.get("priority") or PRIORITY_NORMAL,
+            deadline=deadline - origin if deadline else None,
+            profile=record.get("profile_key") or "*"
+        ))
+    return jobs
+
+
+def trace_from_file(path: str) -> List[SimJob]:
+    """读取 JSONL 轨迹文件"""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for job_id, line in enumerate(line for line in f if line.strip()):
+            item = json.loads(line)
+            jobs.append(SimJob(
+                job_id=job_id,
+                created_at=float(item["arrival"]),
+                service=float(item["service"]),
+                priority=int(item.get("priority", PRIORITY_NORMAL)),
+                deadline=item.get("deadline"),
+                profile=profile_key(item.get("report_type", "unknown"), item.get("pages", 0), item.get("file_size", 0))
+            ))
+    return sorted(jobs, key=lambda job: job.created_at)
+
+
+def assign_costs(jobs: List[SimJob]):
+    """按任务画像的平均处理耗时作为预测耗时"""
+    totals: Dict[str, List[float]] = {}
+    for job in jobs:
+        totals.setdefault(job.profile, []).append(job.service)
+    means = {profile: sum(values) / len(values) for profile, values in totals.items()}
+    for job in jobs:
+        job.cost = means[job.profile]
+
+
+def simulate(jobs: List[SimJob], scheduler: TaskScheduler, workers: int) -> List[SimJob]:
+    """离散事件回放：有空闲工作槽位时按调度策略选择排队任务"""
+    jobs = [SimJob(**{**job.__dict__, "started_at": None, "finished_at": None}) for job in jobs]
+    arrivals = sorted(jobs, key=lambda job: job.created_at)
+    pending: List[SimJob] = []
+    running: List[tuple] = []
+    now, index = 0.0, 0
+
+    while index < len(arrivals) or pending or running:
+        while pending and len(running) < workers:
+            job = scheduler.select(pending, _job_fields, now=now)
+            pending.remove(job)
+            scheduler.record_dispatch(
+                job.priority, normal_waiting=any(other.priority < PRIORITY_URGENT for other in pending)
+            )
+            job.started_at = now
+            job.finished_at = now + job.service
+            heapq.heappush(running, (job.finished_at, job.job_id))
+
+        next_arrival = arrivals[index].created_at if index < len(arrivals) else math.inf
+        next_finish = running[0][0] if running else math.inf
+        now = min(next_arrival, next_finish)
+        if now == math.inf:
+            break
+        while index < len(arrivals) and arrivals[index].created_at <= now:
+            pending.append(arrivals[index])
+            index += 1
+        while running and running[0][0] <= now:
+            heapq.heappop(running)
+
+    return jobs
+
+
+def _job_fields(job: SimJob) -> tuple:
+    return job.priority, job.created_at, job.deadline, job.cost, None
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def report(policy: str, jobs: List[SimJob]):
+    """输出各策略的延迟分布（完成时间 - 到达时间）"""
+    latency = [job.finished_at - job.created_at for job in jobs]
+    small = [job.finished_at - job.created_at for job in jobs if job.cost is not None and job.cost <= percentile(
+        [j.cost for j in jobs], 0.5)]
+    members = [job.finished_at - job.created_at for job in jobs if job.priority == PRIORITY_MEMBER]
+    urgent = [job.finished_at - job.created_at for job in jobs if job.priority >= PRIORITY_URGENT]
+    with_deadline = [job for job in jobs if job.deadline is not None]
+    missed = sum(1 for job in with_deadline if job.finished_at > job.deadline)
+    max_wait = max(job.started_at - job.created_at for job in jobs)
+
+    print(f"{policy:<10} p50: {percentile(latency, 0.5):>8.1f}s | p99: {percentile(latency, 0.99):>8.1f}s | "
+          f"小任务p50: {percentile(small, 0.5):>7.1f}s | 会员p50: {percentile(members, 0.5):>7.1f}s | "
+          f"紧急p99: {percentile(urgent, 0.99):>7.1f}s | "
+          f"截止超时: {missed}/{len(with_deadline)} | 最长等待: {max_wait:>7.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="调度策略延迟对比（轨迹回放）")
+    parser.add_argument("--tasks", type=int, default=2000, help="合成轨迹的任务数量")
+    parser.add_argument("--workers", type=int, default=4, help="并发处理数")
+    parser.add_argument("--load", type=float, default=0.9, help="合成轨迹的平均负载（到达率 × 平均耗时 / 并发数）")
+    parser.add_argument("--seed", type=int, default=42, help="合成轨迹的随机种子")
+    parser.add_argument("--db", help="回放任务存储（SQLite）中已完成的任务")
+    parser.add_argument("--trace", help="回放 JSONL 轨迹文件")
+    parser.add_argument("--aging-seconds", type=float, default=120.0, help="老化周期（秒）")
+    parser.add_argument("--urgent-burst", type=int, default=3, help="普通任务等待时最多连续出队的紧急任务数")
+    args = parser.parse_args()
+
+    if args.db:
+        jobs = trace_from_db(args.db)
+    elif args.trace:
+        jobs = trace_from_file(args.trace)
+    else:
+        jobs = synthetic_trace(args.tasks, args.workers, args.load, args.seed)
+    assign_costs(jobs)
+
+    print(f"📊 任务数: {len(jobs)}, 并发: {args.workers}, "
+          f"平均耗时: {sum(job.service for job in jobs) / len(jobs):.1f}s, 老化周期: {args.aging_seconds:.0f}s")
+    for policy in POLICIES:
+        scheduler = TaskScheduler(policy=policy, urgent_burst=args.urgent_burst, aging_seconds=args.aging_seconds)
+        report(policy, simulate(jobs, scheduler, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务存储基准测试
+对比内存路径与 SQLite(WAL) 持久化路径的入队和状态更新吞吐量
+
+用法:
+    python test/bench_task_store.py --tasks 2000 --payload-kb 64
+"""
+
+import sys
+import time
+import uuid
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加 app 目录到 sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+
+from utils.task_store import MemoryTaskStore, SQLiteTaskStore
+
+
+def build_record(payload: str) -> dict:
+    """构造一条任务记录"""
+    return {
+        "task_id": str(uuid.uuid4()),
+        "status": "pending",
+        "created_at": time.time(),
+        "started_at": None,
+        "completed_at": None,
+        "retry_count": 0,
+        "max_retries": 2,
+        "error_message": None,
+        "result": None,
+        "request_data": {
+            "file_base64": payload,
+            "mime_type": "application/pdf",
+            "report_type": "simple",
+        },
+    }
+
+
+def bench_store(name: str, store, tasks: int, payload: str):
+    """测量入队与状态更新吞吐量"""
+    records = [build_record(payload) for _ in range(tasks)]
+
+    # 入队（保存任务及请求数据）
+    start = time.perf_counter()
+    for record in records:
+        store.save_task(record)
+    enqueue_time = time.perf_counter() - start
+
+    # 状态更新：processing -> completed，共两次更新
+    start = time.perf_counter()
+    for record in records:
+        record.pop("request_data", None)
+        record["status"] = "processing"
+        record["started_at"] = time.time()
+        store.update_task(record)
+        record["status"] = "completed"
+        record["completed_at"] = time.time()
+        record["result"] = {"success": True, "request_id": record["task_id"]}
+        store.update_task(record)
+        store.clear_payload(record["task_id"])
+    update_time = time.perf_counter() - start
+
+    print(f"{name:<16} 入队: {tasks / enqueue_time:>10,.0f} ops/s | "
+          f"状态更新: {tasks * 2 / update_time:>10,.0f} ops/s")
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务存储吞吐量基准测试")
+    parser.add_argument("--tasks", type=int, default=2000, help="任务数量")
+    parser.add_argument("--payload-kb", type=int, default=64, help="每个任务请求数据大小（KB）")
+    args = parser.parse_args()
+
+    payload = "A" * (args.payload_kb * 1024)
+    print(f"📊 任务数: {args.tasks}, 请求数据: {args.payload_kb}KB")
+
+    bench_store("memory", MemoryTaskStore(), args.tasks, payload)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bench_store("sqlite(WAL)", SQLiteTaskStore(str(Path(tmp_dir) / "queue.db")), args.tasks, payload)
+
+
+if __name__ == "__main__":
+    main()